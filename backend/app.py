@@ -3,6 +3,7 @@ from flask_session import Session
 
 from chart_api import chart
 from filemanager import filemanager
+from utils.http_utils import compression_utils, metrics_utils, profiling_utils
 
 SESSION_TYPE = "filesystem"
 PERMANENT_SESSION_LIFETIME = 1800
@@ -13,6 +14,14 @@ Session(app)
 app.register_blueprint(chart, url_prefix="/chartapi")
 app.register_blueprint(filemanager, url_prefix="/filemanager")
 
+# after request handlers run in reverse order, the responses are compressed before their timings are added
+app.before_request(metrics_utils.start_request)
+app.before_request(profiling_utils.start_profiling)
+app.after_request(metrics_utils.add_server_timing)
+app.after_request(profiling_utils.stop_profiling)
+app.after_request(compression_utils.compress_response)
+app.add_url_rule("/metrics", view_func=metrics_utils.render_metrics)
+
 if __name__ == "__main__":
     app.secret_key = "super secret key"
     app.config["SESSION_TYPE"] = SESSION_TYPE
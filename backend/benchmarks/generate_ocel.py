@@ -0,0 +1,252 @@
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from xml.sax.saxutils import quoteattr
+
+# first timestamp of every generated log
+START_TIME = datetime(2020, 1, 1)
+
+
+class SyntheticOcel:
+    """
+    Deterministic generator of object-centric event logs, events and objects are produced lazily
+    so that logs with millions of events can be written without holding them in memory
+    """
+
+    def __init__(
+        self,
+        events: int,
+        object_types: int = 3,
+        objects_per_event: int = 3,
+        activities: int = 8,
+        attributes: int = 2,
+        objects_per_type: int = None,
+        seed: int = 0,
+    ):
+        """
+        Initialisation method
+
+        Args:
+            events (int): number of events
+            object_types (int): number of object types
+            objects_per_event (int): maximum number of objects related to an event, at least one
+            activities (int): number of activities
+            attributes (int): number of attributes per event and per object
+            objects_per_type (int): number of objects per object type, defaults to a fifth of the events
+            seed (int): seed of the random generator, equal parameters and seeds produce equal logs
+        """
+        self.events = events
+        self.object_types = ["type{}".format(i) for i in range(object_types)]
+        self.objects_per_event = max(1, objects_per_event)
+        self.activities = ["activity {}".format(i) for i in range(activities)]
+        self.event_attributes = ["event_attribute{}".format(i) for i in range(attributes)]
+        self.object_attributes = ["object_attribute{}".format(i) for i in range(attributes)]
+        self.objects_per_type = objects_per_type or max(1, events // 5)
+        self.seed = seed
+
+    def get_attribute_names(self) -> list:
+        """
+        Returns the names of all event and object attributes
+
+        Returns:
+            list:
+        """
+        return self.event_attributes + self.object_attributes
+
+    def get_object_id(self, type_index: int, object_index: int) -> str:
+        """
+        Returns the id of an object
+
+        Args:
+            type_index (int): position of the object type
+            object_index (int): position of the object within its type
+
+        Returns:
+            str:
+        """
+        return "o{}-{}".format(type_index, object_index)
+
+    def get_attribute_value(self, rng: random.Random, index: int):
+        """
+        Draws an attribute value, attributes alternate between numbers and strings
+
+        Args:
+            rng (random.Random):
+            index (int): position of the attribute
+
+        Returns:
+            float or str:
+        """
+        if index % 2 == 0:
+            return round(rng.random() * 100, 2)
+        return "value {}".format(rng.randrange(10))
+
+    def iter_events(self):
+        """
+        Yields the events ordered by timestamp
+
+        Yields:
+            tuple: (event id, activity, timestamp, related object ids, attributes)
+        """
+        rng = random.Random(self.seed)
+        timestamp = START_TIME
+        for index in range(self.events):
+            timestamp += timedelta(seconds=rng.randint(1, 120))
+            # every event is related to at least one object of its main type
+            main_type = rng.randrange(len(self.object_types))
+            omap = [self.get_object_id(main_type, rng.randrange(self.objects_per_type))]
+            for _ in range(rng.randrange(self.objects_per_event)):
+                omap.append(
+                    self.get_object_id(
+                        rng.randrange(len(self.object_types)),
+                        rng.randrange(self.objects_per_type),
+                    )
+                )
+            attributes = {
+                name: self.get_attribute_value(rng, i)
+                for i, name in enumerate(self.event_attributes)
+            }
+            yield (
+                str(index),
+                self.activities[rng.randrange(len(self.activities))],
+                timestamp,
+                list(dict.fromkeys(omap)),
+                attributes,
+            )
+
+    def iter_objects(self):
+        """
+        Yields all objects, objects that no event is related to are included
+
+        Yields:
+            tuple: (object id, object type, attributes)
+        """
+        rng = random.Random(self.seed + 1)
+        for type_index, object_type in enumerate(self.object_types):
+            for object_index in range(self.objects_per_type):
+                attributes = {
+                    name: self.get_attribute_value(rng, i)
+                    for i, name in enumerate(self.object_attributes)
+                }
+                yield self.get_object_id(type_index, object_index), object_type, attributes
+
+    def write_jsonocel(self, path: str):
+        """
+        Writes the log in the OCEL 1.0 JSON format
+
+        Args:
+            path (str):
+        """
+        global_log = {
+            "ocel:attribute-names": self.get_attribute_names(),
+            "ocel:object-types": self.object_types,
+            "ocel:version": "1.0",
+            "ocel:ordering": "timestamp",
+        }
+        with open(path, "w") as f:
+            f.write('{"ocel:global-log": ')
+            f.write(json.dumps(global_log))
+            f.write(', "ocel:global-event": {}, "ocel:global-object": {}, "ocel:events": {')
+            for index, (eid, activity, timestamp, omap, attributes) in enumerate(self.iter_events()):
+                event = {
+                    "ocel:activity": activity,
+                    "ocel:timestamp": timestamp.isoformat(),
+                    "ocel:omap": omap,
+                    "ocel:vmap": attributes,
+                }
+                f.write("{}{}: {}".format(", " if index else "", json.dumps(eid), json.dumps(event)))
+            f.write('}, "ocel:objects": {')
+            for index, (oid, object_type, attributes) in enumerate(self.iter_objects()):
+                obj = {"ocel:type": object_type, "ocel:ovmap": attributes}
+                f.write("{}{}: {}".format(", " if index else "", json.dumps(oid), json.dumps(obj)))
+            f.write("}}")
+
+    def write_xmlocel(self, path: str):
+        """
+        Writes the log in the OCEL 1.0 XML format
+
+        Args:
+            path (str):
+        """
+
+        def element(tag, key, value):
+            return "<{} key={} value={}/>".format(tag, quoteattr(key), quoteattr(str(value)))
+
+        def attribute(key, value):
+            return element("float" if isinstance(value, float) else "string", key, value)
+
+        with open(path, "w") as f:
+            f.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+            f.write('<log ocel.version="1.0" ocel.ordering="timestamp">\n')
+            f.write('<global scope="event"/>\n<global scope="object"/>\n<global scope="log">\n')
+            f.write('<list key="attribute-names">\n')
+            for name in self.get_attribute_names():
+                f.write(element("string", "attribute-name", name) + "\n")
+            f.write('</list>\n<list key="object-types">\n')
+            for object_type in self.object_types:
+                f.write(element("string", "object-type", object_type) + "\n")
+            f.write("</list>\n")
+            f.write(element("string", "version", "1.0") + "\n")
+            f.write(element("string", "ordering", "timestamp") + "\n")
+            f.write("</global>\n<events>\n")
+            for eid, activity, timestamp, omap, attributes in self.iter_events():
+                f.write("<event>")
+                f.write(element("string", "id", eid))
+                f.write(element("date", "timestamp", timestamp.isoformat()))
+                f.write(element("string", "activity", activity))
+                f.write('<list key="omap">')
+                f.write("".join(element("string", "object-id", oid) for oid in omap))
+                f.write('</list><list key="vmap">')
+                f.write("".join(attribute(key, value) for key, value in attributes.items()))
+                f.write("</list></event>\n")
+            f.write("</events>\n<objects>\n")
+            for oid, object_type, attributes in self.iter_objects():
+                f.write("<object>")
+                f.write(element("string", "id", oid))
+                f.write(element("string", "type", object_type))
+                f.write('<list key="ovmap">')
+                f.write("".join(attribute(key, value) for key, value in attributes.items()))
+                f.write("</list></object>\n")
+            f.write("</objects>\n</log>\n")
+
+    def write(self, path: str):
+        """
+        Writes the log in the format given by the file extension
+
+        Args:
+            path (str): path ending with .jsonocel or .xmlocel
+        """
+        if path.endswith(".jsonocel"):
+            self.write_jsonocel(path)
+        elif path.endswith(".xmlocel"):
+            self.write_xmlocel(path)
+        else:
+            raise ValueError("unsupported file extension: {}".format(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a synthetic object-centric event log")
+    parser.add_argument("path", help="output file, .jsonocel or .xmlocel")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--object-types", type=int, default=3)
+    parser.add_argument("--objects-per-event", type=int, default=3)
+    parser.add_argument("--activities", type=int, default=8)
+    parser.add_argument("--attributes", type=int, default=2)
+    parser.add_argument("--objects-per-type", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    SyntheticOcel(
+        args.events,
+        args.object_types,
+        args.objects_per_event,
+        args.activities,
+        args.attributes,
+        args.objects_per_type,
+        args.seed,
+    ).write(args.path)
+
+
+if __name__ == "__main__":
+    main()
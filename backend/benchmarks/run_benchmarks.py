@@ -0,0 +1,478 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+import pm4py
+
+from app import app
+from benchmarks.generate_ocel import SyntheticOcel
+from utils.chart_utils import ocel_cache, process_utils, serialization_utils
+from utils.chart_utils.chart import EVENT_SAMPLE_SIZES, Chart
+from utils.chart_utils.profile_utils import get_profile
+from utils.filemanager_utils import filemanager_utils as fu
+
+# number of events of the generated logs
+SCALES = [10_000, 100_000, 1_000_000, 10_000_000]
+FORMATS = [".jsonocel", ".xmlocel"]
+
+# version of the result format, results of different versions are not compared
+RESULT_VERSION = 1
+
+# a stage is reported as regression if its median is this much slower than in the baseline
+DEFAULT_TOLERANCE = 0.25
+# stages faster than this in the baseline are too noisy to be compared
+MIN_COMPARED_SECONDS = 0.005
+
+# chunk size of the chunked upload benchmark
+CHUNK_SIZE = 8 * 1024 * 1024
+INGEST_TIMEOUT_SECONDS = 3600
+
+
+class Benchmark:
+    """
+    Runs the stages of the app on one generated log and collects their timings
+    """
+
+    def __init__(self, scale: int, file_format: str, repeat: int, work_dir: str):
+        """
+        Initialisation method
+
+        Args:
+            scale (int): number of events of the log
+            file_format (str): file extension of the log
+            repeat (int): number of timed runs per stage
+            work_dir (str): directory the log is generated in before it is uploaded
+        """
+        self.scale = scale
+        self.file_format = file_format
+        self.repeat = repeat
+        self.file_name = "benchmark-{}{}".format(scale, file_format)
+        self.source_path = os.path.join(work_dir, self.file_name)
+        self.client = app.test_client()
+        self.results = []
+
+    def time(self, stage: str, function, repeat: int = None, setup=None):
+        """
+        Times a stage, the first run is included so cold caches are visible in the timings
+
+        Args:
+            stage (str): name of the stage
+            function (callable): runs the stage once
+            repeat (int): number of runs, defaults to the repeat of the benchmark
+            setup (callable): runs before every run without being timed
+
+        Returns:
+            the return value of the last run
+        """
+        seconds = []
+        result = None
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = function()
+            seconds.append(time.perf_counter() - start)
+        self.results.append(
+            {
+                "scale": self.scale,
+                "format": self.file_format,
+                "stage": stage,
+                "seconds": seconds,
+                "min": min(seconds),
+                "median": statistics.median(seconds),
+            }
+        )
+        print(
+            "{:>10} {:<10} {:<48} {:10.4f}s".format(
+                self.scale, self.file_format, stage, statistics.median(seconds)
+            ),
+            file=sys.stderr,
+        )
+        return result
+
+    def request(self, stage: str, method: str, url: str, repeat: int = None, **kwargs):
+        """
+        Times a request to an endpoint of the app, failing requests abort the benchmark
+
+        Args:
+            stage (str): name of the stage
+            method (str): http method
+            url (str): url with query parameters
+            repeat (int): number of runs
+            **kwargs: passed to the test client
+
+        Returns:
+            the response of the last run
+        """
+
+        def run():
+            response = self.client.open(url, method=method, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError("{} {} returned {}".format(method, url, response.status_code))
+            return response
+
+        return self.time(stage, run, repeat)
+
+    def run(self) -> list:
+        """
+        Generates the log and runs all stages on it
+
+        Returns:
+            list: one result per stage
+        """
+        self.time(
+            "generate",
+            lambda: SyntheticOcel(self.scale).write(self.source_path),
+            repeat=1,
+        )
+        try:
+            self.time("pm4py.read_ocel", lambda: pm4py.read_ocel(self.source_path))
+            self.run_upload()
+            self.run_processing()
+            self.run_chart("eventID")
+            self.run_chart(get_profile(self.file_name)["object_types"][0])
+            self.run_chart_endpoints()
+            self.run_filemanager_endpoints()
+        finally:
+            if fu.check_file_exists(self.file_name):
+                fu.delete_file(self.file_name)
+            ocel_cache.invalidate(self.file_name)
+            os.remove(self.source_path)
+        return self.results
+
+    def run_upload(self):
+        """
+        Uploads the log and waits for its ingest
+        """
+
+        def upload():
+            with open(self.source_path, "rb") as f:
+                return self.client.post(
+                    "/filemanager/upload-file", data={"file": (f, self.file_name)}
+                )
+
+        response = self.time("/filemanager/upload-file", upload, repeat=1)
+        if response.json["error"]:
+            raise RuntimeError(response.json["errorMessage"])
+
+        def wait_for_ingest():
+            deadline = time.time() + INGEST_TIMEOUT_SECONDS
+            while time.time() < deadline:
+                status = self.client.get(
+                    "/filemanager/ingest-status?filename=" + self.file_name
+                ).json["status"]
+                if status["state"] == "ready":
+                    return
+                if status["state"] == "failed":
+                    raise RuntimeError(status["error"])
+                time.sleep(0.05)
+            raise RuntimeError("ingest of {} timed out".format(self.file_name))
+
+        self.time("ingest", wait_for_ingest, repeat=1)
+
+    def run_processing(self):
+        """
+        Times building the processed dfs of the views
+        """
+        for render_mode, sample_size in EVENT_SAMPLE_SIZES.items():
+            self.time(
+                "process_df:" + render_mode,
+                lambda: process_utils.process_df(self.file_name, sample_size),
+            )
+        for object_type in get_profile(self.file_name)["object_types"]:
+            self.time(
+                "process_flatten_df:" + object_type,
+                lambda: process_utils.process_flatten_df(self.file_name, object_type),
+            )
+
+    def run_chart(self, view: str):
+        """
+        Times the filters, plotting and serialization of a chart of the view
+
+        Args:
+            view (str): "eventID" or an object type
+        """
+        profile = get_profile(self.file_name)
+        activities = profile["activities"]
+        dotted_chart = Chart(
+            self.file_name,
+            view,
+            [],
+            activities[: max(1, len(activities) // 2)],
+            profile["object_types"][:1] if view == "eventID" else [],
+            None,
+            None,
+        )
+        dotted_chart.load_base_df()
+        times = dotted_chart.time_index
+        if len(times):
+            dotted_chart.set_dates(
+                pd.Timestamp(times[len(times) // 4]), pd.Timestamp(times[3 * len(times) // 4])
+            )
+
+        def drop_bitsets():
+            dotted_chart.filter_bitsets = dict()
+
+        self.time(view + ":filter_activities", dotted_chart.filter_activities, setup=drop_bitsets)
+        if view == "eventID":
+            self.time(
+                view + ":filter_object_types",
+                dotted_chart.filter_object_types,
+                setup=drop_bitsets,
+            )
+        else:
+            drop_bitsets()
+            dotted_chart.filter_activities()
+        self.time(view + ":filter_timestamp", dotted_chart.filter_timestamp)
+        self.time(view + ":apply_filters", dotted_chart.apply_filters)
+
+        if view == "eventID":
+            fig = self.time(view + ":plot_df", dotted_chart.plot_df)
+        else:
+            fig = self.time(view + ":plot_flattened_df", dotted_chart.plot_flattened_df)
+        self.time(
+            view + ":serialize",
+            lambda: serialization_utils.dumps(
+                {"figure": serialization_utils.encode_figure(fig)}
+            ),
+        )
+
+    def run_chart_endpoints(self):
+        """
+        Times every endpoint of the chart api, the first run of /scatterplot renders the figure
+        """
+        profile = get_profile(self.file_name)
+        object_type = profile["object_types"][0]
+        ocel = ocel_cache.get_ocel(self.file_name)
+        eid = str(ocel.events["ocel:eid"].iloc[len(ocel.events) // 2])
+        oids = [str(oid) for oid in ocel.relations["ocel:oid"].iloc[:10]]
+        query = "filename=" + self.file_name
+
+        self.request(
+            "/chartapi/scatterplot:eventID",
+            "GET",
+            "/chartapi/scatterplot?{}&view=eventID&resetFilters=true".format(query),
+        )
+        self.request(
+            "/chartapi/scatterplot:eventID:page",
+            "GET",
+            "/chartapi/scatterplot?{}&view=eventID&pageSize=100&cursor={}".format(query, eid),
+        )
+        self.request(
+            "/chartapi/toggle-subplot",
+            "GET",
+            "/chartapi/toggle-subplot?traceIndex=0&pointIndex=0",
+        )
+        self.request(
+            "/chartapi/apply-activity-filter",
+            "POST",
+            "/chartapi/apply-activity-filter",
+            json={
+                "selectedActivities": profile["activities"][
+                    : max(1, len(profile["activities"]) // 2)
+                ]
+            },
+        )
+        self.request(
+            "/chartapi/apply-object-filter",
+            "POST",
+            "/chartapi/apply-object-filter",
+            json={"selectedObjectTypes": [object_type]},
+        )
+        self.request(
+            "/chartapi/scatterplot:" + object_type,
+            "GET",
+            "/chartapi/scatterplot?{}&view={}&resetFilters=true".format(query, object_type),
+        )
+        self.request(
+            "/chartapi/scatterplot-stream",
+            "GET",
+            "/chartapi/scatterplot-stream?{}&view={}".format(query, object_type),
+        )
+        self.request(
+            "/chartapi/flattened-lod",
+            "GET",
+            "/chartapi/flattened-lod?{}&view={}".format(query, object_type),
+        )
+        self.request(
+            "/chartapi/get-general-metrics",
+            "GET",
+            "/chartapi/get-general-metrics?" + query,
+        )
+        self.request(
+            "/chartapi/get-object-lifecycle",
+            "GET",
+            "/chartapi/get-object-lifecycle?{}&oid={}".format(query, oids[0]),
+        )
+        self.request(
+            "/chartapi/get-object-lifecycles",
+            "GET",
+            "/chartapi/get-object-lifecycles?{}&{}".format(
+                query, "&".join("oid=" + oid for oid in oids)
+            ),
+        )
+        self.request(
+            "/chartapi/get-object-attributes",
+            "GET",
+            "/chartapi/get-object-attributes?{}&oid={}".format(query, oids[0]),
+        )
+        self.request(
+            "/chartapi/get-event-attributes",
+            "GET",
+            "/chartapi/get-event-attributes?{}&eid={}".format(query, eid),
+        )
+
+    def run_filemanager_endpoints(self):
+        """
+        Times every endpoint of the filemanager, the log is deleted at the end
+        """
+        query = "filename=" + self.file_name
+        self.request("/filemanager/list-files", "GET", "/filemanager/list-files")
+        self.request(
+            "/filemanager/get-file-details", "GET", "/filemanager/get-file-details?" + query
+        )
+        self.request("/filemanager/file-preview", "GET", "/filemanager/file-preview?" + query)
+        self.request("/filemanager/ingest-status", "GET", "/filemanager/ingest-status?" + query)
+
+        # a second copy of the log is uploaded in chunks
+        chunked_name = "chunked-" + self.file_name
+
+        def upload_chunks():
+            offset = 0
+            with open(self.source_path, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    final = len(chunk) < CHUNK_SIZE
+                    response = self.client.post(
+                        "/filemanager/upload-chunk?filename={}&offset={}&final={}".format(
+                            chunked_name, offset, "true" if final else "false"
+                        ),
+                        data=chunk,
+                    )
+                    if response.json["error"]:
+                        raise RuntimeError(response.json["errorMessage"])
+                    offset = response.json["received"]
+                    if final:
+                        return
+
+        self.time("/filemanager/upload-chunk", upload_chunks, repeat=1)
+        self.request(
+            "/filemanager/upload-status",
+            "GET",
+            "/filemanager/upload-status?filename=" + chunked_name,
+        )
+        self.request(
+            "/filemanager/delete-file:chunked",
+            "DELETE",
+            "/filemanager/delete-file?filename=" + chunked_name,
+            repeat=1,
+        )
+        self.request(
+            "/filemanager/delete-file",
+            "DELETE",
+            "/filemanager/delete-file?" + query,
+            repeat=1,
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compares the medians of two benchmark runs
+
+    Args:
+        results (dict): output of the current run
+        baseline (dict): output of a previous run
+        tolerance (float): allowed slowdown as fraction of the baseline median
+
+    Returns:
+        list: regressions as dicts with scale, format, stage, baseline and current median
+    """
+    if baseline.get("version") != results["version"]:
+        raise ValueError("the baseline was written by a different version of the benchmarks")
+    baseline_medians = {
+        (result["scale"], result["format"], result["stage"]): result["median"]
+        for result in baseline["results"]
+    }
+    regressions = []
+    for result in results["results"]:
+        key = (result["scale"], result["format"], result["stage"])
+        if key not in baseline_medians or baseline_medians[key] < MIN_COMPARED_SECONDS:
+            continue
+        if result["median"] > baseline_medians[key] * (1 + tolerance):
+            regressions.append(
+                {
+                    "scale": result["scale"],
+                    "format": result["format"],
+                    "stage": result["stage"],
+                    "baseline": baseline_medians[key],
+                    "median": result["median"],
+                }
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Times every stage of the app on synthetic logs and writes the results as JSON"
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--formats", nargs="+", default=FORMATS, choices=FORMATS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="-", help="result file, - for stdout")
+    parser.add_argument("--baseline", help="results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(fu.get_path_from_name("x")), exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="dottie-benchmark-")
+    results = {
+        "version": RESULT_VERSION,
+        "created": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pandas": pd.__version__,
+            "pm4py": pm4py.__version__,
+        },
+        "results": [],
+    }
+    try:
+        for scale in args.scales:
+            for file_format in args.formats:
+                results["results"] += Benchmark(scale, file_format, args.repeat, work_dir).run()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+
+    output = json.dumps(results, indent=1)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output)
+    for regression in regressions:
+        print(
+            "regression: {scale} {format} {stage}: {baseline:.4f}s -> {median:.4f}s".format(
+                **regression
+            ),
+            file=sys.stderr,
+        )
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
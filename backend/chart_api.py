@@ -1,20 +1,30 @@
+import itertools
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
 import numpy as np
-from flask import Blueprint, request
+import pandas as pd
+from flask import Blueprint, Response, request, session, stream_with_context
 
 from utils.chart_utils import performance_metric_utils as perf
-from utils.chart_utils.chart import Chart
-import plotly
-import json
+from utils.chart_utils import figure_cache, ingest_utils, serialization_utils
+from utils.chart_utils.chart import (
+    EVENT_SAMPLE_SIZES,
+    LOD_POINT_THRESHOLD,
+    STREAM_BATCH_POINTS,
+    Chart,
+    NoDataError,
+)
+from utils.chart_utils.profile_utils import get_cached_profile, get_profile
+from utils.http_utils import caching_utils
 
 chart = Blueprint("chart", __name__)
 
-dotted_chart = None
-collapsed_subplots = []
-selected_activities = []
-selected_object_types = []
-view = "eventID"
+# charts of the sessions served by this worker, any worker can rebuild them from the session state
+CHART_CACHE_SIZE = 32
+charts = OrderedDict()
+charts_lock = threading.Lock()
 
 
 @chart.route("/scatterplot", methods=["GET"])
@@ -22,82 +32,234 @@ def get_dataframe():
     """
     returns the chart to the frontend
     """
-    # import global vars
-    global view, dotted_chart, selected_activities, selected_object_types, collapsed_subplots
+    state = get_chart_state()
 
     # get query params
     filename = request.args.get("filename")
     current_view = request.args.get("view")
     frontend_reset_filters = request.args.get("resetFilters")
-    start_date = request.args.get("startTime")
-    end_date = request.args.get("endTime")
+    render_mode = request.args.get("renderMode", "webgl")
+    if render_mode not in EVENT_SAMPLE_SIZES:
+        render_mode = "webgl"
+
+    # handle reset_filters, view or file change, the filters of another file do not apply
+    if current_view != state["view"] or filename != state["filename"] or frontend_reset_filters == "true":
+        state["view"] = current_view
+        state["selected_activities"] = []
+        state["selected_object_types"] = []
+
+    state["filename"] = filename
+    state["render_mode"] = render_mode
+    state["start_time"] = request.args.get("startTime")
+    state["end_time"] = request.args.get("endTime")
+
+    # the eventID view is paginated if a page size is given, otherwise it shows evenly spaced events
+    state["page_size"] = request.args.get("pageSize", type=int)
+    state["cursor"] = request.args.get("cursor")
+    state["cursor_time"] = request.args.get("cursorTime")
+    state["page_direction"] = request.args.get("direction", "next")
+
+    # the client already holds the figure of this state, checked without hashing the file or loading the log
+    stored_etag = get_figure_key(state, stored_only=True)
+    if caching_utils.is_not_modified(stored_etag):
+        # the figure on this worker may differ from the client's, clicks on it have to re-render first
+        state["render_id"] = None
+        save_chart_state(state)
+        return caching_utils.not_modified(stored_etag)
+    etag = stored_etag or get_figure_key(state)
 
-    # handle reset_filters or view change
-    if current_view != view or frontend_reset_filters == "true":
-        view = current_view
-        selected_activities = []
-        selected_object_types = []
+    # init chart
+    dotted_chart = get_chart(state)
 
-    # date formats
-    start_date, end_date = extract_datetime(start_date, end_date)
+    # the figure of this state has been rendered before
+    rendered = figure_cache.get_figure(etag)
+    if rendered is not None:
+        dotted_chart.restore_render(rendered.trace_to_event)
+        state["selected_activities"] = rendered.selected_activities
+        state["selected_object_types"] = rendered.selected_object_types
+        state["render_id"] = dotted_chart.render_id
+        save_chart_state(state)
+        return caching_utils.set_etag(json_response(rendered.body), etag)
 
-    # init chart
-    dotted_chart = Chart(
-        filename,
-        current_view,
-        collapsed_subplots,
-        selected_activities,
-        selected_object_types,
-        start_date,
-        end_date,
-    )
+    # the log is still being ingested in the background, the frontend polls until it is ready
+    if ingest_utils.get_ingest_state(filename) == "processing":
+        save_chart_state(state)
+        return {"processing": True}, 202
+
+    dotted_chart.reset_viewport()
 
     # create chart and determine if error occurred
     is_success = dotted_chart.make_dotted_chart()
+    state["render_id"] = dotted_chart.render_id
 
-    all_activities = handle_shared_variables()
+    all_activities = handle_shared_variables(dotted_chart, state)
     if is_success is True:
-        graphJSON = json.loads(plotly.io.to_json(dotted_chart.fig, pretty=True))
         response = {
-            "figure": graphJSON,
+            "figure": serialization_utils.encode_figure(dotted_chart.fig),
             "activities": all_activities,
-            "selected_activities": selected_activities,
+            "selected_activities": state["selected_activities"],
             "object_types": dotted_chart.get_objects_list(),
-            "selected_object_types": selected_object_types,
+            "selected_object_types": state["selected_object_types"],
+            "lod": dotted_chart.is_lod(),
+            "page": dotted_chart.get_page(),
         }
     else:
         response = {
             "error": str(is_success),
             "activities": all_activities,
-            "selected_activities": selected_activities,
+            "selected_activities": state["selected_activities"],
             "object_types": dotted_chart.get_objects_list(),
-            "selected_object_types": selected_object_types,
+            "selected_object_types": state["selected_object_types"],
         }
+        # errors are not cached
+        return json_response(response)
+
+    body = serialization_utils.dumps(response)
+    figure_cache.put_figure(
+        etag,
+        figure_cache.RenderedFigure(
+            body,
+            dict(dotted_chart.trace_to_event),
+            state["selected_activities"],
+            state["selected_object_types"],
+        ),
+    )
+    return caching_utils.set_etag(json_response(body), etag)
 
-    return response
+
+@chart.route("/flattened-lod", methods=["GET"])
+def get_flattened_lod():
+    """
+    returns the flattened chart restricted to the visible range, as binned density if too many points are visible
+    """
+    state = get_chart_state()
+
+    # get query params
+    state["filename"] = request.args.get("filename")
+    state["view"] = request.args.get("view")
+    state["render_mode"] = "webgl"
+    state["start_time"] = request.args.get("startTime")
+    state["end_time"] = request.args.get("endTime")
+    x_range, y_range = extract_viewport(
+        request.args.get("xStart"),
+        request.args.get("xEnd"),
+        request.args.get("yStart"),
+        request.args.get("yEnd"),
+    )
+
+    # the log is still being ingested in the background, like /scatterplot
+    if ingest_utils.get_ingest_state(state["filename"]) == "processing":
+        save_chart_state(state)
+        return {"processing": True}, 202
+
+    dotted_chart = get_chart(state)
+    dotted_chart.set_viewport(x_range, y_range)
+    is_success = dotted_chart.make_dotted_chart()
+
+    handle_shared_variables(dotted_chart, state)
+    if is_success is True:
+        response = {
+            "figure": serialization_utils.encode_figure(dotted_chart.fig),
+            "lod": dotted_chart.is_lod(),
+        }
+    else:
+        response = {"error": str(is_success)}
+
+    return json_response(response)
+
+
+@chart.route("/scatterplot-stream", methods=["GET"])
+def stream_scatterplot():
+    """
+    streams the chart of a flattened view as NDJSON, one JSON object per line:
+    a header with the layout and one empty trace per activity, then batches of points in time order
+    in the format of plotly.js extendTraces, and an end marker
+    """
+    state = get_chart_state()
+
+    # get query params
+    filename = request.args.get("filename")
+    current_view = request.args.get("view")
+    if current_view == "eventID":
+        return {"error": "only flattened views can be streamed"}
+
+    # handle reset_filters, view or file change like /scatterplot
+    frontend_reset_filters = request.args.get("resetFilters")
+    if current_view != state["view"] or filename != state["filename"] or frontend_reset_filters == "true":
+        state["view"] = current_view
+        state["selected_activities"] = []
+        state["selected_object_types"] = []
+
+    state["filename"] = filename
+    state["render_mode"] = "webgl"
+    state["start_time"] = request.args.get("startTime")
+    state["end_time"] = request.args.get("endTime")
+    batch_size = request.args.get("batchSize", STREAM_BATCH_POINTS, type=int)
+    # views above the level-of-detail threshold are rendered as density by /scatterplot unless lod=false
+    max_points = LOD_POINT_THRESHOLD if request.args.get("lod", "true") == "true" else None
+
+    # the log is still being ingested in the background, the frontend polls until it is ready
+    if ingest_utils.get_ingest_state(state["filename"]) == "processing":
+        save_chart_state(state)
+        return {"processing": True}, 202
+
+    dotted_chart = get_chart(state)
+    try:
+        batches = dotted_chart.stream_flattened_df(max(1, batch_size), max_points)
+    except NoDataError as e:
+        handle_shared_variables(dotted_chart, state)
+        return {"error": str(e)}
+    all_activities = handle_shared_variables(dotted_chart, state)
+
+    # the header also carries the filter options, like the response of /scatterplot
+    header = next(batches)
+    header.update(
+        {
+            "activities": all_activities,
+            "selected_activities": state["selected_activities"],
+            "object_types": dotted_chart.get_objects_list(),
+            "selected_object_types": state["selected_object_types"],
+        }
+    )
+    batches = itertools.chain([header], batches)
+
+    lines = (serialization_utils.dumps(batch) + "\n" for batch in batches)
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
 
 
 @chart.route("/toggle-subplot", methods=["GET"])
 def toggle_subplot():
     """
-    toggles the index at the clicked subplot
+    collapses or expands the event of the clicked point
     """
-    global dotted_chart, collapsed_subplots
+    state = get_chart_state()
+    if state["filename"] is None:
+        return {"error": "no chart has been created yet"}
+    if ingest_utils.get_ingest_state(state["filename"]) == "processing":
+        return {"processing": True}, 202
+    dotted_chart = get_chart(state)
 
     # "collapse all" button has been clicked
     if request.args.get("traceIndex") == "all":
-        for x in range(10):
-            if not collapsed_subplots[x]:
-                dotted_chart.set_collapsed_subplots_at_index(x)
-
-        collapsed_subplots = dotted_chart.get_collapsed_subplots()
+        state["expanded_events"] = []
+        save_chart_state(state)
         return {"collapsedSubplots": None}
 
-    trace_index = request.args.get("traceIndex", type=int)
-    subplot_index = dotted_chart.get_subplot_by_trace_index(trace_index)
-    dotted_chart.set_collapsed_subplots_at_index(subplot_index)
+    if dotted_chart.render_id != state["render_id"]:
+        # the figure the user clicked on was rendered by another worker, recreate its traces
+        dotted_chart.make_dotted_chart()
 
-    collapsed_subplots = dotted_chart.get_collapsed_subplots()
+    trace_index = request.args.get("traceIndex", type=int)
+    point_index = request.args.get("pointIndex", type=int)
+    events = dotted_chart.trace_to_event.get(trace_index)
+    if events is None:
+        return {"error": "unknown trace index"}
+    if isinstance(events, list) and (point_index is None or not 0 <= point_index < len(events)):
+        # batched traces need the index of the clicked point
+        return {"error": "missing or unknown point index"}
+    dotted_chart.toggle_event(dotted_chart.get_event_by_trace_index(trace_index, point_index))
+
+    handle_shared_variables(dotted_chart, state)
     return {"collapsedSubplots": None}
 
 
@@ -105,10 +267,10 @@ def toggle_subplot():
 def apply_activity_filter():
     if request.method == "POST":
         data = request.get_json()
-        global selected_activities, dotted_chart
+        state = get_chart_state()
 
-        selected_activities = data.get("selectedActivities", [])
-        dotted_chart.set_selected_activities(selected_activities)
+        state["selected_activities"] = data.get("selectedActivities", [])
+        save_chart_state(state)
 
         return {"selectedActivities": None}
 
@@ -117,15 +279,16 @@ def apply_activity_filter():
 def apply_object_filter():
     if request.method == "POST":
         data = request.get_json()
-        global selected_object_types, dotted_chart
+        state = get_chart_state()
 
-        selected_object_types = data.get("selectedObjectTypes", [])
-        dotted_chart.set_selected_object_types(selected_object_types)
+        state["selected_object_types"] = data.get("selectedObjectTypes", [])
+        save_chart_state(state)
 
         return {"selectedObjects": None}
 
 
 @chart.route("/get-general-metrics", methods=["GET"])
+@caching_utils.conditional
 def get_general_metrics():
     response = {
         "error": "",
@@ -134,6 +297,8 @@ def get_general_metrics():
     }
     if request.args.get("filename"):
         filename = request.args.get("filename")
+        if ingest_utils.get_ingest_state(filename) == "processing":
+            return {"processing": True}, 202
         response["error"] = "False"
         response["data"] = perf.get_general_metrics(filename)
     else:
@@ -143,11 +308,14 @@ def get_general_metrics():
 
 
 @chart.route("/get-object-lifecycle", methods=["GET"])
+@caching_utils.conditional
 def get_object_lifecycle():
     response = {"error": "", "errorMessage": "", "data": ""}
     if request.args.get("filename") and request.args.get("oid"):
         filename = request.args.get("filename")
         oid = request.args.get("oid")
+        if ingest_utils.get_ingest_state(filename) == "processing":
+            return {"processing": True}, 202
         response["error"] = "False"
         data = perf.get_object_lifecycle(oid, filename)
         if data["error"] == True:
@@ -161,13 +329,41 @@ def get_object_lifecycle():
     return response
 
 
+@chart.route("/get-object-lifecycles", methods=["GET"])
+@caching_utils.conditional
+def get_object_lifecycles():
+    """
+    returns the lifecycles of several objects, expects the oid parameter once per object
+    """
+    response = {"error": "", "errorMessage": "", "data": ""}
+    oids = request.args.getlist("oid")
+    if request.args.get("filename") and oids:
+        filename = request.args.get("filename")
+        if ingest_utils.get_ingest_state(filename) == "processing":
+            return {"processing": True}, 202
+        response["error"] = "False"
+        data = perf.get_object_lifecycles(oids, filename)
+        if data.get("error") == True:
+            response["error"] = True
+            response["errorMessage"] = data["errorMessage"]
+        else:
+            response["data"] = data
+    else:
+        response["error"] = True
+        response["errorMessage"] = "missing file or object id parameter"
+    return response
+
+
 @chart.route("/get-object-attributes", methods=["GET"])
+@caching_utils.conditional
 def get_object_attributes():
     response = {"error": "", "errorMessage": "", "data": ""}
 
     if request.args.get("filename") and request.args.get("oid"):
         filename = request.args.get("filename")
         oid = request.args.get("oid")
+        if ingest_utils.get_ingest_state(filename) == "processing":
+            return {"processing": True}, 202
         response["error"] = "False"
         response["data"] = perf.get_object_attributes(oid, filename)
     else:
@@ -177,11 +373,14 @@ def get_object_attributes():
 
 
 @chart.route("/get-event-attributes", methods=["GET"])
+@caching_utils.conditional
 def get_event_attributes():
     response = {"error": "", "errorMessage": "", "data": ""}
     if request.args.get("filename") and request.args.get("eid"):
         filename = request.args.get("filename")
         eid = request.args.get("eid")
+        if ingest_utils.get_ingest_state(filename) == "processing":
+            return {"processing": True}, 202
         response["error"] = "False"
         response["data"] = perf.get_event_attributes(eid, filename)
     else:
@@ -190,22 +389,98 @@ def get_event_attributes():
     return response
 
 
-def handle_shared_variables():
-    global dotted_chart, selected_activities, selected_object_types, collapsed_subplots
+def get_chart_state():
+    """
+    returns the chart state of the current session
+    """
+    state = {
+        "filename": None,
+        "view": "eventID",
+        "render_mode": "webgl",
+        "selected_activities": [],
+        "selected_object_types": [],
+        # ids of the expanded events, all other events are collapsed
+        "expanded_events": [],
+        "start_time": None,
+        "end_time": None,
+        # page of the paginated eventID view, see Chart.set_page
+        "page_size": None,
+        "cursor": None,
+        "cursor_time": None,
+        "page_direction": "next",
+        # identifies the last figure sent to the session
+        "render_id": None,
+    }
+    state.update(session.get("chart_state", {}))
+    return state
+
+
+def save_chart_state(state):
+    session["chart_state"] = state
+
+
+def get_chart(state):
+    """
+    returns the chart of the session if this worker still holds it, otherwise rebuilds it from the session state
+    filters are only re-applied if they changed since the last request
+    """
+    start_date, end_date = extract_datetime(state["start_time"], state["end_time"])
+    cursor_time = extract_timestamp(state["cursor_time"])
+
+    sid = getattr(session, "sid", None)
+    with charts_lock:
+        dotted_chart = charts.get(sid)
+        if dotted_chart is not None:
+            charts.move_to_end(sid)
+
+    if dotted_chart is None or not dotted_chart.matches(
+        state["filename"], state["view"], state["render_mode"]
+    ):
+        dotted_chart = Chart(
+            state["filename"],
+            state["view"],
+            state["expanded_events"],
+            state["selected_activities"],
+            state["selected_object_types"],
+            start_date,
+            end_date,
+            state["render_mode"],
+        )
+        if sid is not None:
+            with charts_lock:
+                charts[sid] = dotted_chart
+                if len(charts) > CHART_CACHE_SIZE:
+                    charts.popitem(last=False)
+    else:
+        dotted_chart.set_selected_activities(state["selected_activities"])
+        dotted_chart.set_selected_object_types(state["selected_object_types"])
+        dotted_chart.set_dates(start_date, end_date)
+        dotted_chart.set_expanded_events(state["expanded_events"])
+    dotted_chart.set_page(
+        state["page_size"], state["cursor"], cursor_time, state["page_direction"]
+    )
+    return dotted_chart
+
 
+def handle_shared_variables(dotted_chart, state):
+    """
+    stores the filters and expanded events of the chart in the session
+    """
     selected_activities = dotted_chart.get_selected_activities()
     selected_object_types = dotted_chart.get_selected_object_types()
-    collapsed_subplots = dotted_chart.get_collapsed_subplots()
-    selected_activities = (
+    state["selected_activities"] = (
         selected_activities.tolist()
         if isinstance(selected_activities, np.ndarray)
         else selected_activities
     )
-    selected_object_types = (
+    state["selected_object_types"] = (
         selected_object_types.tolist()
         if not isinstance(selected_object_types, list)
         else selected_object_types
     )
+    state["expanded_events"] = dotted_chart.get_expanded_events()
+    save_chart_state(state)
+
     all_activities = (
         dotted_chart.get_activity_list().tolist()
         if isinstance(dotted_chart.get_activity_list(), np.ndarray)
@@ -214,6 +489,54 @@ def handle_shared_variables():
     return all_activities
 
 
+def get_figure_key(state, stored_only=False):
+    """
+    returns a canonical hash of the file content and the chart state, used as ETag and figure cache key
+    returns None if the file can not be hashed
+    with stored_only only the stored content hash and the cached profile are used, None is returned if
+    either is missing
+    """
+    # no selected activities and all activities selected result in the same figure
+    selected_activities = sorted(state["selected_activities"])
+    try:
+        if stored_only:
+            profile = get_cached_profile(state["filename"])
+            if profile is None:
+                return None
+        else:
+            profile = get_profile(state["filename"])
+        if selected_activities == sorted(profile["activities"]):
+            selected_activities = []
+    except Exception:
+        return None
+
+    return caching_utils.get_etag(
+        state["filename"],
+        "scatterplot",
+        state["view"],
+        state["render_mode"],
+        selected_activities,
+        sorted(state["selected_object_types"]),
+        sorted(state["expanded_events"]),
+        state["start_time"],
+        state["end_time"],
+        state["page_size"],
+        state["cursor"],
+        state["cursor_time"],
+        state["page_direction"],
+        stored_only=stored_only,
+    )
+
+
+def json_response(response):
+    """
+    serializes a response containing a figure in a single pass, already serialized responses are sent as they are
+    """
+    if not isinstance(response, str):
+        response = serialization_utils.dumps(response)
+    return Response(response, mimetype="application/json")
+
+
 def extract_datetime(start_date, end_date):
     try:
         start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M")
@@ -224,3 +547,25 @@ def extract_datetime(start_date, end_date):
     except Exception:
         end_date = None
     return start_date, end_date
+
+
+def extract_timestamp(timestamp):
+    try:
+        timestamp = pd.Timestamp(timestamp)
+    except Exception:
+        return None
+    return None if pd.isna(timestamp) else timestamp
+
+
+def extract_viewport(x_start, x_end, y_start, y_end):
+    try:
+        x_range = (pd.Timestamp(x_start), pd.Timestamp(x_end))
+        if pd.isna(x_range[0]) or pd.isna(x_range[1]):
+            x_range = None
+    except Exception:
+        x_range = None
+    try:
+        y_range = (float(y_start), float(y_end))
+    except Exception:
+        y_range = None
+    return x_range, y_range
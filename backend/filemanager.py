@@ -1,10 +1,15 @@
+import os
+
 from flask import Blueprint, request
-import pm4py
-import pandas as pd
+from utils.chart_utils import ingest_utils, ocel_cache
 from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import preview_utils, sqlite_utils
+from utils.http_utils import caching_utils
 
 filemanager = Blueprint("filemanager", __name__)
 
+supportedFileTypes = [".csv", ".jsonocel", ".xmlocel", ".sqlite"]
+
 '''
 file upload
 parameters: file in the request
@@ -30,12 +35,19 @@ def upload_file():
         return response
 
     # Check if file format is supported
-    supportedFileTypes = [".csv", ".jsonocel", ".xmlocel"]
     if fu.get_file_exension(file.filename) not in supportedFileTypes:
         response["error"] = True
         response["errorMessage"] = "file type is not supported, please choose a different file"
         return response
 
+    # Check if the content matches the file format
+    head = file.stream.read(fu.HEADER_SIZE)
+    file.stream.seek(0)
+    if not fu.check_ocel_header(file.filename, head):
+        response["error"] = True
+        response["errorMessage"] = "the file is not a valid event log of its file type"
+        return response
+
     # Check if a file with the same name already exists
     if fu.check_file_exists(file.filename):
         response["error"] = True
@@ -48,6 +60,13 @@ def upload_file():
 
         # check if file safe was successful
         if fu.check_file_exists(file.filename):
+            # databases get the indexes of their queries before they are ingested
+            if sqlite_utils.is_sqlite(file.filename) and not sqlite_utils.prepare_upload(file.filename):
+                fu.delete_file(file.filename)
+                response["error"] = True
+                response["errorMessage"] = "the file is not a valid event log of its file type"
+                return response
+            ingest_utils.enqueue_ingest(file.filename)
             response["error"] = False
             response["errorMessage"] = ""
             return response
@@ -57,6 +76,123 @@ def upload_file():
             return response
 
 
+'''
+resumable chunked file upload, the chunk is sent as the raw request body
+expects filename and offset as query parameters, final=true marks the last chunk
+the offset has to match the number of bytes received so far, see /upload-status
+example: /upload-chunk?filename=FILE.jsonocel&offset=0
+'''
+@filemanager.route("/upload-chunk", methods=['POST'])
+def upload_chunk():
+    response = {
+        "error": "",
+        "errorMessage": "",
+        "received": 0
+    }
+    filename = request.args.get('filename', '')
+    offset = request.args.get('offset', type=int)
+
+    # check if there is a filename
+    if filename == '' or os.path.basename(filename) != filename:
+        response["error"] = True
+        response["errorMessage"] = "no filename found"
+        return response
+
+    # Check if file format is supported
+    if fu.get_file_exension(filename) not in supportedFileTypes:
+        response["error"] = True
+        response["errorMessage"] = "file type is not supported, please choose a different file"
+        return response
+
+    # Check if a file with the same name already exists
+    if fu.check_file_exists(filename):
+        response["error"] = True
+        response["errorMessage"] = "a file with the same name already exists, please choose a different file"
+        return response
+
+    head = b""
+    if offset == 0:
+        # a new upload, check the header in the first chunk before anything is written
+        fu.discard_upload(filename)
+        head = request.stream.read(fu.HEADER_SIZE)
+        if not fu.check_ocel_header(filename, head):
+            response["error"] = True
+            response["errorMessage"] = "the file is not a valid event log of its file type"
+            return response
+
+    # chunks have to arrive in order, the client can resume at the received size
+    received = fu.get_received_size(filename)
+    if offset != received:
+        response["error"] = True
+        response["errorMessage"] = "chunk offset does not match the received size"
+        response["received"] = received
+        return response
+
+    response["received"] = fu.append_chunk(filename, request.stream, head)
+
+    if request.args.get('final') == "true":
+        fu.complete_upload(filename)
+        if sqlite_utils.is_sqlite(filename) and not sqlite_utils.prepare_upload(filename):
+            fu.delete_file(filename)
+            response["error"] = True
+            response["errorMessage"] = "the file is not a valid event log of its file type"
+            return response
+        ingest_utils.enqueue_ingest(filename)
+
+    response["error"] = False
+    return response
+
+
+'''
+returns the number of bytes of a chunked upload that have been received so far
+expects filename as query parameter
+example: /upload-status?filename=FILE.jsonocel
+'''
+@filemanager.route("/upload-status", methods=['GET'])
+def upload_status():
+    filename = request.args.get('filename', '')
+    response = {
+        "error": False,
+        "errorMessage": "",
+        "received": 0
+    }
+    if filename == '' or os.path.basename(filename) != filename:
+        response["error"] = True
+        response["errorMessage"] = "no filename found"
+        return response
+    response["received"] = fu.get_received_size(filename)
+    return response
+
+
+'''
+reports the progress of the background ingest of a file, per stage
+the chart endpoints answer with "processing" until the state is "ready"
+expects filename as query parameter
+example: /ingest-status?filename=FILE.jsonocel
+'''
+@filemanager.route('/ingest-status', methods=['GET'])
+def ingest_status():
+    filename = request.args.get('filename', '')
+    response = {
+        "error": "",
+        "errorMessage": "",
+        "status": ""
+    }
+    if filename == '' or os.path.basename(filename) != filename or not fu.check_file_exists(filename):
+        response["error"] = True
+        response["errorMessage"] = "file not found"
+        return response
+
+    status = ingest_utils.read_status(filename)
+    if status is None:
+        # files uploaded before the ingest existed are ingested on their first request
+        ingest_utils.get_ingest_state(filename)
+        status = ingest_utils.read_status(filename)
+    response["error"] = False
+    response["status"] = status
+    return response
+
+
 '''
 returns a json array of the files that currently exist in /tmp/data
 no parameters
@@ -116,6 +252,7 @@ expects filename as query parameter
 example: /file-preview?filename=FILE.txt
 '''
 @filemanager.route('/file-preview', methods=['GET'])
+@caching_utils.conditional
 def file_preview():
     filename = request.args.get('filename')
     response = {
@@ -137,18 +274,18 @@ def file_preview():
         # check file extension
         match file_extension:
             case ".csv":
-                log = pd.read_csv(filepath)
+                log = preview_utils.read_csv_preview(filepath)
             case ".xmlocel":
-                ocel = pm4py.read.read_ocel_xml(filepath)
-                log = ocel.get_extended_table()
+                log = preview_utils.read_xmlocel_preview(filepath)
             case ".jsonocel":
-                ocel = pm4py.read.read_ocel_json(filepath)
-                log = ocel.get_extended_table()
+                log = preview_utils.read_jsonocel_preview(filepath)
+            case ".sqlite":
+                log = preview_utils.read_sqlite_preview(filepath)
             case _:
                 response["error"] = True
                 response["errorMessage"] = "file format not supported"
                 return response
-        return log.head(15).to_json(orient="records")
+        return log.head(preview_utils.PREVIEW_ROWS).to_json(orient="records")
     else:
         response["error"] = True
         response["errorMessage"] = "file not found"
@@ -170,6 +307,7 @@ def delete_file():
     filename = request.args.get('filename')
     if fu.check_file_exists(filename):
         fu.delete_file(filename)
+        ocel_cache.invalidate(filename)
         # check if the file has been deleted
         if not fu.check_file_exists(filename):
             return response
@@ -0,0 +1,147 @@
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pm4py
+import pytest
+from flask_session.sessions import FileSystemSessionInterface
+from pm4py.objects.ocel.obj import OCEL
+
+from app import app
+from utils.chart_utils import figure_cache, ingest_utils
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sqlite_utils
+
+
+def make_ocel(events: int, object_types: int = 3, activities: int = 5, seed: int = 0) -> OCEL:
+    """
+    Builds a small deterministic event log, the events are numbered in time order and every event
+    is related to one to three objects
+
+    Args:
+        events (int): number of events
+        object_types (int): number of object types, named type0, type1, ...
+        activities (int): number of activities, named activity 0, activity 1, ...
+        seed (int): seed of the random generator
+
+    Returns:
+        OCEL:
+    """
+    rng = random.Random(seed)
+    objects_per_type = max(1, events // 5)
+    timestamp = datetime(2020, 1, 1)
+    event_rows, relation_rows = [], []
+    for index in range(events):
+        timestamp += timedelta(seconds=rng.randint(1, 120))
+        activity = "activity {}".format(rng.randrange(activities))
+        event_rows.append({"ocel:eid": str(index), "ocel:activity": activity, "ocel:timestamp": timestamp, "amount": float(index % 7)})
+        related = {
+            (type_index, rng.randrange(objects_per_type))
+            for type_index in rng.sample(range(object_types), rng.randint(1, min(3, object_types)))
+        }
+        for type_index, object_index in sorted(related):
+            relation_rows.append(
+                {
+                    "ocel:eid": str(index),
+                    "ocel:activity": activity,
+                    "ocel:timestamp": timestamp,
+                    "ocel:oid": "o{}-{}".format(type_index, object_index),
+                    "ocel:type": "type{}".format(type_index),
+                    "ocel:qualifier": "",
+                }
+            )
+    object_rows = [
+        {"ocel:oid": "o{}-{}".format(t, o), "ocel:type": "type{}".format(t), "weight": "w{}".format(o % 3)}
+        for t in range(object_types)
+        for o in range(objects_per_type)
+    ]
+    return OCEL(pd.DataFrame(event_rows), pd.DataFrame(object_rows), pd.DataFrame(relation_rows))
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """
+    Points the standard file location at a temporary directory, so the tests never touch real logs
+    """
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    monkeypatch.setattr(fu, "DATA_DIR", str(data_dir))
+    return data_dir
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # the sessions are written to the temporary directory instead of the working directory
+    session_interface = FileSystemSessionInterface(str(tmp_path / "flask_session"), 500, 0o600, "session:")
+    monkeypatch.setattr(app, "session_interface", session_interface)
+    return app.test_client()
+
+
+@pytest.fixture
+def make_log():
+    """
+    Writes logs built by make_ocel to the standard file location
+    """
+
+    def write(extension: str = ".jsonocel", **kwargs) -> str:
+        file_name = "test-{}{}".format(uuid.uuid4().hex, extension)
+        pm4py.write_ocel(make_ocel(**kwargs), fu.get_path_from_name(file_name))
+        return file_name
+
+    return write
+
+
+# parameters of the log_file fixture
+LOG_PARAMETERS = dict(events=300, object_types=3, activities=5, seed=1)
+
+
+@pytest.fixture
+def log_file(make_log):
+    """
+    A log whose ingest has finished, like an upload some time ago
+    """
+    file_name = make_log(**LOG_PARAMETERS)
+    ingest_utils.run_ingest(file_name, ingest_utils.new_status(file_name))
+    return file_name
+
+
+@pytest.fixture
+def sqlite_log():
+    """
+    The log of log_file stored as OCEL 2.0 database, prepared and ingested like an upload
+    """
+    file_name = "test-{}.sqlite".format(uuid.uuid4().hex)
+    pm4py.write_ocel2_sqlite(make_ocel(**LOG_PARAMETERS), fu.get_path_from_name(file_name))
+    assert sqlite_utils.prepare_upload(file_name)
+    ingest_utils.run_ingest(file_name, ingest_utils.new_status(file_name))
+    return file_name
+
+
+@pytest.fixture(autouse=True)
+def empty_figure_cache(monkeypatch):
+    """
+    Starts every test with an empty figure cache, the generated logs of different tests have the same content
+    """
+    monkeypatch.setattr(figure_cache, "cache", figure_cache.FigureCache(figure_cache.DEFAULT_MAX_BYTES))
+
+
+def finish_ingests():
+    """
+    Waits for the ingest jobs queued in this process
+    """
+    with ingest_utils.executor_lock:
+        executor, ingest_utils.executor = ingest_utils.executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+@pytest.fixture(autouse=True)
+def wait_for_ingest():
+    """
+    Returns a function that waits for the queued ingest jobs, the remaining jobs are finished before
+    the temporary directory is left
+    """
+    yield finish_ingests
+    finish_ingests()
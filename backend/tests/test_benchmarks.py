@@ -0,0 +1,66 @@
+import os
+
+import pm4py
+import pytest
+
+from benchmarks.generate_ocel import SyntheticOcel
+from benchmarks.run_benchmarks import RESULT_VERSION, Benchmark, compare
+from utils.filemanager_utils import filemanager_utils as fu
+
+
+@pytest.mark.parametrize("extension", [".jsonocel", ".xmlocel"])
+def test_generated_log_is_deterministic_and_parses(tmp_path, extension):
+    generator = SyntheticOcel(200, object_types=4, objects_per_event=3, activities=6, attributes=2, seed=3)
+    first, second = str(tmp_path / ("first" + extension)), str(tmp_path / ("second" + extension))
+    generator.write(first)
+    SyntheticOcel(200, object_types=4, objects_per_event=3, activities=6, attributes=2, seed=3).write(second)
+
+    with open(first, "rb") as f, open(second, "rb") as g:
+        assert f.read() == g.read()
+
+    ocel = pm4py.read_ocel(first)
+    events = list(generator.iter_events())
+    assert ocel.events["ocel:eid"].tolist() == [event[0] for event in events]
+    assert ocel.events["ocel:activity"].tolist() == [event[1] for event in events]
+    assert set(pm4py.ocel_get_object_types(ocel)) <= set(generator.object_types)
+    assert {"event_attribute0", "event_attribute1"} <= set(ocel.events.columns)
+    assert len(ocel.relations) == sum(len(event[3]) for event in events)
+
+
+def test_generated_events_are_ordered_and_related():
+    events = list(SyntheticOcel(500, objects_per_event=2, seed=1).iter_events())
+
+    assert all(a[2] < b[2] for a, b in zip(events, events[1:]))
+    assert all(1 <= len(event[3]) <= 2 and len(set(event[3])) == len(event[3]) for event in events)
+
+
+def test_benchmark_times_every_stage(client, tmp_path):
+    results = Benchmark(300, ".jsonocel", 1, str(tmp_path)).run()
+    stages = {result["stage"] for result in results}
+
+    assert {"generate", "pm4py.read_ocel", "/filemanager/upload-file", "ingest"} <= stages
+    assert any(stage.startswith("/chartapi/") for stage in stages)
+    assert all(result["median"] >= 0 and result["scale"] == 300 for result in results)
+    # the uploaded and generated logs are removed
+    assert not fu.check_file_exists("benchmark-300.jsonocel")
+    assert not os.path.exists(tmp_path / "benchmark-300.jsonocel")
+
+
+def make_results(medians: dict) -> dict:
+    return {
+        "version": RESULT_VERSION,
+        "results": [
+            {"scale": 10, "format": ".jsonocel", "stage": stage, "median": median} for stage, median in medians.items()
+        ],
+    }
+
+
+def test_compare_reports_regressions():
+    baseline = make_results({"parse": 1.0, "plot": 1.0, "fast": 0.001, "removed": 1.0})
+    results = make_results({"parse": 1.2, "plot": 1.3, "fast": 0.1, "new": 5.0})
+
+    regressions = compare(results, baseline, 0.25)
+    assert [(r["stage"], r["baseline"], r["median"]) for r in regressions] == [("plot", 1.0, 1.3)]
+
+    with pytest.raises(ValueError):
+        compare(results, dict(baseline, version=RESULT_VERSION + 1), 0.25)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from utils.chart_utils import bitmap_utils
+from utils.chart_utils.ocel_cache import get_ocel
+from utils.chart_utils.process_utils import build_event_objects, get_base_df, get_objects_of_event
+
+
+def unpack(bitset: np.ndarray, rows: int) -> list:
+    return np.unpackbits(bitset)[:rows].astype(bool).tolist()
+
+
+def test_bitmap_index_matches_masks(log_file):
+    df = get_base_df(log_file, "eventID", 300)
+    event_objects = build_event_objects(get_ocel(log_file))
+    index = bitmap_utils.build_bitmap_index(df, event_objects)
+
+    assert index["rows"] == len(df)
+    assert sorted(index["activities"]) == sorted(df["activity"].unique())
+    for activity, bitset in index["activities"].items():
+        assert unpack(bitset, len(df)) == (df["activity"] == activity).tolist()
+
+    for object_type, bitset in index["object_types"].items():
+        objects = [get_objects_of_event(event_objects, p) for p in df["relations"]]
+        assert unpack(bitset, len(df)) == [len(o.get(object_type, [])) > 0 for o in objects]
+
+
+def test_flattened_index_has_no_object_types(log_file):
+    df = get_base_df(log_file, "type0")
+    index = bitmap_utils.get_bitmap_index(log_file, "type0")
+
+    assert index["object_types"] == {}
+    assert index is bitmap_utils.get_bitmap_index(log_file, "type0")
+    assert sum(np.unpackbits(bitset)[: len(df)].sum() for bitset in index["activities"].values()) == len(df)
+
+
+def test_union_and_intersection_of_unknown_names():
+    bitsets = {"a": np.packbits([1, 0, 1, 0]), "b": np.packbits([1, 1, 0, 0])}
+    assert unpack(bitmap_utils.union(bitsets, ["a", "b"], 4), 4) == [True, True, True, False]
+    assert unpack(bitmap_utils.intersection(bitsets, ["a", "b"], 4), 4) == [True, False, False, False]
+    # unknown activities match no rows, unknown object types do not filter
+    assert not any(unpack(bitmap_utils.union(bitsets, ["c"], 4), 4))
+    assert all(unpack(bitmap_utils.intersection(bitsets, ["c"], 4), 4))
+
+
+def test_to_mask_unpacks_the_range():
+    mask = np.random.default_rng(0).random(1_000) < 0.3
+    bitset = np.packbits(mask)
+
+    for start, end in [(0, 1_000), (3, 17), (8, 16), (123, 987), (500, 500)]:
+        assert bitmap_utils.to_mask(bitset, start, end).tolist() == mask[start:end].tolist()
@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from utils.filemanager_utils import filemanager_utils as fu
+
+
+def get_chart(client, file_name: str, headers: dict = None, **params):
+    params = dict(filename=file_name, view="eventID", **params)
+    return client.get("/chartapi/scatterplot", query_string=params, headers=headers or {})
+
+
+@pytest.fixture
+def etag(client, log_file):
+    response = get_chart(client, log_file)
+    assert response.status_code == 200
+    assert "figure" in response.get_json()
+    assert response.headers["Cache-Control"] == "no-cache"
+    return response.headers["ETag"]
+
+
+def test_matching_etag_is_not_modified(client, log_file, etag):
+    response = get_chart(client, log_file, {"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.data == b""
+
+
+def test_compressed_etag_is_not_modified(client, log_file, etag):
+    response = get_chart(client, log_file, {"If-None-Match": etag[:-1] + '-gzip"'})
+
+    assert response.status_code == 304
+
+
+def test_changed_parameters_are_modified(client, log_file, etag):
+    response = get_chart(client, log_file, {"If-None-Match": etag}, startTime="2020-01-01 02:00")
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_unknown_etag_is_modified(client, log_file, etag):
+    response = get_chart(client, log_file, {"If-None-Match": '"unknown"'})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+def test_missing_content_hash_falls_back_to_full_response(client, log_file, etag, monkeypatch):
+    os.remove(os.path.join(fu.get_sidecar_dir(log_file), fu.CONTENT_HASH_FILE))
+    hash_file = fu.hash_file
+    hashed = []
+
+    def count_hashes(filepath):
+        hashed.append(filepath)
+        return hash_file(filepath)
+
+    monkeypatch.setattr(fu, "hash_file", count_hashes)
+
+    # the conditional check does not hash the file, the full response does and stores the hash
+    response = get_chart(client, log_file, {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert len(hashed) == 1
+
+    response = get_chart(client, log_file, {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert len(hashed) == 1
+
+
+def test_changed_file_is_modified(client, log_file, etag, wait_for_ingest):
+    with open(fu.get_path_from_name(log_file), "a") as f:
+        f.write(" ")
+
+    # the changed file is ingested again
+    assert get_chart(client, log_file, {"If-None-Match": etag}).status_code == 202
+    wait_for_ingest()
+    response = get_chart(client, log_file, {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_conditional_route(client, log_file):
+    response = client.get("/chartapi/get-general-metrics", query_string={"filename": log_file})
+    assert response.status_code == 200
+
+    headers = {"If-None-Match": response.headers["ETag"]}
+    response = client.get("/chartapi/get-general-metrics", query_string={"filename": log_file}, headers=headers)
+    assert response.status_code == 304
+
+
+def test_large_responses_are_compressed(client, log_file):
+    uncompressed = get_chart(client, log_file)
+    response = get_chart(client, log_file, {"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in uncompressed.headers
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == uncompressed.headers["ETag"][:-1] + '-gzip"'
+    # the marker shapes are chosen at random on every render, the rest of the figure is the same
+    figure = json.loads(gzip.decompress(response.data))["figure"]
+    assert [trace["x"] for trace in figure["data"]] == [trace["x"] for trace in uncompressed.get_json()["figure"]["data"]]
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/chartapi/get-general-metrics", headers={"Accept-Encoding": "gzip"})
+
+    assert len(response.data) < 1024
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,96 @@
+import pytest
+
+from utils.chart_utils import chart as chart_module
+from utils.chart_utils.chart import Chart
+from utils.chart_utils.process_utils import get_objects_of_event
+
+
+def make_chart(file_name: str, render_mode: str = "webgl", expanded_events: list = None) -> Chart:
+    chart = Chart(file_name, "eventID", expanded_events or [], [], [], None, None, render_mode)
+    assert chart.make_dotted_chart() is True
+    return chart
+
+
+def get_event_ids(chart: Chart) -> list:
+    return chart.df["eid"].tolist()
+
+
+@pytest.mark.parametrize("events", [40, 300])
+def test_webgl_trace_count_does_not_grow_with_events(make_log, events):
+    chart = make_chart(make_log(events=events, object_types=3))
+
+    # one heatmap trace plus one trace per object type
+    assert len(chart.fig.data) == 4
+    assert len(chart.df) == events
+    assert len(chart.fig.data[0].x) == events
+    assert all(len(trace.x) == 0 for trace in chart.fig.data[1:])
+
+
+def test_clicked_point_expands_its_event(log_file):
+    chart = make_chart(log_file)
+    row = 5
+    eid = chart.get_event_by_trace_index(0, row)
+    assert eid == str(chart.df["eid"].iloc[row])
+
+    chart.toggle_event(eid)
+    chart.fig = chart.plot_df()
+
+    objects = get_objects_of_event(chart.event_objects, chart.df["relations"].iloc[row])
+    assert len(chart.fig.data[0].x) == len(chart.df) - 1
+    expanded = sum(len(trace.x) for trace in chart.fig.data[1:])
+    assert expanded == sum(len(object_ids) for object_ids in objects.values())
+    # every point of the expanded event maps back to it
+    for trace_index in range(1, len(chart.fig.data)):
+        for point_index in range(len(chart.fig.data[trace_index].x)):
+            assert chart.get_event_by_trace_index(trace_index, point_index) == eid
+
+
+def test_subplots_render_mode_keeps_ten_events(log_file):
+    chart = make_chart(log_file, "subplots")
+
+    assert len(chart.df) == 10
+    assert chart.get_event_by_trace_index(0) == str(chart.df["eid"].iloc[0])
+
+
+def make_flattened_chart(file_name: str, x_range=None, y_range=None) -> Chart:
+    chart = Chart(file_name, "type0", [], [], [], None, None)
+    if x_range is not None or y_range is not None:
+        chart.set_viewport(x_range, y_range)
+    assert chart.make_dotted_chart() is True
+    return chart
+
+
+def count_points(fig) -> int:
+    return sum(len(trace.x) for trace in fig.data)
+
+
+def test_small_flattened_view_is_sent_point_by_point(log_file):
+    chart = make_flattened_chart(log_file)
+
+    assert not chart.is_lod()
+    assert count_points(chart.fig) == len(chart.df)
+
+
+def test_viewport_restricts_raw_points(log_file):
+    full = make_flattened_chart(log_file)
+    timestamps = full.df["timestamp"].sort_values()
+    x_range = (timestamps.iloc[50], timestamps.iloc[150])
+
+    chart = make_flattened_chart(log_file, x_range, (-0.5, 9.5))
+    assert chart.is_lod()
+    visible = chart.df[(chart.df["timestamp"] >= x_range[0]) & (chart.df["timestamp"] <= x_range[1])]
+    first_cases = list(dict.fromkeys(chart.df["case"]))[:10]
+    assert count_points(chart.fig) == visible["case"].isin(first_cases).sum()
+    # the clicked point still identifies its event and case
+    eid, case = chart.fig.data[0].customdata[0]
+    assert ((chart.df["eid"] == eid) & (chart.df["case"] == case)).any()
+
+
+def test_dense_viewport_is_binned(log_file, monkeypatch):
+    monkeypatch.setattr(chart_module, "LOD_POINT_THRESHOLD", 20)
+    chart = make_flattened_chart(log_file)
+
+    assert chart.is_lod()
+    counts = [int(text.split(": ")[1].split()[0]) for trace in chart.fig.data for text in trace.text]
+    assert sum(counts) == len(chart.df)
+    assert count_points(chart.fig) <= chart_module.LOD_TIME_BUCKETS * chart_module.LOD_CASE_BUCKETS * 5
@@ -0,0 +1,17 @@
+def test_flattened_lod_route(client, log_file):
+    response = client.get(
+        "/chartapi/flattened-lod",
+        query_string={
+            "filename": log_file,
+            "view": "type1",
+            "xStart": "2020-01-01 00:00",
+            "xEnd": "2020-01-01 03:00",
+            "yStart": "-0.5",
+            "yEnd": "20.5",
+        },
+    )
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data["lod"] is True
+    assert data["figure"]["layout"]["yaxis"]["range"] == [-0.5, 20.5]
@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from chart_api import charts
+from utils.chart_utils import figure_cache
+from utils.chart_utils.chart import Chart
+from utils.chart_utils.figure_cache import FigureCache, RenderedFigure
+
+
+@pytest.fixture
+def spill_dir(tmp_path):
+    spill_dir = tmp_path / "figures"
+    spill_dir.mkdir()
+    return spill_dir
+
+
+def make_figure(name: str, size: int = 1000) -> RenderedFigure:
+    return RenderedFigure(
+        name.ljust(size, "."),
+        {0: ["e1", "e2"], 3: "e4"},
+        ["activity 0"],
+        ["type1"],
+    )
+
+
+def assert_same_figure(figure: RenderedFigure, expected: RenderedFigure):
+    assert figure.body == expected.body
+    assert figure.trace_to_event == expected.trace_to_event
+    assert figure.selected_activities == expected.selected_activities
+    assert figure.selected_object_types == expected.selected_object_types
+
+
+def test_least_recently_used_figure_is_evicted():
+    figures = {key: make_figure(key) for key in "abc"}
+    cache = FigureCache(2 * figures["a"].nbytes)
+
+    cache.put("a", figures["a"])
+    cache.put("b", figures["b"])
+    # a is used more recently than b now
+    assert cache.get("a") is figures["a"]
+    cache.put("c", figures["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is figures["a"]
+    assert cache.get("c") is figures["c"]
+    assert cache.nbytes == figures["a"].nbytes + figures["c"].nbytes
+
+
+def test_replaced_figure_is_not_counted_twice():
+    cache = FigureCache(10**6)
+    cache.put("a", make_figure("a"))
+    cache.put("a", make_figure("a", 2000))
+
+    assert cache.nbytes == make_figure("a", 2000).nbytes
+
+
+def test_figures_larger_than_the_budget_and_missing_keys_are_not_cached():
+    cache = FigureCache(100)
+    cache.put("a", make_figure("a"))
+    cache.put(None, make_figure("b", 10))
+
+    assert cache.get("a") is None
+    assert cache.get(None) is None
+    assert cache.nbytes == 0
+
+
+def test_evicted_figure_is_spilled_and_loaded_back(spill_dir):
+    figure = make_figure("a")
+    cache = FigureCache(figure.nbytes, str(spill_dir))
+
+    cache.put("a", figure)
+    cache.put("b", make_figure("b"))
+    assert os.listdir(spill_dir) == ["a.json"]
+
+    loaded = cache.get("a")
+    assert_same_figure(loaded, figure)
+    # the figure moved back to memory and b was spilled in its place
+    assert sorted(os.listdir(spill_dir)) == ["b.json"]
+    assert cache.get("a") is loaded
+
+
+def test_round_trip_through_dict():
+    figure = make_figure("a")
+
+    assert_same_figure(RenderedFigure.from_dict(figure.to_dict()), figure)
+
+
+def test_unreadable_spilled_figure_is_ignored(spill_dir):
+    cache = FigureCache(10**6, str(spill_dir))
+    (spill_dir / "a.json").write_text("{")
+
+    assert cache.get("a") is None
+
+
+def test_spill_directory_is_trimmed_to_its_budget(spill_dir):
+    cache = FigureCache(10**6, str(spill_dir))
+    cache.spill("a", make_figure("a"))
+    size = os.path.getsize(spill_dir / "a.json")
+    cache.spill_max_bytes = 2 * size
+    os.utime(spill_dir / "a.json", ns=(0, 0))
+
+    for mtime, key in enumerate("bc", start=1):
+        cache.spill(key, make_figure(key))
+        os.utime(spill_dir / (key + ".json"), ns=(0, mtime * 10**9))
+
+    # the oldest spilled figure is removed first
+    assert sorted(os.listdir(spill_dir)) == ["b.json", "c.json"]
+
+
+def test_figures_are_dropped_without_spill_directory(spill_dir):
+    figure = make_figure("a")
+    cache = FigureCache(figure.nbytes)
+    cache.put("a", figure)
+    cache.put("b", make_figure("b"))
+
+    assert cache.get("a") is None
+    assert cache.read_spilled("a") is None
+
+
+def get_chart(client, file_name: str):
+    return client.get("/chartapi/scatterplot", query_string={"filename": file_name, "view": "eventID"})
+
+
+def test_rendered_figure_is_served_from_the_cache(client, log_file, monkeypatch):
+    response = get_chart(client, log_file)
+    assert response.status_code == 200
+    trace_to_event = dict(next(reversed(charts.values())).trace_to_event)
+
+    def make_dotted_chart(self):
+        raise AssertionError("the figure is rendered again")
+
+    # a new worker without the chart answers from the figure cache
+    charts.clear()
+    monkeypatch.setattr(Chart, "make_dotted_chart", make_dotted_chart)
+    cached = get_chart(client, log_file)
+
+    assert cached.data == response.data
+    assert cached.headers["ETag"] == response.headers["ETag"]
+    assert next(reversed(charts.values())).trace_to_event == trace_to_event
+
+
+def test_styles_do_not_change_between_renders(client, log_file):
+    response = get_chart(client, log_file)
+    figure_cache.cache.entries.clear()
+    charts.clear()
+
+    assert get_chart(client, log_file).data == response.data
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_api
+from utils.chart_utils.chart import Chart
+from utils.chart_utils.process_utils import get_objects_of_event
+
+
+def filter_with_masks(chart: Chart, activities: list, object_types: list, start_time, end_time) -> list:
+    """
+    Filters the base df of a chart with pandas, the way the filters worked before they were memoized
+
+    Returns:
+        list: event ids of the matching rows
+    """
+    df = chart.base_df
+    mask = df["activity"].isin(activities or chart.get_activity_list())
+    if object_types:
+        objects = [get_objects_of_event(chart.event_objects, p) for p in df["relations"]]
+        for o in object_types:
+            mask &= pd.Series([x.get(o) != [] for x in objects], index=df.index)
+    if start_time is not None:
+        mask &= df["timestamp"] >= start_time
+    if end_time is not None:
+        mask &= df["timestamp"] <= end_time
+    return df["eid"][mask].astype(str).tolist()
+
+
+FILTERS = [
+    ([], [], None, None),
+    (["activity 0", "activity 3"], [], None, None),
+    ([], ["type1"], None, None),
+    ([], ["type0", "type2"], None, None),
+    ([], ["unknown type"], None, None),
+    (["activity 1"], ["type2"], "2020-01-01 01:00", "2020-01-01 05:00"),
+    ([], [], "2020-01-01 02:00", None),
+]
+
+
+def to_timestamp(value):
+    return None if value is None else pd.Timestamp(value)
+
+
+@pytest.mark.parametrize("activities, object_types, start_time, end_time", FILTERS)
+def test_event_filters_match_boolean_masks(log_file, activities, object_types, start_time, end_time):
+    chart = Chart(
+        log_file, "eventID", [], list(activities), list(object_types), to_timestamp(start_time), to_timestamp(end_time)
+    )
+    result = chart.make_dotted_chart()
+
+    expected = filter_with_masks(chart, activities, object_types, to_timestamp(start_time), to_timestamp(end_time))
+    if not expected:
+        assert result is not True
+    else:
+        assert result is True
+        assert chart.df["eid"].astype(str).tolist() == expected
+
+
+@pytest.mark.parametrize("activities, start_time", [([], None), (["activity 2", "activity 4"], "2020-01-01 03:00")])
+def test_flattened_filters_match_boolean_masks(log_file, activities, start_time):
+    chart = Chart(log_file, "type1", [], list(activities), [], to_timestamp(start_time), None)
+    assert chart.make_dotted_chart() is True
+
+    df = chart.base_df
+    mask = df["activity"].isin(activities or chart.get_activity_list())
+    if start_time is not None:
+        mask &= df["timestamp"] >= pd.Timestamp(start_time)
+    expected = df[mask]
+    assert chart.df["eid"].astype(str).tolist() == expected["eid"].astype(str).tolist()
+    assert chart.df["case"].astype(str).tolist() == expected["case"].astype(str).tolist()
+
+
+def test_changed_filters_reuse_the_other_masks(log_file):
+    chart = Chart(log_file, "eventID", [], ["activity 1"], [], None, None)
+    assert chart.make_dotted_chart() is True
+    base_df = chart.base_df
+    time_index = chart.time_index
+    activity_bitset = chart.filter_bitsets["activities"][1]
+
+    chart.set_dates(pd.Timestamp("2020-01-01 02:00"), None)
+    assert chart.make_dotted_chart() is True
+    assert chart.base_df is base_df
+    assert chart.time_index is time_index
+    assert chart.filter_bitsets["activities"][1] is activity_bitset
+    assert set(chart.df["activity"]) == {"activity 1"}
+    assert (chart.df["timestamp"] >= pd.Timestamp("2020-01-01 02:00")).all()
+
+    # removing the filter shows all events again
+    chart.set_selected_activities([])
+    chart.set_dates(None, None)
+    assert chart.make_dotted_chart() is True
+    assert len(chart.df) == len(base_df)
+
+
+def test_dates_of_events_are_included(log_file):
+    chart = Chart(log_file, "type1", [], [], [], None, None)
+    assert chart.make_dotted_chart() is True
+    timestamps = chart.base_df["timestamp"]
+    start, end = timestamps.iloc[10], timestamps.iloc[20]
+
+    chart.set_dates(start, end)
+    assert chart.make_dotted_chart() is True
+    assert chart.df["timestamp"].tolist() == timestamps[(timestamps >= start) & (timestamps <= end)].tolist()
+    assert chart.df.index.equals(pd.RangeIndex(len(chart.df)))
+
+
+def test_date_window_is_a_slice_of_the_base_df(log_file):
+    chart = Chart(log_file, "type1", [], [], [], pd.Timestamp("2020-01-01 01:00"), pd.Timestamp("2020-01-01 03:00"))
+    assert chart.make_dotted_chart() is True
+
+    assert 0 < len(chart.df) < len(chart.base_df)
+    assert np.shares_memory(chart.df["timestamp"].to_numpy(), chart.base_df["timestamp"].to_numpy())
+
+
+
+def test_scatterplot_reuses_the_chart(client, log_file):
+    query = {"filename": log_file, "view": "eventID"}
+    assert "figure" in client.get("/chartapi/scatterplot", query_string=query).get_json()
+    assert len(chart_api.charts) > 0
+    chart = next(reversed(chart_api.charts.values()))
+
+    client.post("/chartapi/apply-activity-filter", json={"selectedActivities": ["activity 2"]})
+    data = client.get("/chartapi/scatterplot", query_string=query).get_json()
+    assert next(reversed(chart_api.charts.values())) is chart
+    assert data["selected_activities"] == ["activity 2"]
+    assert set(chart.df["activity"]) == {"activity 2"}
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+
+import pm4py
+import pytest
+
+from utils.chart_utils import ingest_utils, ocel_cache, process_utils, profile_utils
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sidecar_utils
+
+
+def get_chart(client, file_name: str):
+    return client.get("/chartapi/scatterplot", query_string={"filename": file_name, "view": "eventID"})
+
+
+class Executor:
+    """
+    records the submitted jobs instead of running them, so that the files stay in processing
+    """
+
+    def __init__(self):
+        self.started = []
+        self.lock = threading.Lock()
+
+    def submit(self, fn, file_name, status):
+        with self.lock:
+            self.started.append(file_name)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = Executor()
+    monkeypatch.setattr(ingest_utils, "get_executor", lambda: executor)
+    return executor
+
+
+def test_ingest_runs_every_stage(client, make_log, wait_for_ingest):
+    file_name = make_log(events=100)
+
+    assert ingest_utils.get_ingest_state(file_name) == "processing"
+    wait_for_ingest()
+    status = client.get("/filemanager/ingest-status", query_string={"filename": file_name}).get_json()["status"]
+
+    assert status["state"] == "ready"
+    assert status["stages"] == {stage: "done" for stage in ingest_utils.STAGES}
+    assert status["flattened"] == [3, 3]
+    assert sidecar_utils.check_sidecar_valid(file_name)
+    assert sorted(sidecar_utils.read_flattened_views(file_name)) == ["type0", "type1", "type2"]
+
+
+def test_chart_answers_while_processing(client, make_log, wait_for_ingest):
+    file_name = make_log(events=100)
+
+    response = get_chart(client, file_name)
+    assert response.status_code == 202
+    assert response.get_json() == {"processing": True}
+
+    wait_for_ingest()
+    assert "figure" in get_chart(client, file_name).get_json()
+
+
+def test_flattened_views_are_read_from_the_sidecar(log_file, monkeypatch):
+    expected = pm4py.ocel_flattening(ocel_cache.get_ocel(log_file), "type1")
+
+    def ocel_flattening(*args, **kwargs):
+        raise AssertionError("the log was flattened again")
+
+    monkeypatch.setattr(pm4py, "ocel_flattening", ocel_flattening)
+    df = process_utils.process_flatten_df(log_file, "type1")
+    assert sorted(df["eid"].astype(str)) == sorted(expected["ocel:eid"].astype(str))
+    assert df["timestamp"].is_monotonic_increasing
+
+
+def test_failed_stage_is_reported(make_log, monkeypatch):
+    file_name = make_log(events=40)
+
+    def build_metrics(file_name, status):
+        raise ValueError("no metrics")
+
+    monkeypatch.setitem(ingest_utils.STAGE_BUILDERS, "metrics", build_metrics)
+    ingest_utils.run_ingest(file_name, ingest_utils.new_status(file_name))
+    status = ingest_utils.read_status(file_name)
+
+    assert status["state"] == "failed"
+    assert status["stages"]["metrics"] == "failed"
+    assert status["stages"]["flatten"] == "pending"
+    assert status["error"] == "no metrics"
+    assert ingest_utils.get_ingest_state(file_name) == "failed"
+
+
+def test_stale_and_outdated_jobs_are_started_again(make_log, executor):
+    file_name = make_log(events=40)
+    started = executor.started
+
+    status = ingest_utils.new_status(file_name)
+    ingest_utils.write_status(file_name, status)
+    assert ingest_utils.get_ingest_state(file_name) == "processing"
+    assert started == []
+
+    # the process running the job died
+    status_path = os.path.join(fu.get_sidecar_dir(file_name), ingest_utils.STATUS_FILE)
+    with open(status_path, "w") as f:
+        json.dump(dict(status, updated_at=time.time() - ingest_utils.STALE_SECONDS - 1), f)
+    assert ingest_utils.get_ingest_state(file_name) == "processing"
+    assert started == [file_name]
+
+    # a finished job of an older version of the file
+    ingest_utils.write_status(file_name, dict(status, state="ready"))
+    with open(fu.get_path_from_name(file_name), "a") as f:
+        f.write(" ")
+    assert ingest_utils.read_status(file_name) is None
+    assert ingest_utils.get_ingest_state(file_name) == "processing"
+    assert started == [file_name, file_name]
+
+
+@pytest.mark.parametrize("stale", [False, True])
+def test_concurrent_requests_start_one_job(make_log, executor, stale):
+    file_name = make_log(events=40)
+    if stale:
+        status = ingest_utils.new_status(file_name)
+        ingest_utils.write_status(file_name, status)
+        status_path = os.path.join(fu.get_sidecar_dir(file_name), ingest_utils.STATUS_FILE)
+        with open(status_path, "w") as f:
+            json.dump(dict(status, updated_at=time.time() - ingest_utils.STALE_SECONDS - 1), f)
+
+    barrier = threading.Barrier(8)
+    states = []
+
+    def request():
+        barrier.wait()
+        states.append(ingest_utils.get_ingest_state(file_name))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert states == ["processing"] * 8
+    assert executor.started == [file_name]
+    assert ingest_utils.read_status(file_name)["state"] == "queued"
+    assert ingest_utils.get_ingest_state(file_name) == "processing"
+    assert executor.started == [file_name]
+
+
+def test_deleted_file_leaves_no_sidecar(make_log, monkeypatch):
+    file_name = make_log(events=40)
+    parse_log = ingest_utils.STAGE_BUILDERS["parse"]
+
+    def delete_after_parsing(file_name, status):
+        parse_log(file_name, status)
+        fu.delete_file(file_name)
+
+    monkeypatch.setitem(ingest_utils.STAGE_BUILDERS, "parse", delete_after_parsing)
+    ingest_utils.run_ingest(file_name, ingest_utils.new_status(file_name))
+
+    assert not os.path.exists(fu.get_sidecar_dir(file_name))
+    assert profile_utils.write_profile(file_name, {}) is None
+    assert not os.path.exists(fu.get_sidecar_dir(file_name))
+
+
+@pytest.mark.parametrize(
+    "route, params",
+    [
+        ("/chartapi/flattened-lod", {"view": "type0"}),
+        ("/chartapi/get-general-metrics", {}),
+        ("/chartapi/get-object-lifecycle", {"oid": "o0"}),
+        ("/chartapi/get-object-lifecycles", {"oid": "o0"}),
+        ("/chartapi/get-object-attributes", {"oid": "o0"}),
+        ("/chartapi/get-event-attributes", {"eid": "e0"}),
+    ],
+)
+def test_routes_answer_while_processing(client, make_log, executor, route, params):
+    file_name = make_log(events=40)
+
+    response = client.get(route, query_string=dict(params, filename=file_name))
+
+    assert response.status_code == 202
+    assert response.get_json() == {"processing": True}
+
+
+def test_toggle_subplot_answers_while_processing(client, make_log, executor):
+    file_name = make_log(events=40)
+    assert get_chart(client, file_name).status_code == 202
+
+    response = client.get("/chartapi/toggle-subplot", query_string={"traceIndex": 0, "pointIndex": 0})
+
+    assert response.status_code == 202
+    assert response.get_json() == {"processing": True}
+
+
+def test_ingest_status_of_unknown_file(client):
+    response = client.get("/filemanager/ingest-status", query_string={"filename": "unknown.jsonocel"})
+
+    assert response.get_json()["error"] is True
@@ -0,0 +1,115 @@
+import pytest
+from flask import g
+
+from app import app
+from utils.chart_utils.chart import Chart
+from utils.http_utils import metrics_utils
+
+
+def get_chart(client, file_name: str, **params):
+    params = dict(filename=file_name, view="eventID", **params)
+    return client.get("/chartapi/scatterplot", query_string=params)
+
+
+def get_server_timing(response) -> dict:
+    entries = [entry.split(";") for entry in response.headers["Server-Timing"].split(", ")]
+    return {name: float(duration.split("=")[1]) for name, duration in entries}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics_utils.Histogram("test_seconds", "Test durations.", "stage", buckets=(0.1, 1))
+    histogram.observe("load", 0.05)
+    histogram.observe("load", 0.5)
+    histogram.observe("load", 5)
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP test_seconds Test durations.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{stage="load",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="load",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="load",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{stage="load"} 5.55' in lines
+    assert 'test_seconds_count{stage="load"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = metrics_utils.Counter("test_total", "Test counter.", "stage")
+    counter.inc('a "quoted" stage')
+    counter.inc('a "quoted" stage')
+
+    assert counter.render()[-1] == 'test_total{stage="a \\"quoted\\" stage"} 2'
+
+
+def test_chart_response_has_server_timing(client, log_file):
+    response = get_chart(client, log_file)
+
+    assert response.status_code == 200
+    timings = get_server_timing(response)
+    assert {"load", "filter", "plot", "serialize", "total"} <= set(timings)
+    assert all(duration >= 0 for duration in timings.values())
+
+
+def test_metrics_contain_the_stages_of_previous_requests(client, log_file):
+    get_chart(client, log_file)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type == metrics_utils.PROMETHEUS_CONTENT_TYPE
+    text = response.get_data(as_text=True)
+    assert 'dottie_stage_duration_seconds_count{stage="plot"}' in text
+    assert 'dottie_request_duration_seconds_count{endpoint="/chartapi/scatterplot"}' in text
+
+
+def test_unexpected_chart_errors_are_counted(client, log_file, monkeypatch):
+    def fail(self):
+        raise RuntimeError("plotting failed")
+
+    monkeypatch.setattr(Chart, "plot_df", fail)
+    before = metrics_utils.stage_errors.series.get("make_dotted_chart", 0)
+
+    get_chart(client, log_file)
+
+    assert metrics_utils.stage_errors.series["make_dotted_chart"] == before + 1
+
+
+def test_missing_data_is_not_counted(client, log_file):
+    before = metrics_utils.stage_errors.series.get("make_dotted_chart", 0)
+
+    get_chart(client, log_file, startTime="2100-01-01 00:00", endTime="2100-01-02 00:00")
+
+    assert metrics_utils.stage_errors.series.get("make_dotted_chart", 0) == before
+
+
+def test_timer_counts_errors_and_records_duration():
+    before = metrics_utils.stage_errors.series.get("test_stage", 0)
+
+    with pytest.raises(ValueError):
+        with metrics_utils.timer("test_stage"):
+            raise ValueError()
+
+    assert metrics_utils.stage_errors.series["test_stage"] == before + 1
+    assert metrics_utils.stage_durations.series["test_stage"][2] >= 1
+
+
+def test_nested_stages_are_named_after_their_parents():
+    with metrics_utils.timer("outer"):
+        with metrics_utils.timer("inner"):
+            with metrics_utils.timer("inner"):
+                pass
+
+    assert metrics_utils.stage_durations.series["outer.inner"][2] >= 1
+    assert "outer.inner.inner" not in metrics_utils.stage_durations.series
+
+
+def test_nested_stages_are_part_of_their_parents(make_log):
+    # the log is not ingested, so it is parsed and processed while the chart is loaded
+    chart = Chart(make_log(events=50), "eventID", [], [], [], None, None)
+    with app.test_request_context():
+        metrics_utils.start_request()
+        assert chart.make_dotted_chart() is True
+        timings = g.stage_timings
+
+    assert "load.parse" in timings
+    assert timings["load.parse"] <= timings["load"]
+    assert "parse" not in timings
@@ -0,0 +1,155 @@
+import os
+import threading
+
+import pandas as pd
+import pm4py
+import pytest
+
+from utils.chart_utils import ocel_cache
+from utils.chart_utils.ocel_cache import OcelCache
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sidecar_utils
+from utils.http_utils.metrics_utils import stage_errors
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    """
+    Counts the calls of read_log per file name
+    """
+    parses = dict()
+    read_log = ocel_cache.read_log
+
+    def counting_read_log(file_name):
+        parses[file_name] = parses.get(file_name, 0) + 1
+        return read_log(file_name)
+
+    monkeypatch.setattr(ocel_cache, "read_log", counting_read_log)
+    return parses
+
+
+def test_log_is_parsed_once(log_file, count_parses):
+    cache = OcelCache(10**9)
+
+    assert cache.get(log_file) is cache.get(log_file)
+    assert count_parses[log_file] == 1
+
+
+def test_artifacts_are_built_once_per_file_version(log_file):
+    cache = OcelCache(10**9)
+    builds = []
+
+    def builder(ocel):
+        builds.append(ocel)
+        return len(ocel.events)
+
+    assert cache.get_artifact(log_file, "events", builder) == 300
+    assert cache.get_artifact(log_file, "events", builder) == 300
+    assert len(builds) == 1
+
+
+def test_changed_size_is_reparsed(log_file, make_log, count_parses):
+    cache = OcelCache(10**9)
+    entry = cache.get(log_file)
+
+    # replace the file with a smaller log of the same name
+    os.replace(fu.get_path_from_name(make_log(events=20)), fu.get_path_from_name(log_file))
+
+    reparsed = cache.get(log_file)
+    assert reparsed is not entry
+    assert len(reparsed.ocel.events) == 20
+    assert count_parses[log_file] == 2
+
+
+def test_changed_mtime_is_reparsed(log_file, count_parses):
+    cache = OcelCache(10**9)
+    entry = cache.get(log_file)
+
+    stat = os.stat(fu.get_path_from_name(log_file))
+    os.utime(fu.get_path_from_name(log_file), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert cache.get(log_file) is not entry
+    assert count_parses[log_file] == 2
+
+
+def test_deleted_file_is_dropped(log_file):
+    cache = OcelCache(10**9)
+    cache.get(log_file)
+    fu.delete_file(log_file)
+
+    with pytest.raises(FileNotFoundError):
+        cache.get(log_file)
+    assert fu.get_path_from_name(log_file) not in cache.entries
+
+
+def test_least_recently_used_log_is_evicted(make_log):
+    files = [make_log(events=50, seed=seed) for seed in range(3)]
+    cache = OcelCache(0)
+    for file_name in files:
+        cache.get(file_name)
+
+    # the most recently used log is always kept
+    assert list(cache.entries) == [fu.get_path_from_name(files[-1])]
+
+    cache.set_max_bytes(10**9)
+    cache.get(files[0])
+    cache.get(files[1])
+    cache.get(files[0])
+    budget = cache.entries[fu.get_path_from_name(files[0])].nbytes + 1
+    cache.set_max_bytes(budget)
+    assert list(cache.entries) == [fu.get_path_from_name(files[0])]
+
+
+def test_invalidate_drops_the_entry(log_file, count_parses):
+    cache = OcelCache(10**9)
+    cache.get(log_file)
+    cache.invalidate(log_file)
+    cache.get(log_file)
+
+    assert count_parses[log_file] == 2
+
+
+def test_concurrent_misses_share_one_parse(log_file, count_parses):
+    cache = OcelCache(10**9)
+    entries = []
+    threads = [threading.Thread(target=lambda: entries.append(cache.get(log_file))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert count_parses[log_file] == 1
+    assert all(entry is entries[0] for entry in entries)
+
+
+def test_cached_log_matches_parsed_file(log_file):
+    ocel = ocel_cache.get_ocel(log_file)
+    parsed = pm4py.read_ocel(fu.get_path_from_name(log_file))
+
+    # the cached log stores its repeated strings as categoricals
+    pd.testing.assert_frame_equal(ocel.events, parsed.events, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(ocel.relations, parsed.relations, check_dtype=False, check_categorical=False)
+    assert isinstance(ocel.relations["ocel:oid"].dtype, pd.CategoricalDtype)
+
+
+def test_delete_file_route_invalidates_the_cache(client, log_file):
+    ocel_cache.get_ocel(log_file)
+    response = client.delete("/filemanager/delete-file", query_string={"filename": log_file})
+
+    assert response.status_code == 200
+    assert fu.get_path_from_name(log_file) not in ocel_cache.cache.entries
+
+
+def test_failed_sidecar_write_is_reported(make_log, monkeypatch, caplog):
+    file_name = make_log(events=40)
+    errors = stage_errors.series.get("write_sidecar", 0)
+
+    def write_sidecar(file_name, ocel):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sidecar_utils, "write_sidecar", write_sidecar)
+    ocel = ocel_cache.read_log(file_name)
+
+    assert len(ocel.events) == 40
+    assert stage_errors.series["write_sidecar"] == errors + 1
+    assert "writing the sidecar of {} failed".format(file_name) in caplog.text
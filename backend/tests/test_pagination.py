@@ -0,0 +1,124 @@
+import pytest
+
+from utils.chart_utils import chart as chart_module
+from utils.chart_utils.chart import Chart
+from utils.chart_utils.process_utils import get_objects_of_event
+
+PAGE_SIZE = 7
+
+
+def get_page(
+    file_name: str, page_size: int = PAGE_SIZE, activities: list = (), object_types: list = (), **page
+) -> Chart:
+    chart = Chart(file_name, "eventID", [], list(activities), list(object_types), None, None)
+    chart.set_page(page_size, **page)
+    assert chart.make_dotted_chart() is True
+    return chart
+
+
+def get_ids(chart: Chart) -> list:
+    return chart.df["eid"].astype(str).tolist()
+
+
+def walk_pages(file_name: str, **kwargs) -> list:
+    """
+    Follows the next cursors from the first page on
+
+    Returns:
+        list: the charts of all pages
+    """
+    pages = [get_page(file_name, **kwargs)]
+    while pages[-1].get_page()["next"] is not None:
+        pages.append(get_page(file_name, cursor=pages[-1].get_page()["next"], **kwargs))
+    return pages
+
+
+def get_expected_ids(file_name: str, activities: list = ()) -> list:
+    chart = Chart(file_name, "eventID", [], list(activities), [], None, None)
+    assert chart.make_dotted_chart() is True
+    # the synthetic events are numbered in time order
+    return sorted(get_ids(chart), key=int)
+
+
+@pytest.mark.parametrize("activities", [[], ["activity 1", "activity 3"]])
+def test_pages_cover_all_events_in_order(log_file, activities):
+    pages = walk_pages(log_file, activities=activities)
+
+    assert [eid for page in pages for eid in get_ids(page)] == get_expected_ids(log_file, activities)
+    assert all(len(page.df) == PAGE_SIZE for page in pages[:-1])
+    assert 0 < len(pages[-1].df) <= PAGE_SIZE
+
+
+def test_first_and_last_page_cursors(log_file):
+    pages = walk_pages(log_file)
+
+    assert pages[0].get_page()["prev"] is None
+    assert pages[0].get_page()["next"] == get_ids(pages[1])[0]
+    assert pages[-1].get_page()["next"] is None
+    assert pages[-1].get_page()["prev"] == get_ids(pages[-1])[0]
+
+
+def test_prev_pages_walk_back_from_last_page(log_file):
+    pages = walk_pages(log_file)
+    expected = get_expected_ids(log_file)
+
+    ids = get_ids(pages[-1])
+    cursor = pages[-1].get_page()["prev"]
+    while cursor is not None:
+        page = get_page(log_file, cursor=cursor, direction="prev")
+        assert len(page.df) <= PAGE_SIZE
+        ids = get_ids(page) + ids
+        cursor = page.get_page()["prev"]
+    assert ids == expected
+
+
+def test_single_page(log_file):
+    page = get_page(log_file, page_size=1000)
+
+    assert page.get_page() == {"next": None, "prev": None}
+    assert get_ids(page) == get_expected_ids(log_file)
+
+
+def test_cursor_time_starts_at_first_later_event(log_file):
+    first = get_page(log_file, page_size=1000)
+    timestamp = first.df["timestamp"].iloc[10]
+
+    page = get_page(log_file, cursor_time=timestamp)
+    assert get_ids(page) == get_ids(first)[10 : 10 + PAGE_SIZE]
+
+
+@pytest.mark.parametrize("activities", [[], ["activity 0", "activity 4"]])
+def test_database_pages_match_log_pages(log_file, sqlite_log, activities):
+    expected = [get_ids(page) for page in walk_pages(log_file, activities=activities)]
+    pages = walk_pages(sqlite_log, activities=activities)
+
+    assert [get_ids(page) for page in pages] == expected
+    assert pages[0].get_page()["prev"] is None
+    assert pages[-1].get_page()["next"] is None
+
+    last = pages[-1]
+    back = get_page(sqlite_log, cursor=last.get_page()["prev"], direction="prev", activities=activities)
+    assert get_ids(back) == expected[-2]
+
+
+def test_database_pages_are_queried(sqlite_log, monkeypatch):
+    def get_base_df(*args, **kwargs):
+        raise AssertionError("the database is loaded into a base df")
+
+    monkeypatch.setattr(chart_module, "get_base_df", get_base_df)
+    page = get_page(sqlite_log, object_types=["type1"])
+
+    assert len(page.df) == PAGE_SIZE
+    for position in page.df["relations"]:
+        assert get_objects_of_event(page.event_objects, position)["type1"]
+
+
+def test_scatterplot_returns_the_page_cursors(client, log_file):
+    params = dict(filename=log_file, view="eventID", pageSize=PAGE_SIZE)
+    first = client.get("/chartapi/scatterplot", query_string=params).get_json()
+    second = client.get(
+        "/chartapi/scatterplot", query_string=dict(params, cursor=first["page"]["next"])
+    ).get_json()
+
+    assert first["page"]["prev"] is None
+    assert second["page"]["prev"] == first["page"]["next"]
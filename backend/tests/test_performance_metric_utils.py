@@ -0,0 +1,127 @@
+import pandas as pd
+import pm4py
+import pytest
+
+from utils.chart_utils import performance_metric_utils as perf
+from utils.chart_utils.ocel_cache import get_ocel
+from utils.filemanager_utils import filemanager_utils as fu
+
+
+def scan_attributes(table: pd.DataFrame, id_column: str, key: str) -> dict:
+    """
+    Reads the attributes of a row by scanning the table, the way the lookups worked before the indexes
+    """
+    entry = table[table[id_column] == key]
+    attributes = [column for column in table.columns if not column.startswith("ocel:")]
+    return {
+        attribute: entry[attribute].iloc[0] if str(entry[attribute].iloc[0]) != "nan" else ""
+        for attribute in attributes
+    }
+
+
+def test_event_attributes_match_table_scan(log_file):
+    events = get_ocel(log_file).events
+
+    for eid in events["ocel:eid"].iloc[::37]:
+        assert perf.get_event_attributes(eid, log_file) == scan_attributes(events, "ocel:eid", eid)
+
+
+def test_object_attributes_match_table_scan(log_file):
+    objects = get_ocel(log_file).objects
+
+    for oid in objects["ocel:oid"].iloc[::7]:
+        assert perf.get_object_attributes(oid, log_file) == scan_attributes(objects, "ocel:oid", oid)
+
+
+def test_unknown_object_is_an_error(log_file):
+    assert perf.get_object_attributes("unknown", log_file)["error"] is True
+
+
+def test_unknown_event_is_an_error(client, log_file):
+    assert perf.get_event_attributes("unknown", log_file)["error"] is True
+
+    response = client.get("/chartapi/get-event-attributes", query_string={"filename": log_file, "eid": "unknown"})
+    assert response.status_code == 200
+    assert response.get_json()["data"]["error"] is True
+
+
+@pytest.mark.parametrize(
+    "ids, key, position",
+    [
+        (["a", "b", "c"], "b", 1),
+        (["a", "b", "c"], "d", None),
+        # duplicated ids resolve to their first row
+        (["a", "b", "b", "c"], "b", 1),
+        (["b", "a", "c", "b"], "b", 0),
+    ],
+)
+def test_get_position(ids, key, position):
+    assert perf.get_position(pd.Index(ids), key) == position
+
+
+def test_attribute_routes(client, log_file):
+    response = client.get("/chartapi/get-event-attributes", query_string={"filename": log_file, "eid": "4"})
+    assert response.get_json()["data"] == {"amount": 4.0}
+
+    oid = get_ocel(log_file).objects["ocel:oid"].iloc[0]
+    response = client.get("/chartapi/get-object-attributes", query_string={"filename": log_file, "oid": oid})
+    assert response.get_json()["data"] == {"weight": "w{}".format(int(oid.split("-")[1]) % 3)}
+
+
+def summarize_lifecycle(ocel, oid: str) -> dict:
+    """
+    Builds the lifecycle of an object with pm4py.ocel_objects_summary, the way it was built before
+    the lifecycle table
+    """
+    summary = pm4py.ocel_objects_summary(ocel)
+    summary = summary[summary["ocel:oid"] == oid]
+    relations = ocel.relations[ocel.relations["ocel:oid"] == oid]
+    eids = relations["ocel:eid"].tolist()
+    return {
+        "error": False,
+        "object_lifecycle_activities": summary["activities_lifecycle"].iloc[0],
+        "object_lifecycle_duration": summary["lifecycle_duration"].iloc[0],
+        "object_lifecycle_start": summary["lifecycle_start"].iloc[0],
+        "object_lifecycle_end": summary["lifecycle_end"].iloc[0],
+        "object_lifecycle_eids": eids,
+        "object_lifecycle_timestamps": [
+            ocel.events.loc[ocel.events["ocel:eid"] == eid, "ocel:timestamp"].iloc[0] for eid in eids
+        ],
+    }
+
+
+def test_lifecycles_match_objects_summary(log_file):
+    # the summary of pm4py needs the string columns of a freshly parsed log
+    ocel = pm4py.read_ocel(fu.get_path_from_name(log_file))
+
+    for oid in ocel.objects["ocel:oid"].iloc[::9]:
+        assert perf.get_object_lifecycle(oid, log_file) == summarize_lifecycle(ocel, oid)
+
+
+def test_unknown_object_has_no_lifecycle(log_file):
+    assert perf.get_object_lifecycle("unknown", log_file)["error"] is True
+
+
+def test_lookup_of_unknown_object_is_an_error(log_file):
+    lifecycles = perf.get_object_lifecycles_table(log_file)
+
+    result = perf.lookup_object_lifecycle(lifecycles, "unknown")
+    assert result == {"error": True, "errorMessage": "could not generate dot metrics"}
+
+
+def test_unknown_object_in_database_has_no_lifecycle(sqlite_log):
+    assert perf.get_object_lifecycle("unknown", sqlite_log)["error"] is True
+    assert perf.get_object_lifecycles(["unknown"], sqlite_log)["unknown"]["error"] is True
+
+
+def test_lifecycles_of_several_objects(client, log_file):
+    oids = get_ocel(log_file).objects["ocel:oid"].iloc[:3].tolist()
+    response = client.get(
+        "/chartapi/get-object-lifecycles", query_string={"filename": log_file, "oid": oids + ["unknown"]}
+    )
+    data = response.get_json()["data"]
+
+    assert sorted(data) == sorted(oids + ["unknown"])
+    assert data["unknown"]["error"] is True
+    for oid in oids:
+        assert data[oid]["object_lifecycle_eids"] == perf.get_object_lifecycle(oid, log_file)["object_lifecycle_eids"]
@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+import pm4py
+import pytest
+
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import preview_utils
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "resources")
+
+
+def get_expected_preview(file_name: str) -> pd.DataFrame:
+    """
+    Builds the preview from the extended table of the parsed log, with the related objects of
+    every event in ocel:omap
+    """
+    ocel = pm4py.read_ocel(fu.get_path_from_name(file_name))
+    df = ocel.get_extended_table().head(preview_utils.PREVIEW_ROWS)
+    type_columns = [column for column in df.columns if column.startswith("ocel:type:")]
+    df["ocel:omap"] = [
+        sorted(oid for column in type_columns if isinstance(row[column], list) for oid in row[column])
+        for _, row in df.iterrows()
+    ]
+    return df.drop(columns=type_columns)
+
+
+@pytest.mark.parametrize("extension", [".jsonocel", ".xmlocel"])
+def test_preview_matches_extended_table(make_log, extension):
+    file_name = make_log(extension, events=50)
+    read_preview = {".jsonocel": preview_utils.read_jsonocel_preview, ".xmlocel": preview_utils.read_xmlocel_preview}
+    preview = read_preview[extension](fu.get_path_from_name(file_name))
+    expected = get_expected_preview(file_name)
+
+    assert len(preview) == preview_utils.PREVIEW_ROWS
+    assert preview["ocel:eid"].tolist() == expected["ocel:eid"].tolist()
+    assert preview["ocel:activity"].tolist() == expected["ocel:activity"].tolist()
+    assert (preview["ocel:timestamp"].dt.tz_localize(None) == expected["ocel:timestamp"].dt.tz_localize(None)).all()
+    assert preview["amount"].tolist() == expected["amount"].tolist()
+    assert [sorted(omap) for omap in preview["ocel:omap"]] == expected["ocel:omap"].tolist()
+
+
+def test_jsonocel_preview_stops_after_the_previewed_events(make_log):
+    file_name = make_log(events=300)
+    path = fu.get_path_from_name(file_name)
+    with open(path) as f:
+        data = f.read()
+    # everything after the first events is unreadable
+    cut = data.index('"{}"'.format(preview_utils.PREVIEW_ROWS + 5), data.index('"ocel:events"'))
+    with open(path, "w") as f:
+        f.write(data[:cut] + "garbage")
+
+    preview = preview_utils.read_jsonocel_preview(path)
+    assert preview["ocel:eid"].tolist() == [str(i) for i in range(preview_utils.PREVIEW_ROWS)]
+
+
+def test_csv_preview_route(client):
+    shutil.copy(os.path.join(RESOURCES_DIR, "receipt.csv"), fu.get_path_from_name("receipt.csv"))
+    response = client.get("/filemanager/file-preview", query_string={"filename": "receipt.csv"})
+    rows = json.loads(response.get_data(as_text=True))
+
+    expected = pd.read_csv(os.path.join(RESOURCES_DIR, "receipt.csv"), nrows=preview_utils.PREVIEW_ROWS)
+    assert [row["case:concept:name"] for row in rows] == expected["case:concept:name"].tolist()
@@ -0,0 +1,118 @@
+import pandas as pd
+import pm4py
+
+from utils.chart_utils import process_utils
+from utils.chart_utils.chart import Chart
+from utils.chart_utils.ocel_cache import get_ocel
+from utils.chart_utils.process_utils import build_event_objects, get_objects_of_event, process_df
+from utils.filemanager_utils import filemanager_utils as fu
+
+
+def get_objects_from_extended_table(ocel) -> dict:
+    """
+    Builds the objects of every event from the extended table, the way process_df did before
+    the relations were grouped
+    """
+    object_types = pm4py.ocel_get_object_types(ocel)
+    objects = dict()
+    for _, row in ocel.get_extended_table().iterrows():
+        objects[row["ocel:eid"]] = {
+            o: row[f"ocel:type:{o}"] if isinstance(row[f"ocel:type:{o}"], list) else []
+            for o in object_types
+        }
+    return objects
+
+
+def test_objects_match_extended_table(log_file):
+    ocel = get_ocel(log_file)
+    eids = ocel.events["ocel:eid"]
+
+    event_objects = build_event_objects(ocel)
+    objects = [get_objects_of_event(event_objects, p) for p in event_objects["eids"].get_indexer(eids)]
+    assert dict(zip(eids, objects)) == get_objects_from_extended_table(ocel)
+
+
+def test_unknown_event_has_no_objects(log_file):
+    event_objects = build_event_objects(get_ocel(log_file))
+
+    assert get_objects_of_event(event_objects, -1) == {"type0": [], "type1": [], "type2": []}
+
+
+def test_process_df_keeps_the_sampled_events(log_file):
+    ocel = get_ocel(log_file)
+    df = process_df(log_file)
+    expected = get_objects_from_extended_table(ocel)
+
+    assert len(df) == 10
+    assert {"eid", "activity", "timestamp", "relations"} <= set(df.columns)
+    event_objects = process_utils.get_event_objects(log_file)
+    for eid, position in zip(df["eid"], df["relations"]):
+        assert get_objects_of_event(event_objects, position) == expected[eid]
+
+
+def test_processed_df_is_sorted_by_time(log_file):
+    df = pd.DataFrame(
+        {
+            "eid": ["a", "b", "c", "d"],
+            "timestamp": pd.to_datetime(["2020-01-02", "2020-01-01", "2020-01-02", "2020-01-01"]),
+        },
+        index=[3, 2, 1, 0],
+    )
+    sorted_df = process_utils.sort_by_time(df)
+
+    # events with equal timestamps keep their order
+    assert sorted_df["eid"].tolist() == ["b", "d", "a", "c"]
+    assert sorted_df.index.equals(pd.RangeIndex(4))
+    assert process_utils.build_time_index(sorted_df).tolist() == [t.value for t in sorted_df["timestamp"]]
+
+    base_df = process_utils.get_base_df(log_file, "type0")
+    assert base_df["timestamp"].is_monotonic_increasing
+    assert process_utils.get_time_index(log_file, "type0").tolist() == [t.value for t in base_df["timestamp"]]
+
+
+def test_processed_dfs_are_compact(log_file, sqlite_log):
+    df = process_df(log_file, 300)
+    assert df["relations"].dtype == "int32"
+    assert isinstance(df["eid"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["activity"].dtype, pd.CategoricalDtype)
+
+    event_objects = process_utils.get_event_objects(log_file)
+    assert event_objects["oid_codes"].dtype == "int32"
+    assert len(event_objects["oids"]) == get_ocel(log_file).relations["ocel:oid"].nunique()
+
+    chart = Chart(sqlite_log, "type2", [], [], [], None, None)
+    assert chart.make_dotted_chart() is True
+    for frame in [process_utils.get_base_df(log_file, "type2"), chart.df]:
+        for column in ["eid", "activity", "case", "case:ocel:type"]:
+            assert isinstance(frame[column].dtype, pd.CategoricalDtype)
+
+
+def test_flattened_view_matches_pm4py(log_file):
+    ocel = pm4py.read_ocel(fu.get_path_from_name(log_file))
+    expected = pm4py.ocel_flattening(ocel, "type1").sort_values("time:timestamp", kind="stable")
+    df = process_utils.process_flatten_df(log_file, "type1")
+
+    assert df["timestamp"].is_monotonic_increasing
+    rows = lambda eids, cases, activities: sorted(zip(map(str, eids), map(str, cases), map(str, activities)))
+    assert rows(df["eid"], df["case"], df["activity"]) == rows(
+        expected["ocel:eid"], expected["case:concept:name"], expected["concept:name"]
+    )
+    assert set(df["case:ocel:type"]) == {"type1"}
+
+
+def test_flattened_views_are_slices_of_one_pass(log_file):
+    ocel = pm4py.read_ocel(fu.get_path_from_name(log_file))
+    views = process_utils.build_flattened_views(ocel)
+
+    assert sorted(views["ranges"]) == sorted(pm4py.ocel_get_object_types(ocel))
+    bounds = sorted(views["ranges"].values())
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(views["df"])
+    assert all(end == start for (_, end), (start, _) in zip(bounds, bounds[1:]))
+
+    for object_type, (start, end) in views["ranges"].items():
+        view = views["df"].iloc[start:end]
+        relations = ocel.relations[ocel.relations["ocel:type"] == object_type]
+        expected = relations.sort_values("ocel:timestamp", kind="stable")
+        assert list(map(str, view["eid"])) == list(expected["ocel:eid"])
+        assert list(map(str, view["case"])) == list(expected["ocel:oid"])
+        assert set(view["case:ocel:type"]) == {object_type}
@@ -0,0 +1,84 @@
+import io
+
+import pm4py
+import pytest
+
+from utils.chart_utils import ocel_cache, profile_utils
+from utils.chart_utils.ocel_cache import get_ocel
+from utils.filemanager_utils import filemanager_utils as fu
+
+
+@pytest.fixture
+def no_parsing(monkeypatch):
+    """
+    Fails every attempt to load a log
+    """
+
+    def read_log(file_name):
+        raise AssertionError("the log was loaded")
+
+    monkeypatch.setattr(ocel_cache, "read_log", read_log)
+
+
+def test_profile_contains_the_previous_general_metrics(log_file):
+    ocel = get_ocel(log_file)
+    df = ocel.get_extended_table()
+    profile = profile_utils.get_profile(log_file)
+
+    assert profile["object_types"] == pm4py.ocel_get_object_types(ocel)
+    assert profile["attribute_names"] == pm4py.ocel_get_attribute_names(ocel)
+    assert profile["activities"] == df["ocel:activity"].unique().tolist()
+    assert profile["activity_count"] == len(df.index)
+    assert profile["count_per_activity"] == df["ocel:activity"].value_counts().to_dict()
+    assert profile["event_count"] == 300
+    assert profile["relation_count"] == len(ocel.relations)
+    assert sum(profile["count_per_object_type"].values()) == profile["object_count"]
+
+
+def test_stored_profile_is_read_without_loading_the_log(log_file, no_parsing):
+    profile = profile_utils.build_profile(pm4py.read_ocel(fu.get_path_from_name(log_file)))
+    profile_utils.write_profile(log_file, profile)
+
+    assert profile_utils.get_profile(log_file) == profile
+
+
+def test_profile_is_read_from_disk_once(log_file, no_parsing, monkeypatch):
+    ocel_cache.invalidate(log_file)
+    reads = []
+    read_profile = profile_utils.read_profile
+
+    def count_reads(file_name):
+        reads.append(file_name)
+        return read_profile(file_name)
+
+    monkeypatch.setattr(profile_utils, "read_profile", count_reads)
+
+    profile = profile_utils.get_profile(log_file)
+    assert profile_utils.get_profile(log_file) is profile
+    assert reads == [log_file]
+
+
+def test_profile_of_changed_file_is_rebuilt(log_file, make_log):
+    profile_utils.get_profile(log_file)
+    with open(fu.get_path_from_name(make_log(events=20)), "rb") as f:
+        data = f.read()
+    with open(fu.get_path_from_name(log_file), "wb") as f:
+        f.write(data)
+
+    assert profile_utils.read_profile(log_file) is None
+    assert profile_utils.get_profile(log_file)["event_count"] == 20
+
+
+def test_upload_stores_the_profile(client, make_log, wait_for_ingest):
+    with open(fu.get_path_from_name(make_log(events=40)), "rb") as f:
+        data = f.read()
+    client.post("/filemanager/upload-file", data={"file": (io.BytesIO(data), "uploaded.jsonocel")})
+    wait_for_ingest()
+
+    assert profile_utils.read_profile("uploaded.jsonocel")["event_count"] == 40
+
+
+def test_general_metrics_route_returns_the_profile(client, log_file):
+    response = client.get("/chartapi/get-general-metrics", query_string={"filename": log_file})
+
+    assert response.get_json()["data"] == profile_utils.get_profile(log_file)
@@ -0,0 +1,95 @@
+import base64
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from utils.chart_utils import serialization_utils
+
+
+def decode(value) -> np.ndarray:
+    """
+    Reads a typed array the way Chart.jsx does
+    """
+    dtype = np.dtype(value["dtype"]).newbyteorder("<")
+    return np.frombuffer(base64.b64decode(value["bdata"]), dtype=dtype)
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        (np.arange(10, dtype="float64") / 3, "f8"),
+        (np.arange(10, dtype="int64"), "i4"),
+        (np.arange(10, dtype="int64") * 2**40, "f8"),
+        (np.arange(10, dtype="uint8"), "u1"),
+        ([float(i) for i in range(10)], "f8"),
+        (np.array([1, 2.5] * 5, dtype=object), "f8"),
+    ],
+)
+def test_numbers_are_encoded_as_typed_arrays(values, dtype):
+    array, is_date = serialization_utils.to_typed_array(values)
+    encoded = serialization_utils.encode_typed_array(array)
+
+    assert is_date is False
+    assert encoded["dtype"] == dtype
+    assert decode(encoded).tolist() == pytest.approx(np.asarray(values, dtype="float64").tolist())
+
+
+def test_timestamps_are_encoded_as_epoch_milliseconds():
+    timestamps = pd.date_range("2020-01-01", periods=10, freq="37s")
+    array, is_date = serialization_utils.to_typed_array(timestamps.to_pydatetime())
+
+    assert is_date is True
+    assert decode(serialization_utils.encode_typed_array(array)).tolist() == [t.value / 1e6 for t in timestamps]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [1.0, 2.0, 3.0],
+        ["a"] * 10,
+        [True] * 10,
+        np.array([pd.Timestamp("2020-01-01")] * 9 + [pd.NaT], dtype=object),
+    ],
+)
+def test_other_arrays_are_left_as_they_are(values):
+    assert serialization_utils.to_typed_array(values) == (None, False)
+
+
+def test_encoded_figure_keeps_the_data():
+    timestamps = pd.date_range("2020-01-01", periods=20, freq="h")
+    fig = go.Figure(
+        go.Scattergl(
+            x=timestamps,
+            y=np.arange(20),
+            text=["event {}".format(i) for i in range(20)],
+            marker=dict(size=np.full(20, 6), color="red"),
+            xaxis="x2",
+        )
+    )
+    figure = json.loads(serialization_utils.dumps({"figure": serialization_utils.encode_figure(fig)}))["figure"]
+    trace = figure["data"][0]
+
+    assert decode(trace["x"]).tolist() == [t.value / 1e6 for t in timestamps]
+    assert decode(trace["y"]).tolist() == list(range(20))
+    assert decode(trace["marker"]["size"]).tolist() == [6] * 20
+    assert trace["marker"]["color"] == "red"
+    assert trace["text"] == ["event {}".format(i) for i in range(20)]
+    assert figure["layout"]["xaxis2"]["type"] == "date"
+    assert "xaxis" not in figure["layout"]
+
+
+def test_dumps_replaces_nan_like_plotly():
+    payload = json.loads(serialization_utils.dumps({"values": np.array([1.0, math.nan]), "time": pd.Timestamp("2020-01-01")}))
+    assert payload == {"values": [1.0, None], "time": "2020-01-01T00:00:00"}
+
+
+def test_scatterplot_route_sends_typed_arrays(client, log_file):
+    response = client.get("/chartapi/scatterplot", query_string={"filename": log_file, "view": "eventID"})
+    traces = response.get_json()["figure"]["data"]
+
+    assert response.mimetype == "application/json"
+    assert sum(len(decode(trace["y"])) for trace in traces if isinstance(trace.get("y"), dict)) > 0
@@ -0,0 +1,87 @@
+import pytest
+
+import chart_api
+from app import app
+from utils.chart_utils import ingest_utils
+
+
+def get_chart(client, file_name: str, **params) -> dict:
+    query = {"filename": file_name, "view": "eventID", **params}
+    return client.get("/chartapi/scatterplot", query_string=query).get_json()
+
+
+def get_state(client) -> dict:
+    with client.session_transaction() as session:
+        return session["chart_state"]
+
+
+@pytest.fixture
+def other_client(client):
+    # shares the session interface the client fixture set up
+    return app.test_client()
+
+
+def test_sessions_keep_their_own_filters(client, other_client, log_file):
+    get_chart(client, log_file)
+    get_chart(other_client, log_file)
+
+    client.post("/chartapi/apply-activity-filter", json={"selectedActivities": ["activity 1"]})
+    assert get_chart(client, log_file)["selected_activities"] == ["activity 1"]
+    # no activity filter selects all activities
+    data = get_chart(other_client, log_file)
+    assert sorted(data["selected_activities"]) == sorted(data["activities"])
+
+
+def test_filters_are_reset_for_another_file(client, log_file, make_log):
+    get_chart(client, log_file)
+    client.post("/chartapi/apply-activity-filter", json={"selectedActivities": ["activity 1"]})
+    other_log = make_log(events=100, activities=3)
+    ingest_utils.run_ingest(other_log, ingest_utils.new_status(other_log))
+
+    data = get_chart(client, other_log)
+    assert sorted(data["selected_activities"]) == ["activity 0", "activity 1", "activity 2"]
+
+
+def test_chart_is_rebuilt_from_the_session_state(client, log_file):
+    get_chart(client, log_file)
+    client.post("/chartapi/apply-activity-filter", json={"selectedActivities": ["activity 3"]})
+    get_chart(client, log_file)
+
+    # the next request is served by a worker that does not hold the chart
+    chart_api.charts.clear()
+    data = get_chart(client, log_file)
+    assert data["selected_activities"] == ["activity 3"]
+    assert {trace["name"] for trace in data["figure"]["data"]} >= {"events"}
+
+
+def test_toggle_on_another_worker_expands_the_clicked_event(client, log_file):
+    get_chart(client, log_file)
+    eid = next(reversed(chart_api.charts.values())).get_event_by_trace_index(0, 2)
+    chart_api.charts.clear()
+
+    response = client.get("/chartapi/toggle-subplot", query_string={"traceIndex": 0, "pointIndex": 2})
+    assert response.get_json() == {"collapsedSubplots": None}
+    assert get_state(client)["expanded_events"] == [eid]
+
+    client.get("/chartapi/toggle-subplot", query_string={"traceIndex": "all"})
+    assert get_state(client)["expanded_events"] == []
+
+
+def test_toggle_without_chart_is_an_error(client):
+    response = client.get("/chartapi/toggle-subplot", query_string={"traceIndex": 0, "pointIndex": 0})
+
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"traceIndex": 0}, {"traceIndex": 0, "pointIndex": 10**6}, {"traceIndex": 10**6, "pointIndex": 0}, {}],
+)
+def test_toggle_of_unknown_point_is_an_error(client, log_file, params):
+    get_chart(client, log_file)
+
+    response = client.get("/chartapi/toggle-subplot", query_string=params)
+
+    assert response.status_code == 200
+    assert "error" in response.get_json()
+    assert get_state(client)["expanded_events"] == []
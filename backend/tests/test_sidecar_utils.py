@@ -0,0 +1,71 @@
+import io
+import os
+
+import pandas as pd
+import pm4py
+import pytest
+
+from utils.chart_utils import ocel_cache
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sidecar_utils
+
+
+@pytest.fixture
+def log_file(make_log):
+    """
+    A log that has not been ingested, it has no sidecar yet
+    """
+    return make_log(events=100)
+
+
+def test_sidecar_round_trip(log_file):
+    parsed = sidecar_utils.write_sidecar(log_file)
+
+    assert sidecar_utils.check_sidecar_valid(log_file)
+    ocel = sidecar_utils.read_sidecar(log_file)
+    for table in sidecar_utils.SIDECAR_TABLES:
+        assert getattr(ocel, table).equals(getattr(parsed, table).reset_index(drop=True))
+
+
+def test_changed_file_invalidates_sidecar(log_file):
+    sidecar_utils.write_sidecar(log_file)
+    with open(fu.get_path_from_name(log_file), "a") as f:
+        f.write(" ")
+
+    assert not sidecar_utils.check_sidecar_valid(log_file)
+    assert sidecar_utils.read_sidecar(log_file) is None
+
+
+def test_missing_sidecar_is_written_on_first_load(log_file):
+    assert sidecar_utils.read_sidecar(log_file) is None
+
+    ocel_cache.read_log(log_file)
+    assert sidecar_utils.check_sidecar_valid(log_file)
+
+
+def test_log_is_loaded_from_sidecar(log_file, monkeypatch):
+    parsed = sidecar_utils.write_sidecar(log_file)
+
+    def read_ocel(*args, **kwargs):
+        raise AssertionError("the original file was parsed")
+
+    monkeypatch.setattr(pm4py, "read_ocel", read_ocel)
+    ocel = ocel_cache.read_log(log_file)
+    pd.testing.assert_frame_equal(
+        ocel.events, parsed.events.reset_index(drop=True), check_dtype=False, check_categorical=False
+    )
+
+
+def test_upload_writes_sidecar_and_delete_removes_it(client, make_log, wait_for_ingest):
+    source = make_log(events=40)
+    with open(fu.get_path_from_name(source), "rb") as f:
+        data = f.read()
+    file_name = "uploaded.jsonocel"
+
+    response = client.post("/filemanager/upload-file", data={"file": (io.BytesIO(data), file_name)})
+    assert response.get_json()["error"] is False
+    wait_for_ingest()
+    assert sidecar_utils.check_sidecar_valid(file_name)
+
+    client.delete("/filemanager/delete-file", query_string={"filename": file_name})
+    assert not os.path.exists(fu.get_sidecar_dir(file_name))
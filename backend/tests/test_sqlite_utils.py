@@ -0,0 +1,241 @@
+import io
+import json
+import os
+import sqlite3
+
+import pandas as pd
+import pm4py
+import pytest
+
+from utils.chart_utils import chart as chart_module
+from utils.chart_utils import ingest_utils, ocel_cache, process_utils, profile_utils
+from utils.chart_utils import performance_metric_utils as perf
+from utils.chart_utils.chart import Chart
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sqlite_utils
+
+
+@pytest.fixture
+def no_parsing(monkeypatch):
+    """
+    Fails every attempt to parse a database
+    """
+
+    def read_ocel2_sqlite(*args, **kwargs):
+        raise AssertionError("the database was parsed")
+
+    monkeypatch.setattr(pm4py, "read_ocel2_sqlite", read_ocel2_sqlite)
+
+
+@pytest.fixture
+def mixed_time_log(sqlite_log):
+    """
+    The database of sqlite_log with times stored with a "T" separator in one event type table and
+    with a time zone in another one, like OCEL 2.0 exporters write them
+    """
+    file_name = "mixed-" + sqlite_log
+    with open(fu.get_path_from_name(sqlite_log), "rb") as f:
+        data = f.read()
+    with open(fu.get_path_from_name(file_name), "wb") as f:
+        f.write(data)
+    with sqlite3.connect(fu.get_path_from_name(file_name)) as conn:
+        tables = [table for _, table in sqlite_utils.get_type_tables(conn, "event")]
+        conn.execute("UPDATE {} SET ocel_time = replace(ocel_time, ' ', 'T')".format(tables[0]))
+        conn.execute(
+            "UPDATE {} SET ocel_time = strftime('%Y-%m-%dT%H:%M:%S', ocel_time, '+2 hours') || '+02:00'".format(
+                tables[1]
+            )
+        )
+    conn.close()
+    assert sqlite_utils.prepare_upload(file_name)
+    ingest_utils.run_ingest(file_name, ingest_utils.new_status(file_name))
+    return file_name
+
+
+def test_profile_matches_the_parsed_log(sqlite_log, log_file, no_parsing):
+    profile = profile_utils.get_profile(sqlite_log)
+    expected = profile_utils.get_profile(log_file)
+
+    # the database also holds the objects without events, the importers of the other formats drop them
+    for key in ["object_types", "activities", "count_per_activity", "event_count", "relation_count"]:
+        assert profile[key] == expected[key]
+    assert profile["object_count"] >= expected["object_count"]
+    assert sum(profile["count_per_object_type"].values()) == profile["object_count"]
+    assert pd.Timestamp(profile["start_time"]) == pd.Timestamp(expected["start_time"])
+    assert pd.Timestamp(profile["end_time"]) == pd.Timestamp(expected["end_time"])
+    assert "amount" in profile["attribute_names"] and "weight" in profile["attribute_names"]
+
+
+def test_attributes_match_the_parsed_log(sqlite_log, log_file, no_parsing):
+    ocel = ocel_cache.get_ocel(log_file)
+    for eid in ["0", "17", "299"]:
+        assert perf.get_event_attributes(eid, sqlite_log)["amount"] == perf.get_event_attributes(eid, log_file)["amount"]
+    for oid in ocel.objects["ocel:oid"].iloc[:5]:
+        assert perf.get_object_attributes(oid, sqlite_log)["weight"] == perf.get_object_attributes(oid, log_file)["weight"]
+
+    with pytest.raises(KeyError):
+        sqlite_utils.query_attributes(sqlite_log, "event", "unknown")
+    assert perf.get_object_attributes("unknown", sqlite_log)["error"] is True
+    assert perf.get_event_attributes("unknown", sqlite_log)["error"] is True
+
+
+def test_lifecycles_match_the_parsed_log(sqlite_log, log_file, no_parsing):
+    for oid in ocel_cache.get_ocel(log_file).objects["ocel:oid"].iloc[:10]:
+        lifecycle = perf.get_object_lifecycle(oid, sqlite_log)
+        expected = perf.get_object_lifecycle(oid, log_file)
+        assert lifecycle["object_lifecycle_eids"] == expected["object_lifecycle_eids"]
+        assert lifecycle["object_lifecycle_activities"] == expected["object_lifecycle_activities"]
+        assert lifecycle["object_lifecycle_duration"] == expected["object_lifecycle_duration"]
+        assert lifecycle["object_lifecycle_start"] == expected["object_lifecycle_start"]
+
+    assert perf.get_object_lifecycle("unknown", sqlite_log)["error"] is True
+    assert perf.get_object_lifecycles(["unknown"], sqlite_log)["unknown"]["error"] is True
+
+
+def test_sampled_events_match_the_parsed_log(sqlite_log, log_file, no_parsing):
+    df = process_utils.process_df(sqlite_log, 10)
+    expected = process_utils.process_df(log_file, 10)
+
+    assert df["eid"].tolist() == expected["eid"].tolist()
+    assert df["activity"].tolist() == expected["activity"].tolist()
+    def get_objects(file_name, df):
+        event_objects = process_utils.get_event_objects(file_name, 10, df["eid"])
+        return [
+            {k: sorted(v) for k, v in process_utils.get_objects_of_event(event_objects, p).items()}
+            for p in df["relations"]
+        ]
+
+    assert get_objects(sqlite_log, df) == get_objects(log_file, expected)
+
+
+@pytest.mark.parametrize(
+    "activities, start_time, end_time",
+    [([], None, None), (["activity 1", "activity 3"], "2020-01-01 02:00", None), ([], "2020-01-01 01:00", "2020-01-01 03:00")],
+)
+def test_flattened_filters_are_queried(sqlite_log, log_file, no_parsing, monkeypatch, activities, start_time, end_time):
+    to_timestamp = lambda value: None if value is None else pd.Timestamp(value)
+    expected = Chart(log_file, "type1", [], list(activities), [], to_timestamp(start_time), to_timestamp(end_time))
+    assert expected.make_dotted_chart() is True
+
+    def get_base_df(*args, **kwargs):
+        raise AssertionError("the whole flattened view was loaded")
+
+    monkeypatch.setattr(chart_module, "get_base_df", get_base_df)
+    chart = Chart(sqlite_log, "type1", [], list(activities), [], to_timestamp(start_time), to_timestamp(end_time))
+    assert chart.make_dotted_chart() is True
+
+    assert chart.df["eid"].astype(str).tolist() == expected.df["eid"].astype(str).tolist()
+    assert chart.df["case"].astype(str).tolist() == expected.df["case"].astype(str).tolist()
+    assert chart.df["timestamp"].tolist() == expected.df["timestamp"].tolist()
+
+
+def test_changed_filters_are_queried_again(sqlite_log, no_parsing):
+    chart = Chart(sqlite_log, "type0", [], [], [], None, None)
+    assert chart.make_dotted_chart() is True
+    df = chart.df
+
+    # the viewport of the level-of-detail rendering does not change the rows
+    chart.set_viewport(("2020-01-01 01:00", "2020-01-01 02:00"), (0, 10))
+    assert chart.make_dotted_chart() is True
+    assert chart.df is df
+
+    chart.set_selected_activities(["activity 2"])
+    assert chart.make_dotted_chart() is True
+    assert set(chart.df["activity"]) == {"activity 2"}
+
+
+def test_upload_of_databases(client, sqlite_log, wait_for_ingest):
+    with open(fu.get_path_from_name(sqlite_log), "rb") as f:
+        data = f.read()
+
+    response = client.post("/filemanager/upload-file", data={"file": (io.BytesIO(data), "uploaded.sqlite")})
+    assert response.get_json()["error"] is False
+    wait_for_ingest()
+    with sqlite3.connect(fu.get_path_from_name("uploaded.sqlite")) as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "dottie_event_object_ocel_event_id" in indexes
+
+    response = client.post("/filemanager/upload-file", data={"file": (io.BytesIO(b"no database"), "invalid.sqlite")})
+    assert response.get_json()["error"] is True
+    assert not os.path.exists(fu.get_path_from_name("invalid.sqlite"))
+
+
+def test_preview_of_databases(client, sqlite_log):
+    response = client.get("/filemanager/file-preview", query_string={"filename": sqlite_log})
+    rows = json.loads(response.get_data(as_text=True))
+    events = ocel_cache.get_ocel(sqlite_log).events.sort_values("ocel:timestamp", kind="stable")
+
+    assert [row["ocel:eid"] for row in rows] == events["ocel:eid"].head(len(rows)).tolist()
+    assert all(row["ocel:omap"] for row in rows)
+
+
+def test_filter_times_are_normalized():
+    assert sqlite_utils.format_time("2020-01-01 10:00") == "2020-01-01 10:00:00.000"
+    assert sqlite_utils.format_time(pd.Timestamp("2020-01-01T10:00:00.5+02:00")) == "2020-01-01 08:00:00.500"
+
+
+@pytest.mark.parametrize("start_time, end_time", [(None, None), ("2020-01-01 01:00", "2020-01-01 03:00")])
+def test_mixed_time_formats_are_filtered_and_ordered(mixed_time_log, log_file, start_time, end_time):
+    to_timestamp = lambda value: None if value is None else pd.Timestamp(value)
+    for view in ["type1", "eventID"]:
+        charts = [
+            Chart(file_name, view, [], [], [], to_timestamp(start_time), to_timestamp(end_time))
+            for file_name in [log_file, mixed_time_log]
+        ]
+        for chart in charts:
+            chart.set_page(7 if view == "eventID" else None)
+            assert chart.make_dotted_chart() is True
+        expected, chart = charts
+        assert chart.df["eid"].astype(str).tolist() == expected.df["eid"].astype(str).tolist()
+        assert chart.df["timestamp"].tolist() == expected.df["timestamp"].tolist()
+
+    profile = profile_utils.get_profile(mixed_time_log)
+    assert pd.Timestamp(profile["start_time"]) == pd.Timestamp(profile_utils.get_profile(log_file)["start_time"])
+
+
+def test_time_filters_use_the_index(sqlite_log):
+    with sqlite_utils.connect(fu.get_path_from_name(sqlite_log)) as conn:
+        table = sqlite_utils.get_type_tables(conn, "event")[0][1]
+        conditions, params = sqlite_utils.get_event_filter_sql(sqlite_utils.format_time("2020-01-01 01:00"), None)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT t.ocel_id FROM {} t WHERE {}".format(table, " AND ".join(conditions)), params
+        ).fetchall()
+
+    assert "dottie_{}_time_ocel_id".format(table) in str(plan)
+
+
+def test_connections_are_closed(sqlite_log, monkeypatch):
+    connections = []
+    connect = sqlite3.connect
+
+    def track(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(sqlite3, "connect", track)
+    sqlite_utils.query_profile(sqlite_log)
+    sqlite_utils.query_attributes(sqlite_log, "event", "1")
+
+    assert len(connections) == 2
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_prepared_database_has_the_hash_of_its_indexed_content(sqlite_log):
+    file_name = "copy-" + sqlite_log
+    path = fu.get_path_from_name(file_name)
+    with open(fu.get_path_from_name(sqlite_log), "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data)
+    with sqlite3.connect(path) as conn:
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall():
+            if name.startswith("dottie_"):
+                conn.execute("DROP INDEX {}".format(name))
+    conn.close()
+    # the upload stores the hash of the received content
+    fu.write_content_hash(file_name, fu.hash_file(path).hexdigest())
+
+    assert sqlite_utils.prepare_upload(file_name)
+    assert fu.read_content_hash(file_name) == fu.hash_file(path).hexdigest()
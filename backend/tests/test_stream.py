@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import chart_api
+from utils.chart_utils import chart as chart_module
+from utils.chart_utils import ingest_utils
+from utils.chart_utils.chart import Chart
+
+
+def get_stream(client, file_name: str, view: str = "type0", **params):
+    response = client.get(
+        "/chartapi/scatterplot-stream", query_string=dict(filename=file_name, view=view, **params)
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def get_points(lines: list) -> list:
+    """
+    Collects the streamed points as trace name, time and case, in the order they were sent
+    """
+    names = [trace["name"] for trace in lines[0]["figure"]["data"]]
+    points = []
+    for batch in lines[1:-1]:
+        assert batch["type"] == "points"
+        for trace, xs, ys, customdata in zip(batch["traces"], batch["x"], batch["y"], batch["customdata"]):
+            points += [(names[trace], x, y, data[0]) for x, y, data in zip(xs, ys, customdata)]
+    return points
+
+
+def test_stream_sends_every_point_of_the_view(client, log_file):
+    lines = get_stream(client, log_file, batchSize=50)
+
+    header = lines[0]
+    assert header["type"] == "header" and not header["lod"]
+    assert lines[-1] == {"type": "end"}
+    assert len(lines) > 3
+    assert all(len(sum(batch["x"], [])) <= 50 for batch in lines[1:-1])
+    chart = Chart(log_file, "type0", [], [], [], None, None)
+    assert chart.make_dotted_chart() is True
+    points = get_points(lines)
+    assert header["points"] == len(points) == len(chart.df)
+    assert sorted(header["activities"]) == sorted(chart.get_activity_list())
+    assert sorted(str(eid) for _, _, _, eid in points) == sorted(map(str, chart.df["eid"]))
+
+
+def test_stream_applies_the_activity_filter(client, log_file):
+    get_stream(client, log_file)
+    client.post("/chartapi/apply-activity-filter", json={"selectedActivities": ["activity 1"]})
+
+    lines = get_stream(client, log_file)
+    assert [trace["name"] for trace in lines[0]["figure"]["data"]] == ["activity 1"]
+    assert {name for name, _, _, _ in get_points(lines)} == {"activity 1"}
+
+
+def test_views_above_the_threshold_are_not_streamed(client, log_file, monkeypatch):
+    monkeypatch.setattr(chart_api, "LOD_POINT_THRESHOLD", 10)
+
+    lines = get_stream(client, log_file)
+    assert lines[0]["lod"]
+    assert lines[1:] == [{"type": "end"}]
+
+    assert len(get_points(get_stream(client, log_file, lod="false"))) == lines[0]["points"]
+
+
+def test_event_view_is_not_streamed(client, log_file):
+    response = client.get(
+        "/chartapi/scatterplot-stream", query_string=dict(filename=log_file, view="eventID")
+    )
+
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("params", [{}, {"startTime": "2020-01-01 01:00", "endTime": "2020-01-01 03:00"}])
+def test_database_stream_is_queried(client, log_file, sqlite_log, monkeypatch, params):
+    expected = get_points(get_stream(client, log_file, **params))
+
+    def get_base_df(*args, **kwargs):
+        raise AssertionError("the database is loaded into a base df")
+
+    monkeypatch.setattr(chart_module, "get_base_df", get_base_df)
+    points = get_points(get_stream(client, sqlite_log, batchSize=40, **params))
+    assert sorted(points) == sorted(expected)
+
+
+def test_filters_are_reset_for_another_file(client, log_file, make_log):
+    get_stream(client, log_file)
+    client.post("/chartapi/apply-activity-filter", json={"selectedActivities": ["activity 1"]})
+    other_log = make_log(events=100, activities=3)
+    ingest_utils.run_ingest(other_log, ingest_utils.new_status(other_log))
+
+    lines = get_stream(client, other_log)
+    assert sorted(lines[0]["selected_activities"]) == ["activity 0", "activity 1", "activity 2"]
+    with client.session_transaction() as session:
+        assert session["chart_state"]["filename"] == other_log
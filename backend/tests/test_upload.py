@@ -0,0 +1,160 @@
+import hashlib
+import io
+import json
+import os
+
+import pytest
+
+from utils.filemanager_utils import filemanager_utils as fu
+
+CHUNK_SIZE = 4096
+
+
+@pytest.fixture
+def log_data(make_log) -> bytes:
+    file_name = make_log(events=200, seed=2)
+    with open(fu.get_path_from_name(file_name), "rb") as f:
+        data = f.read()
+    fu.delete_file(file_name)
+    return data
+
+
+@pytest.fixture
+def file_name():
+    return "uploaded.jsonocel"
+
+
+def upload_chunk(client, file_name: str, data: bytes, offset: int, final: bool = False) -> dict:
+    query = {"filename": file_name, "offset": offset}
+    if final:
+        query["final"] = "true"
+    return client.post("/filemanager/upload-chunk", query_string=query, data=data).get_json()
+
+
+def upload(client, file_name: str, data: bytes, offset: int = 0) -> dict:
+    """
+    Uploads the data from the offset on in chunks
+
+    Returns:
+        dict: response of the last chunk
+    """
+    while True:
+        chunk = data[offset : offset + CHUNK_SIZE]
+        final = offset + len(chunk) == len(data)
+        response = upload_chunk(client, file_name, chunk, offset, final)
+        assert response["error"] is False, response["errorMessage"]
+        offset = response["received"]
+        if final:
+            return response
+
+
+def read_stored_hash(file_name: str) -> str:
+    with open(os.path.join(fu.get_sidecar_dir(file_name), fu.CONTENT_HASH_FILE)) as f:
+        stored = json.load(f)
+    assert stored["version"] == fu.get_file_version(file_name)
+    return stored["sha256"]
+
+
+def assert_uploaded(file_name: str, data: bytes):
+    with open(fu.get_path_from_name(file_name), "rb") as f:
+        assert f.read() == data
+    assert read_stored_hash(file_name) == hashlib.sha256(data).hexdigest()
+    assert fu.get_received_size(file_name) == 0
+
+
+def test_chunked_upload_stores_file_and_hash(client, file_name, log_data):
+    response = upload(client, file_name, log_data)
+
+    assert response["received"] == len(log_data)
+    assert_uploaded(file_name, log_data)
+
+
+def test_upload_resumes_at_received_size(client, file_name, log_data):
+    response = upload_chunk(client, file_name, log_data[: 2 * CHUNK_SIZE], 0)
+    assert response["received"] == 2 * CHUNK_SIZE
+
+    # a chunk at the wrong offset is rejected, the client resumes at the reported size
+    response = upload_chunk(client, file_name, log_data[CHUNK_SIZE:], CHUNK_SIZE, final=True)
+    assert response["error"] is True
+    assert response["received"] == 2 * CHUNK_SIZE
+    assert not fu.check_file_exists(file_name)
+
+    status = client.get("/filemanager/upload-status", query_string={"filename": file_name}).get_json()
+    assert status["received"] == 2 * CHUNK_SIZE
+
+    upload(client, file_name, log_data, status["received"])
+    assert_uploaded(file_name, log_data)
+
+
+def test_lost_hash_state_is_rebuilt_from_partial_file(client, file_name, log_data):
+    upload_chunk(client, file_name, log_data[:CHUNK_SIZE], 0)
+    # the next chunk arrives at another process that did not hash the first one
+    with fu.upload_hashes_lock:
+        fu.upload_hashes.pop(file_name)
+    upload_chunk(client, file_name, log_data[CHUNK_SIZE : 2 * CHUNK_SIZE], CHUNK_SIZE)
+    # the stored state does not match the received size of the partial file
+    with fu.upload_hashes_lock:
+        _, received = fu.upload_hashes[file_name]
+        fu.upload_hashes[file_name] = (hashlib.sha256(b"stale"), received - 1)
+
+    upload(client, file_name, log_data, 2 * CHUNK_SIZE)
+    assert_uploaded(file_name, log_data)
+
+
+def test_first_chunk_restarts_upload(client, file_name, log_data):
+    upload_chunk(client, file_name, log_data[:CHUNK_SIZE], 0)
+    upload_chunk(client, file_name, log_data[:CHUNK_SIZE], CHUNK_SIZE)
+    # the client starts over, the received data is discarded
+    upload(client, file_name, log_data)
+
+    assert_uploaded(file_name, log_data)
+
+
+def test_invalid_header_is_rejected(client, file_name):
+    response = upload_chunk(client, file_name, b"not an event log", 0, final=True)
+
+    assert response["error"] is True
+    assert fu.get_received_size(file_name) == 0
+    assert not fu.check_file_exists(file_name)
+
+
+def test_existing_file_is_not_overwritten(client, log_file, log_data):
+    response = upload_chunk(client, log_file, log_data, 0, final=True)
+
+    assert response["error"] is True
+    assert fu.get_received_size(log_file) == 0
+
+
+def test_upload_file_checks_the_header_and_stores_the_hash(client, file_name, log_data):
+    response = client.post("/filemanager/upload-file", data={"file": (io.BytesIO(b"[1, 2]"), file_name)})
+    assert response.get_json()["error"] is True
+    assert not fu.check_file_exists(file_name)
+
+    response = client.post("/filemanager/upload-file", data={"file": (io.BytesIO(log_data), file_name)})
+    assert response.get_json()["error"] is False
+    assert read_stored_hash(file_name) == hashlib.sha256(log_data).hexdigest()
+
+
+
+def test_upload_plain_csv(client):
+    path = os.path.join(os.path.dirname(__file__), "..", "resources", "receipt.csv")
+    with open(path, "rb") as f:
+        data = f.read()
+
+    response = client.post("/filemanager/upload-file", data={"file": (io.BytesIO(data), "receipt.csv")})
+    assert response.get_json()["error"] is False
+    assert fu.check_file_exists("receipt.csv")
+
+@pytest.mark.parametrize(
+    "file_name, head, valid",
+    [
+        ("log.jsonocel", b'\xef\xbb\xbf  {"ocel:global-event": {}}', True),
+        ("log.jsonocel", b"[]", False),
+        ("log.xmlocel", b'<?xml version="1.0"?><log ocel:version="1.0">', True),
+        ("log.xmlocel", b"{}", False),
+        ("log.csv", b"case:concept:name,concept:name,time:timestamp\n", True),
+        ("log.txt", b"{}", False),
+    ],
+)
+def test_check_ocel_header(file_name, head, valid):
+    assert fu.check_ocel_header(file_name, head) is valid
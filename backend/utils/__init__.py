@@ -1,2 +1,3 @@
 from utils import filemanager_utils
 from utils import chart_utils
+from utils import http_utils
@@ -1 +1,11 @@
-from utils.chart_utils import chart, performance_metric_utils, process_utils
+from utils.chart_utils import (
+    bitmap_utils,
+    chart,
+    figure_cache,
+    ingest_utils,
+    ocel_cache,
+    performance_metric_utils,
+    process_utils,
+    profile_utils,
+    serialization_utils,
+)
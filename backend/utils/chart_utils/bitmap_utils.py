@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+from utils.chart_utils.ocel_cache import get_artifact
+from utils.chart_utils.process_utils import (
+    get_base_df,
+    get_base_name,
+    get_event_objects,
+)
+
+# bitsets are unpacked in windows of at least this many rows while matching rows are collected
+SCAN_WINDOW_ROWS = 4096
+
+
+def build_bitmap_index(df: pd.DataFrame, event_objects: dict = None) -> dict:
+    """
+    Builds one bitset per activity and, if the relations are given, one bitset per object type
+    marking the rows of the df with at least one related object of that type.
+    Bitsets are bit-packed uint8 arrays over the rows of the df.
+
+    Args:
+        df (pd.DataFrame): processed df
+        event_objects (dict): mapping built by group_relations, for the "eventID" view
+
+    Returns:
+        dict: number of rows, bitsets per activity and per object type
+    """
+    activity_codes, activities = pd.factorize(df["activity"])
+    index = {
+        "rows": len(df),
+        "activities": {
+            activity: np.packbits(activity_codes == code)
+            for code, activity in enumerate(activities)
+        },
+        "object_types": dict(),
+    }
+    if event_objects is None:
+        return index
+
+    # mark per event which object types it is related to, in one pass over the relations
+    object_types = event_objects["object_types"]
+    offsets = event_objects["offsets"]
+    type_codes = event_objects["type_codes"]
+    relation_events = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    known = type_codes >= 0
+    has_type = np.zeros((len(offsets), len(object_types)), dtype=bool)
+    has_type[relation_events[known], type_codes[known]] = True
+
+    # events without relations are mapped to the last, empty row
+    positions = df["relations"].to_numpy(dtype=np.int64)
+    positions[positions == -1] = len(offsets) - 1
+    row_has_type = has_type[positions]
+    index["object_types"] = {
+        object_type: np.packbits(row_has_type[:, code])
+        for code, object_type in enumerate(object_types)
+    }
+    return index
+
+
+def get_bitmap_index(file_name: str, view: str, sample_size: int = 10) -> dict:
+    """
+    Returns the bitmap index of the processed df of the view, built once per loaded log
+
+    Args:
+        file_name (str):
+        view (str): "eventID" or the object_type to flatten
+        sample_size (int): number of events kept in the "eventID" view
+
+    Returns:
+        dict: index built by build_bitmap_index
+    """
+
+    def builder(ocel):
+        df = get_base_df(file_name, view, sample_size)
+        if view != "eventID":
+            return build_bitmap_index(df)
+        event_objects = get_event_objects(file_name, sample_size, df["eid"])
+        return build_bitmap_index(df, event_objects)
+
+    return get_artifact(
+        file_name, get_base_name(view, sample_size) + ":bitmaps", builder
+    )
+
+
+def union(bitsets: dict, names, rows: int) -> np.ndarray:
+    """
+    Combines the bitsets of the given names with OR, unknown names match no rows
+
+    Args:
+        bitsets (dict): bitsets by name
+        names: names to combine
+        rows (int): number of rows of the bitsets
+
+    Returns:
+        np.ndarray: bitset
+    """
+    selected = [bitsets[name] for name in names if name in bitsets]
+    if not selected:
+        return np.zeros((rows + 7) // 8, dtype=np.uint8)
+    return np.bitwise_or.reduce(selected)
+
+
+def intersection(bitsets: dict, names, rows: int) -> np.ndarray:
+    """
+    Combines the bitsets of the given names with AND, unknown names match all rows
+
+    Args:
+        bitsets (dict): bitsets by name
+        names: names to combine
+        rows (int): number of rows of the bitsets
+
+    Returns:
+        np.ndarray: bitset
+    """
+    selected = [bitsets[name] for name in names if name in bitsets]
+    if not selected:
+        return np.packbits(np.ones(rows, dtype=bool))
+    return np.bitwise_and.reduce(selected)
+
+
+def to_mask(bitset: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    Unpacks the rows start to end of a bitset, only the bytes covering the range are touched
+
+    Args:
+        bitset (np.ndarray):
+        start (int): first row
+        end (int): row after the last row
+
+    Returns:
+        np.ndarray: boolean mask of length end - start
+    """
+    first_byte = start // 8
+    bits = np.unpackbits(bitset[first_byte : (end + 7) // 8])
+    offset = start - first_byte * 8
+    return bits[offset : offset + end - start].view(bool)
+
+
+def scan_rows(
+    bitset: np.ndarray, start: int, end: int, position: int, limit: int, forward: bool
+) -> np.ndarray:
+    """
+    Collects the rows within start and end that are set in a bitset, beginning at a row. The bitset is
+    unpacked window by window until enough rows are found, so the cost depends on the number of rows
+    scanned and not on the position of the rows.
+
+    Args:
+        bitset (np.ndarray): bitset of the rows, None if all rows match
+        start (int): first row of the range
+        end (int): row after the last row of the range
+        position (int): row to start at, rows before it are scanned backwards
+        limit (int): maximum number of rows to collect
+        forward (bool): True for the rows from position on, False for the rows before position
+
+    Returns:
+        np.ndarray: sorted rows
+    """
+    window = max(SCAN_WINDOW_ROWS, limit)
+    chunks = []
+    found = 0
+    low = high = min(max(position, start), end)
+    while found < limit and (high < end if forward else low > start):
+        if forward:
+            low, high = high, min(end, high + window)
+        else:
+            low, high = max(start, low - window), low
+        rows = np.arange(low, high)
+        if bitset is not None:
+            rows = rows[to_mask(bitset, low, high)]
+        if forward:
+            rows = rows[: limit - found]
+            chunks.append(rows)
+        else:
+            rows = rows[max(0, len(rows) - (limit - found)) :]
+            chunks.insert(0, rows)
+        found += len(rows)
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+def count(bitset: np.ndarray, start: int, end: int) -> int:
+    """
+    Counts the rows within start and end that are set in a bitset, window by window
+
+    Args:
+        bitset (np.ndarray): bitset of the rows, None if all rows match
+        start (int): first row of the range
+        end (int): row after the last row of the range
+
+    Returns:
+        int:
+    """
+    if bitset is None:
+        return max(0, end - start)
+    total = 0
+    for low in range(start, end, SCAN_WINDOW_ROWS * 64):
+        total += int(np.count_nonzero(to_mask(bitset, low, min(end, low + SCAN_WINDOW_ROWS * 64))))
+    return total
@@ -1,5 +1,7 @@
-import random
+import logging
+import uuid
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objs
 from plotly.subplots import make_subplots
@@ -7,7 +9,66 @@ import plotly.graph_objects as go
 import plotly.express as px
 import datetime
 
-from utils.chart_utils.process_utils import process_df, process_flatten_df
+from utils.chart_utils import bitmap_utils
+from utils.chart_utils.process_utils import (
+    compact_df,
+    get_base_df,
+    get_event_objects,
+    get_event_position,
+    get_objects_of_event,
+    get_time_index,
+    query_event_page,
+)
+from utils.chart_utils.profile_utils import get_profile
+from utils.filemanager_utils import sidecar_utils, sqlite_utils
+from utils.http_utils.metrics_utils import stage_errors, timed
+
+logger = logging.getLogger(__name__)
+
+# number of events shown in the eventID view per render mode, also the largest page size of the paginated view
+EVENT_SAMPLE_SIZES = {"subplots": 10, "webgl": 2000}
+
+# object types and activities are styled by their position in the sorted lists of the log
+OBJECT_TYPE_COLORS = px.colors.qualitative.Dark24 + px.colors.qualitative.Light24
+ACTIVITY_SHAPES = [
+    "circle",
+    "square",
+    "diamond",
+    "cross",
+    "x",
+    "star",
+    "triangle-up",
+    "triangle-down",
+]
+
+# flattened views with more visible points than this are sent as binned density
+LOD_POINT_THRESHOLD = 50000
+LOD_TIME_BUCKETS = 200
+LOD_CASE_BUCKETS = 100
+# cases are labeled on the y axis up to this number of visible cases
+LOD_MAX_CASE_TICKS = 100
+
+# number of points per batch of a streamed flattened view
+STREAM_BATCH_POINTS = 10000
+
+
+def to_epoch_ns(date: datetime) -> int:
+    """
+    Converts a filter date to nanoseconds since the epoch, the unit of the time index
+
+    Args:
+        date (datetime):
+
+    Returns:
+        int:
+    """
+    return pd.Timestamp(date).value
+
+
+class NoDataError(Exception):
+    """
+    Raised if no event is left after the filters have been applied
+    """
 
 
 class Chart:
@@ -19,11 +80,13 @@ class Chart:
         self,
         file_name: str,
         view: str,
-        collapsed_subplots: list,
+        expanded_events: list,
         selected_activities: list,
         selected_objects: list,
         start_date: datetime,
         end_date: datetime,
+        render_mode: str = "webgl",
+        page_size: int = None,
     ):
         """
         Initialisation method
@@ -31,20 +94,28 @@ class Chart:
         Args:
             file_name (str): the event log that is plotted
             view (str): the attribute the event log is flattened on
-            collapsed_subplots (list): list containing the subplots in the eventID view and the corresponding bool values
+            expanded_events (list): event ids of the expanded events in the eventID view, all other events are collapsed
             selected_activities (list): filtered activities
             selected_objects (list): filtered object types
             start_date (datetime): filter start date
             end_date (datetime): filter end date
+            render_mode (str): "webgl" for a fixed number of batched traces, "subplots" for one subplot per event
+            page_size (int): number of events per page of the paginated eventID view, None for evenly spaced events
         """
         self.view = view
+        self.render_mode = render_mode
         self.file_name = file_name
+        self.base_df = None
         self.df = pd.DataFrame()
+        # related objects of the events of the "eventID" view, see process_utils.group_relations
+        self.event_objects = None
         self.fig = None
 
         # vars used for subplots
-        self.collapsed_subplots = collapsed_subplots
-        self.trace_to_row = dict()
+        self.expanded_events = set(expanded_events)
+        self.trace_to_event = dict()
+        # identifies the figure trace_to_event belongs to
+        self.render_id = None
 
         # vars used for filtering
         self.activity_list = []
@@ -55,33 +126,159 @@ class Chart:
         self.start_time = start_date
         self.end_time = end_date
 
-    def get_subplot_by_trace_index(self, trace_index: int) -> int:
+        # bitsets over base_df per filter, kept as long as the filter and base_df do not change
+        self.bitmap_index = None
+        self.filter_bitsets = dict()
+        # sorted epoch timestamps of base_df and the row range of the date filter
+        self.time_index = None
+        self.time_slice = None
+        # file version and filters the df of a queried view was read with
+        self.query_key = None
+
+        # vars used for the paginated eventID view, the page starts at the cursor event or time
+        self.page_size = None
+        self.cursor = None
+        self.cursor_time = None
+        self.page_direction = "next"
+        self.page = None
+        self.set_page(page_size)
+
+        # vars used for level-of-detail rendering of flattened views
+        self.x_range = None
+        self.y_range = None
+        self.lod = False
+
+    def matches(self, file_name: str, view: str, render_mode: str) -> bool:
+        """
+        Checks if the chart can be reused for a request
+
+        Args:
+            file_name (str):
+            view (str):
+            render_mode (str):
+
+        Returns:
+            bool: True if the chart shows the same log, view and render mode
+        """
+        return (
+            self.file_name == file_name
+            and self.view == view
+            and self.render_mode == render_mode
+        )
+
+    def get_event_by_trace_index(self, trace_index: int, point_index: int = None) -> str:
         """
         Args:
             trace_index (int): trace index from the plotly chart
+            point_index (int): point index within the trace, needed for batched traces
 
         Returns:
-            int: the subplot index the trace is from
+            str: the id of the event the clicked point belongs to
         """
-        return self.trace_to_row[trace_index]
+        events = self.trace_to_event[trace_index]
+        if isinstance(events, list):
+            # batched traces hold the points of many events
+            return events[point_index]
+        return events
 
-    def get_collapsed_subplots(self) -> list:
+    def get_expanded_events(self) -> list:
         """
-        Getter method for collapsed_subplots
+        Getter method for expanded_events
 
         Returns:
-            list:
+            list: sorted event ids
+        """
+        return sorted(self.expanded_events)
+
+    def set_expanded_events(self, expanded_events: list):
+        """
+        Setter method for expanded_events
+
+        Args:
+            expanded_events (list): event ids
+        """
+        self.expanded_events = set(expanded_events)
+
+    def toggle_event(self, eid: str):
+        """
+        Collapses or expands an event, the state is kept per event id so that it survives filters and page changes
+
+        Args:
+            eid (str):
         """
-        return self.collapsed_subplots
+        if eid in self.expanded_events:
+            self.expanded_events.remove(eid)
+        else:
+            self.expanded_events.add(eid)
 
-    def set_collapsed_subplots_at_index(self, index: int):
+    def is_collapsed(self, eid) -> bool:
         """
-        Setter method for collapsed_subplots
+        Checks if an event is shown collapsed
 
         Args:
-            index (int):
+            eid: event id
+
+        Returns:
+            bool:
+        """
+        return str(eid) not in self.expanded_events
+
+    def set_page(
+        self,
+        page_size: int,
+        cursor: str = None,
+        cursor_time: datetime = None,
+        direction: str = "next",
+    ):
+        """
+        Setter method for the page of the paginated eventID view, the page size is limited by the render mode
+
+        Args:
+            page_size (int): number of events per page, None for evenly spaced events
+            cursor (str): event id the page starts at, or ends before for the direction "prev"
+            cursor_time (datetime): timestamp the page starts at if no cursor event is given
+            direction (str): "next" for the events from the cursor on, "prev" for the events before it
+        """
+        if page_size is not None:
+            page_size = min(max(1, page_size), EVENT_SAMPLE_SIZES[self.render_mode])
+        self.page_size = page_size
+        self.page = None
+        self.cursor = cursor
+        self.cursor_time = cursor_time
+        self.page_direction = "prev" if direction == "prev" else "next"
+
+    def get_page(self) -> dict:
+        """
+        Getter method for the cursors of the neighbouring pages of the paginated eventID view
+
+        Returns:
+            dict: cursor events of the next and previous page, None if there is no such page,
+                None if the view is not paginated
+        """
+        return self.page
+
+    def get_sample_size(self) -> int:
+        """
+        Returns the number of events of the eventID view
+
+        Returns:
+            int: the number of evenly spaced events of the render mode, None for all events if the view is paginated
+        """
+        if self.page_size is not None:
+            return None
+        return EVENT_SAMPLE_SIZES[self.render_mode]
+
+    def is_queried(self) -> bool:
+        """
+        Checks if the filtered view is queried from a database instead of filtered in base_df,
+        which are the flattened views and the pages of the eventID view
+
+        Returns:
+            bool:
         """
-        self.collapsed_subplots[index] = not self.collapsed_subplots[index]
+        if not sqlite_utils.is_sqlite(self.file_name):
+            return False
+        return self.view != "eventID" or self.page_size is not None
 
     def get_activity_list(self) -> list:
         """
@@ -95,9 +292,9 @@ class Chart:
 
     def set_activity_list(self):
         """
-        Setter method for collapsed_subplots
+        Setter method for activity_list, uses the activities from the profile of the log
         """
-        self.activity_list = self.df["activity"].unique()
+        self.activity_list = get_profile(self.file_name)["activities"]
 
     def get_objects_list(self) -> list:
         """
@@ -110,9 +307,49 @@ class Chart:
 
     def set_objects_list(self):
         """
-        Setter method for objects_list
+        Setter method for objects_list, uses the object types from the profile of the log
+        """
+        self.objects_list = list(get_profile(self.file_name)["object_types"])
+
+    def set_dates(self, start_date: datetime, end_date: datetime):
+        """
+        Setter method for start_time and end_time
+
+        Args:
+            start_date (datetime): filter start date
+            end_date (datetime): filter end date
+        """
+        self.start_time = start_date
+        self.end_time = end_date
+
+    def set_viewport(self, x_range: tuple, y_range: tuple):
+        """
+        Setter method for the visible range of flattened views, switches them to level-of-detail rendering
+
+        Args:
+            x_range (tuple): visible (start, end) timestamps, None for the whole time span
+            y_range (tuple): visible (lower, upper) case positions, None for all cases
+        """
+        self.x_range = x_range
+        self.y_range = y_range
+        self.lod = True
+
+    def reset_viewport(self):
+        """
+        Resets the visible range of flattened views, level-of-detail rendering is then only used for large views
+        """
+        self.x_range = None
+        self.y_range = None
+        self.lod = False
+
+    def is_lod(self) -> bool:
+        """
+        Getter method for lod
+
+        Returns:
+            bool: True if the flattened view is rendered with level-of-detail aggregation
         """
-        self.objects_list = list(self.df.iloc[1]["objects"].keys())
+        return self.lod
 
     def get_selected_object_types(self) -> list:
         """
@@ -153,96 +390,412 @@ class Chart:
 
     def assign_color(self) -> dict:
         """
-        Assigns each object_type in the df a color
+        Assigns each object_type in the df a color, the colors only depend on the object types of the log
 
         Returns:
             dict:
         """
-        elements = self.df.iloc[1]["objects"].keys()
-        colors = []
-        for _ in elements:
-            # Generate a random hexadecimal color code
-            while True:
-                color = "#" + "".join(random.choices("0123456789ABCDEF", k=6))
-                if color != "#000000":
-                    break
-            colors.append(color)
-        return dict(zip(elements, colors))
+        object_types = sorted(get_profile(self.file_name)["object_types"])
+        colors = {
+            object_type: OBJECT_TYPE_COLORS[index % len(OBJECT_TYPE_COLORS)]
+            for index, object_type in enumerate(object_types)
+        }
+        elements = self.event_objects["object_types"]
+        return {
+            object_type: colors.get(object_type, OBJECT_TYPE_COLORS[0])
+            for object_type in elements
+        }
 
     def assign_shape(self) -> dict:
         """
-        Assigns each activity a shape
+        Assigns each activity a shape, the shapes only depend on the activities of the log
 
         Returns:
             dict:
         """
-        activity_list = self.df["activity"].drop_duplicates()
-        shape_options = [
-            "circle",
-            "square",
-            "diamond",
-            "cross",
-            "x",
-            "star",
-            "triangle-up",
-            "triangle-down",
-        ]
+        activity_list = sorted(get_profile(self.file_name)["activities"])
+        return {
+            activity: ACTIVITY_SHAPES[index % len(ACTIVITY_SHAPES)]
+            for index, activity in enumerate(activity_list)
+        }
 
-        shape_dict = {}
+    def restore_render(self, trace_to_event: dict):
+        """
+        Takes over the trace mapping of a figure that was rendered for the same state before
 
-        for activity in activity_list:
-            cur = random.choice(shape_options)
-            while cur in shape_dict.values():
-                cur = random.choice(shape_options)
-            shape_dict[activity] = random.choice(shape_options)
-        return shape_dict
+        Args:
+            trace_to_event (dict): mapping of trace indices to the events of the cached figure
+        """
+        self.trace_to_event = trace_to_event
+        self.render_id = uuid.uuid4().hex
 
+    @timed("load")
+    def load_base_df(self):
+        """
+        Loads the unfiltered, processed df of the view and its indexes, filter bitsets are dropped if it changed.
+        Queried views only load the activities and object types, see query_flattened and query_page.
+        """
+        if self.is_queried():
+            self.set_activity_list()
+            if self.view == "eventID":
+                self.set_objects_list()
+            return
+
+        sample_size = self.get_sample_size()
+        base_df = get_base_df(self.file_name, self.view, sample_size)
+        if base_df is not self.base_df:
+            self.base_df = base_df
+            self.df = base_df
+            self.bitmap_index = bitmap_utils.get_bitmap_index(
+                self.file_name, self.view, sample_size
+            )
+            self.filter_bitsets = dict()
+            self.time_index = get_time_index(self.file_name, self.view, sample_size)
+            self.time_slice = None
+
+            self.set_activity_list()
+            if self.view == "eventID":
+                self.event_objects = get_event_objects(
+                    self.file_name, sample_size, base_df["eid"]
+                )
+                self.set_objects_list()
+
+    def get_filter_bitset(self, name: str, key, builder) -> np.ndarray:
+        """
+        Returns the bitset of a filter over base_df, the bitset is only rebuilt if its key changed
+
+        Args:
+            name (str): name of the filter
+            key: hashable filter values the bitset depends on
+            builder (callable): function that builds the bitset, returns None if no row is filtered
+
+        Returns:
+            np.ndarray:
+        """
+        cached = self.filter_bitsets.get(name)
+        if cached is None or cached[0] != key:
+            self.filter_bitsets[name] = (key, builder())
+        return self.filter_bitsets[name][1]
+
+    @timed("filter")
     def filter_activities(self):
         """
-        Applies activity filters on the df
+        Applies activity filters on the df as union of the activity bitsets
         """
         if not self.allowed_activity_list:
             self.allowed_activity_list = self.activity_list
 
-        filtered_df = self.df[self.df["activity"].isin(self.allowed_activity_list)]
-        filtered_df = filtered_df.reset_index(drop=True)
+        allowed_activities = tuple(self.allowed_activity_list)
+        bitsets = self.bitmap_index["activities"]
+
+        def build_bitset():
+            if set(bitsets).issubset(allowed_activities):
+                return None
+            return bitmap_utils.union(
+                bitsets, allowed_activities, self.bitmap_index["rows"]
+            )
 
-        self.df = filtered_df
+        self.get_filter_bitset("activities", allowed_activities, build_bitset)
 
+    @timed("filter")
     def filter_object_types(self):
         """
-        Applies object_type filters on the df
+        Applies object_type filters on the df as intersection of the object type bitsets
         """
-        filtered_df = self.df
+        required_objects = tuple(self.required_object_list)
+        bitsets = self.bitmap_index["object_types"]
 
-        for o in self.required_object_list:
-            filtered_df = filtered_df[
-                filtered_df["objects"].apply(lambda x: x.get(o) != [])
-            ]
-            filtered_df = filtered_df.reset_index(drop=True)
+        def build_bitset():
+            if not any(o in bitsets for o in required_objects):
+                return None
+            return bitmap_utils.intersection(
+                bitsets, required_objects, self.bitmap_index["rows"]
+            )
 
-        self.df = filtered_df
+        self.get_filter_bitset("object_types", required_objects, build_bitset)
 
+    @timed("filter")
     def filter_timestamp(self):
         """
-        Applies start and end date filters on the df
+        Applies start and end date filters on the df, base_df is sorted by timestamp so the
+        matching rows are a contiguous range found by binary search
         """
-        filtered_df = self.df
+        start, end = 0, len(self.time_index)
         if self.start_time is not None:
-            filtered_df = filtered_df[(self.df["timestamp"] >= self.start_time)]
+            start = np.searchsorted(
+                self.time_index, to_epoch_ns(self.start_time), side="left"
+            )
         if self.end_time is not None:
-            filtered_df = filtered_df[(self.df["timestamp"] <= self.end_time)]
-        filtered_df = filtered_df.reset_index(drop=True)
+            end = np.searchsorted(
+                self.time_index, to_epoch_ns(self.end_time), side="right"
+            )
+        self.time_slice = (start, max(start, end))
 
-        self.df = filtered_df
+    def get_combined_bitset(self) -> np.ndarray:
+        """
+        Combines the bitsets of the active filters with AND
+
+        Returns:
+            np.ndarray: bitset over base_df, None if no row is filtered
+        """
+        bitset = None
+        for name in ("activities", "object_types"):
+            filter_bitset = self.filter_bitsets.get(name, (None, None))[1]
+            if filter_bitset is not None:
+                bitset = filter_bitset if bitset is None else bitset & filter_bitset
+        return bitset
+
+    @timed("filter")
+    def apply_filters(self):
+        """
+        Combines the bitsets of the active filters and selects the matching rows of base_df within
+        the date range as df. A date range without further filters is a slice of base_df.
+        """
+        start, end = self.time_slice or (0, len(self.base_df))
+        bitset = self.get_combined_bitset()
+        mask = None if bitset is None else bitmap_utils.to_mask(bitset, start, end)
+
+        if start == 0 and end == len(self.base_df) and (mask is None or mask.all()):
+            self.df = self.base_df
+            return
+
+        df = self.base_df.iloc[start:end]
+        if mask is not None and not mask.all():
+            df = df[mask]
+        # the rows are renumbered without copying them
+        df.index = pd.RangeIndex(len(df))
+        self.df = df
+
+    @timed("filter")
+    def query_flattened(self):
+        """
+        Reads the rows of the flattened view within the activity and date filters from the database as df,
+        the query only runs again if the filters or the file changed
+        """
+        if not self.allowed_activity_list:
+            self.allowed_activity_list = self.activity_list
+        key = (
+            sidecar_utils.get_source_version(self.file_name),
+            tuple(self.allowed_activity_list),
+            self.start_time,
+            self.end_time,
+        )
+        if key != self.query_key:
+            self.df = compact_df(
+                sqlite_utils.query_flattened(
+                    self.file_name,
+                    self.view,
+                    set(self.allowed_activity_list),
+                    self.start_time,
+                    self.end_time,
+                )
+            )
+            self.query_key = key
+
+    def get_cursor_position(self) -> int:
+        """
+        Returns the row of base_df the page starts at, the cursor event is looked up by its id,
+        the cursor time by binary search. Unknown cursors start at the first row.
+
+        Returns:
+            int:
+        """
+        if self.cursor is not None:
+            position = get_event_position(self.file_name, self.cursor, self.get_sample_size())
+            if position != -1:
+                return position
+        if self.cursor_time is not None:
+            return int(
+                np.searchsorted(self.time_index, to_epoch_ns(self.cursor_time), side="left")
+            )
+        return 0
+
+    @timed("filter")
+    def select_page(self):
+        """
+        Selects the page of matching events at the cursor as df, together with the cursors of the
+        neighbouring pages. Only the rows around the cursor are read.
+        """
+        bitset = self.get_combined_bitset()
+        start, end = self.time_slice or (0, len(self.base_df))
+        position = self.get_cursor_position()
+
+        def scan(limit, forward):
+            return bitmap_utils.scan_rows(bitset, start, end, position, limit, forward)
+
+        if self.page_direction == "prev":
+            rows = scan(self.page_size + 1, forward=False)
+            before = rows[:-self.page_size]
+            rows = rows[-self.page_size:]
+            after = scan(1, forward=True)
+        else:
+            rows = scan(self.page_size + 1, forward=True)
+            after = rows[self.page_size:]
+            rows = rows[: self.page_size]
+            before = scan(1, forward=False)
+
+        eids = self.base_df["eid"]
+        self.page = {
+            "next": str(eids.iloc[after[0]]) if len(after) else None,
+            "prev": str(eids.iloc[rows[0]]) if len(before) and len(rows) else None,
+        }
+        df = self.base_df.iloc[rows]
+        df.index = pd.RangeIndex(len(df))
+        self.df = df
+
+    @timed("filter")
+    def query_page(self):
+        """
+        Reads the page of matching events at the cursor from the database as df, together with the
+        cursors of the neighbouring pages and the related objects of the events on the page
+        """
+        if not self.allowed_activity_list:
+            self.allowed_activity_list = self.activity_list
+        self.df, self.event_objects, self.page = query_event_page(
+            self.file_name,
+            self.allowed_activity_list,
+            self.required_object_list,
+            self.start_time,
+            self.end_time,
+            self.cursor,
+            self.cursor_time,
+            self.page_size,
+            self.page_direction,
+        )
 
+    @timed("plot")
     def plot_df(self) -> go.Figure:
         """
-        Creates plotly scatterchart with subplots and heatmap on the "eventID" view
+        Creates plotly scatterchart on the "eventID" view in the selected render mode
+        """
+        if self.render_mode == "subplots":
+            return self.plot_subplots_df()
+        return self.plot_batched_df()
+
+    def plot_batched_df(self) -> go.Figure:
+        """
+        Creates plotly WebGL scatterchart on the "eventID" view with one heatmap trace holding all
+        collapsed events and one trace per object type holding the objects of all expanded events.
+        Every event gets its own rows on the y axis, the collapse state is encoded in the points.
         """
-        if not self.collapsed_subplots:
-            self.collapsed_subplots = [True] * len(self.df)
+        color_dict = self.assign_color()
+        shape_dict = self.assign_shape()
+
+        # the heatmap layer comes first, followed by one trace per object type
+        layers = [None] + list(color_dict.keys())
+        layer_data = {
+            layer: {"x": [], "y": [], "symbol": [], "size": [], "text": [], "events": []}
+            for layer in layers
+        }
+        tick_values = []
+        tick_text = []
+
+        y_position = 0
+        for activity, timestamp, eid, position in zip(
+            self.df["activity"],
+            self.df["timestamp"],
+            self.df["eid"],
+            self.df["relations"],
+        ):
+            objects = get_objects_of_event(self.event_objects, position)
+            marker_symbol = shape_dict.get(activity, "circle")
+            if self.is_collapsed(eid):
+                # collapsed event: a single point sized and colored by its object count
+                total_count = sum(len(values) for values in objects.values())
+                points = [(None, eid, total_count, f"{activity}-click for more")]
+            else:
+                # expanded event: one point per related object
+                points = [
+                    (
+                        object_type,
+                        obj,
+                        max(5, 2 * len(object_ids)),
+                        f"{activity}-{object_type}-{obj}",
+                    )
+                    for object_type, object_ids in objects.items()
+                    for obj in object_ids
+                ]
+
+            for layer, label, size, text in points:
+                data = layer_data[layer]
+                data["x"].append(timestamp)
+                data["y"].append(y_position)
+                data["symbol"].append(marker_symbol)
+                data["size"].append(size)
+                data["text"].append(text)
+                data["events"].append(str(eid))
+                tick_values.append(y_position)
+                tick_text.append(label)
+                y_position += 1
+
+        heatmap_data = layer_data[None]
+        traces = [
+            go.Scattergl(
+                x=heatmap_data["x"],
+                y=heatmap_data["y"],
+                mode="markers",
+                marker=dict(
+                    symbol=heatmap_data["symbol"],
+                    # keep events without objects visible
+                    size=[max(2, size) for size in heatmap_data["size"]],
+                    sizemode="diameter",
+                    sizeref=0.3,
+                    color=heatmap_data["size"],
+                    colorscale="Viridis",
+                    showscale=False,
+                    opacity=0.5,
+                    line=dict(width=1, color="#000000"),
+                    colorbar=dict(title="Object Count"),
+                ),
+                name="events",
+                showlegend=False,
+                hoverinfo="text",
+                text=heatmap_data["text"],
+            )
+        ]
+        for object_type in layers[1:]:
+            data = layer_data[object_type]
+            traces.append(
+                go.Scattergl(
+                    x=data["x"],
+                    y=data["y"],
+                    mode="markers",
+                    marker=dict(
+                        symbol=data["symbol"],
+                        size=data["size"],
+                        color=color_dict[object_type],
+                        line=dict(width=1),
+                    ),
+                    name=object_type,
+                    showlegend=True,
+                    hoverinfo="text",
+                    text=data["text"],
+                )
+            )
+
+        fig = go.Figure(data=traces)
+        fig.update_layout(
+            height=800,
+            width=1000,
+            xaxis={"title": "Timestamp"},
+            yaxis={
+                "title": "Event ID",
+                "tickvals": tick_values,
+                "ticktext": tick_text,
+                "autorange": "reversed",
+            },
+        )
+
+        self.trace_to_event = {
+            trace_index: layer_data[layer]["events"]
+            for trace_index, layer in enumerate(layers)
+        }
+        return fig
 
+    def plot_subplots_df(self) -> go.Figure:
+        """
+        Creates plotly scatterchart with subplots and heatmap on the "eventID" view
+        """
         color_dict = self.assign_color()
         shape_dict = self.assign_shape()
 
@@ -250,15 +803,15 @@ class Chart:
             rows=len(self.df), cols=1, shared_xaxes=True, x_title="Timestamp"
         )
         legend_covered_object_types = []
-        trace_to_row = dict()
+        trace_to_event = dict()
 
         for index, row in self.df.iterrows():
-            row_index = index
             scatter_objects = []
 
             activity = row["activity"]
+            objects_of_event = get_objects_of_event(self.event_objects, row["relations"])
             marker_symbol = shape_dict.get(activity, "circle")
-            if self.collapsed_subplots[index]:
+            if self.is_collapsed(row["eid"]):
                 # Subplot is collapsed, use event ID as y data
                 x_data = [row["timestamp"]]
                 y_data = [row["eid"]]
@@ -282,7 +835,7 @@ class Chart:
 
                 # Create the heatmap trace
                 total_count = 0
-                for values in row["objects"].values():
+                for values in objects_of_event.values():
                     total_count += len(values)
                 heatmap_data = [total_count]
                 heatmap_trace = go.Scatter(
@@ -305,7 +858,7 @@ class Chart:
                 scatter_objects.append(heatmap_trace)
             else:
                 # Loop through each object type
-                for object_type, objects in row["objects"].items():
+                for object_type, objects in objects_of_event.items():
                     # Create x and y data for the Scatter object
 
                     x_data = [row["timestamp"]] * len(objects)
@@ -336,7 +889,7 @@ class Chart:
             # Create the subplot figure
             for scatter_trace in scatter_objects:
                 fig.add_trace(scatter_trace, row=index + 1, col=1)
-                trace_to_row[len(fig.data) - 1] = row_index
+                trace_to_event[len(fig.data) - 1] = str(row["eid"])
 
         fig.update_layout(
             height=800,
@@ -344,16 +897,23 @@ class Chart:
             yaxis={"title": "Event ID"},
         )
 
-        self.trace_to_row = trace_to_row
+        self.trace_to_event = trace_to_event
         return fig
 
+    @timed("plot")
     def plot_flattened_df(self) -> go.Figure:
         """
         Creates plotly scattterchart on the flattened object_type view
 
         """
+        if self.lod or len(self.df) > LOD_POINT_THRESHOLD:
+            self.lod = True
+            return self.plot_flattened_lod()
+
+        # plotly express would also create traces for the categories of filtered out rows
+        df = self.df.astype({"eid": object, "activity": object, "case": object})
         fig = px.scatter(
-            self.df,
+            df,
             x="timestamp",
             y="case",
             render_mode="webgl",
@@ -375,38 +935,275 @@ class Chart:
         # Show the plot
         return fig
 
+    def plot_flattened_lod(self) -> go.Figure:
+        """
+        Creates plotly WebGL scatterchart on the flattened object_type view restricted to the viewport.
+        Cases are placed at their position of first occurrence on the y axis. If more points than
+        LOD_POINT_THRESHOLD are visible, the points are replaced by their count per
+        (time bucket, case bucket, activity).
+        """
+        timestamps = self.df["timestamp"].to_numpy(dtype="datetime64[ns]").astype("int64")
+        case_codes, cases = pd.factorize(self.df["case"])
+
+        if self.x_range is not None:
+            x_start, x_end = (pd.Timestamp(x).value for x in self.x_range)
+        else:
+            x_start, x_end = timestamps.min(), timestamps.max()
+        if self.y_range is not None:
+            y_start, y_end = self.y_range
+        else:
+            y_start, y_end = -0.5, len(cases) - 0.5
+
+        mask = (
+            (timestamps >= x_start)
+            & (timestamps <= x_end)
+            & (case_codes >= y_start)
+            & (case_codes <= y_end)
+        )
+        visible = pd.DataFrame(
+            {
+                "timestamp": timestamps[mask],
+                "case_code": case_codes[mask],
+                "activity": self.df["activity"].to_numpy()[mask],
+                "eid": self.df["eid"].to_numpy()[mask],
+            }
+        )
+        is_density = len(visible) > LOD_POINT_THRESHOLD
+
+        if is_density:
+            # count the points per bucket, the bucket centers are used as coordinates
+            x_width = max(1, x_end - x_start) / LOD_TIME_BUCKETS
+            y_width = max(1, y_end - y_start) / LOD_CASE_BUCKETS
+            visible["time_bucket"] = ((visible["timestamp"] - x_start) // x_width).clip(
+                0, LOD_TIME_BUCKETS - 1
+            )
+            visible["case_bucket"] = ((visible["case_code"] - y_start) // y_width).clip(
+                0, LOD_CASE_BUCKETS - 1
+            )
+            visible = (
+                visible.groupby(["time_bucket", "case_bucket", "activity"], sort=False)
+                .size()
+                .reset_index(name="count")
+            )
+            visible["timestamp"] = x_start + (visible["time_bucket"] + 0.5) * x_width
+            visible["case_code"] = y_start + (visible["case_bucket"] + 0.5) * y_width
+            max_count = visible["count"].max()
+
+        colors = px.colors.qualitative.Plotly
+        traces = []
+        for index, activity in enumerate(self.df["activity"].unique()):
+            data = visible[visible["activity"] == activity]
+            x_data = pd.to_datetime(data["timestamp"].to_numpy(dtype="int64"))
+            if is_density:
+                trace = go.Scattergl(
+                    x=x_data,
+                    y=data["case_code"],
+                    mode="markers",
+                    marker=dict(
+                        color=colors[index % len(colors)],
+                        size=4 + 16 * np.sqrt(data["count"] / max_count),
+                        opacity=0.7,
+                    ),
+                    name=activity,
+                    hoverinfo="text",
+                    text=[f"{activity}: {count} events" for count in data["count"]],
+                )
+            else:
+                trace = go.Scattergl(
+                    x=x_data,
+                    y=data["case_code"],
+                    mode="markers",
+                    marker=dict(color=colors[index % len(colors)]),
+                    name=activity,
+                    customdata=np.column_stack(
+                        (data["eid"], cases[data["case_code"]])
+                    ),
+                    hovertemplate="%{customdata[1]}<br>eid=%{customdata[0]}<br>%{x}",
+                )
+            traces.append(trace)
+
+        fig = go.Figure(data=traces)
+        yaxis = {"range": [y_start, y_end]}
+        if y_end - y_start <= LOD_MAX_CASE_TICKS:
+            tick_values = list(range(max(0, int(np.ceil(y_start))), min(len(cases) - 1, int(y_end)) + 1))
+            yaxis["tickvals"] = tick_values
+            yaxis["ticktext"] = list(cases[tick_values])
+        fig.update_layout(
+            xaxis_title="Timestamp",
+            yaxis_title=f"{self.view.title()}",
+            xaxis={"range": [pd.Timestamp(x_start), pd.Timestamp(x_end)]},
+            yaxis=yaxis,
+            width=1500,
+            height=800,
+        )
+        return fig
+
+    def stream_flattened_df(self, batch_size: int = STREAM_BATCH_POINTS, max_points: int = None):
+        """
+        Streams the flattened object_type view as a header with the layout and one empty trace per
+        activity, followed by batches of points in time order that are appended to the traces.
+        The filters are applied now, the batches are read lazily from base_df, or from the query of a
+        database, so that only one batch of points is held in memory at a time.
+
+        Args:
+            batch_size (int): maximum number of points per batch
+            max_points (int): views with more points are not streamed, their header is marked as lod
+                and followed by the end marker, None to stream every view
+
+        Returns:
+            generator: yields the header, the batches and an end marker as dicts
+        """
+        if self.is_queried():
+            # databases apply the filters in the query and the batches are fetched from its cursor
+            self.load_base_df()
+            if not self.allowed_activity_list:
+                self.allowed_activity_list = self.activity_list
+            query = (
+                self.file_name,
+                self.view,
+                set(self.allowed_activity_list),
+                self.start_time,
+                self.end_time,
+            )
+            total = sqlite_utils.count_flattened(*query)
+
+            def read_batches():
+                return sqlite_utils.iter_flattened(*query, batch_size)
+
+        else:
+            self.load_base_df()
+            self.filter_activities()
+            self.filter_timestamp()
+            base_df = self.base_df
+            bitset = self.get_combined_bitset()
+            start, end = self.time_slice or (0, len(base_df))
+            total = bitmap_utils.count(bitset, start, end)
+
+            def read_batches():
+                position = start
+                while position < end:
+                    rows = bitmap_utils.scan_rows(bitset, start, end, position, batch_size, True)
+                    if len(rows) == 0:
+                        return
+                    position = rows[-1] + 1
+                    yield base_df.iloc[rows]
+
+        if total == 0:
+            raise NoDataError("No data for those filters!")
+
+        activities = [
+            activity
+            for activity in self.activity_list
+            if activity in self.allowed_activity_list
+        ]
+        colors = px.colors.qualitative.Plotly
+        header = {
+            "type": "header",
+            "points": total,
+            "lod": max_points is not None and total > max_points,
+            "figure": {
+                "data": [
+                    {
+                        "type": "scattergl",
+                        "mode": "markers",
+                        "name": activity,
+                        "marker": {"color": colors[index % len(colors)]},
+                        "x": [],
+                        "y": [],
+                        "customdata": [],
+                        "hovertemplate": "%{y}<br>eid=%{customdata[0]}<br>%{x}",
+                    }
+                    for index, activity in enumerate(activities)
+                ],
+                "layout": {
+                    "xaxis": {"title": {"text": "Timestamp"}, "type": "date"},
+                    "yaxis": {"title": {"text": f"{self.view.title()}"}, "type": "category"},
+                    "width": 1500,
+                    "height": 800,
+                },
+            },
+        }
+        trace_indices = {activity: index for index, activity in enumerate(activities)}
+
+        def batches():
+            yield header
+            if not header["lod"]:
+                for batch in read_batches():
+                    yield self.encode_batch(batch, trace_indices)
+            yield {"type": "end"}
+
+        return batches()
+
+    def encode_batch(self, batch: pd.DataFrame, trace_indices: dict) -> dict:
+        """
+        Groups a batch of points of a streamed flattened view by the traces of their activities,
+        in the format of plotly.js extendTraces
+
+        Args:
+            batch (pd.DataFrame): rows of base_df in time order
+            trace_indices (dict): trace index per activity
+
+        Returns:
+            dict: trace indices with the x, y and customdata values to append per trace
+        """
+        # date axes read numbers as milliseconds since the epoch
+        times = batch["timestamp"].to_numpy(dtype="datetime64[ns]").astype("int64") / 1e6
+        traces = batch["activity"].map(trace_indices).to_numpy()
+        eids = batch["eid"].to_numpy()
+        cases = batch["case"].to_numpy()
+
+        encoded = {"type": "points", "traces": [], "x": [], "y": [], "customdata": []}
+        for trace_index in sorted(set(traces)):
+            mask = traces == trace_index
+            encoded["traces"].append(int(trace_index))
+            encoded["x"].append(times[mask])
+            encoded["y"].append(cases[mask])
+            # the case is read from y, the frontend takes the event id from customdata like in the other flattened charts
+            encoded["customdata"].append(eids[mask].reshape(-1, 1))
+        return encoded
+
     def make_dotted_chart(self):
         """
-        Main function for chart creation
+        Main function for chart creation, returns True or the exception that prevented the chart
         """
         try:
+            self.load_base_df()
             if self.view == "eventID":
-                self.df = process_df(self.file_name)
-
-                self.set_activity_list()
-                self.set_objects_list()
-
-                self.filter_activities()
-                self.filter_object_types()
-                self.filter_timestamp()
+                if self.is_queried():
+                    self.query_page()
+                else:
+                    self.filter_activities()
+                    self.filter_object_types()
+                    self.filter_timestamp()
+                    if self.page_size is not None:
+                        self.select_page()
+                    else:
+                        self.apply_filters()
 
                 if len(self.df) == 0:
-                    raise Exception("No data for those filters!")
+                    raise NoDataError("No data for those filters!")
 
                 self.fig = self.plot_df()
+                self.render_id = uuid.uuid4().hex
                 return True
             else:
-                self.df = process_flatten_df(self.file_name, self.view)
-                self.set_activity_list()
-
-                self.filter_activities()
-                self.filter_timestamp()
+                if self.is_queried():
+                    self.query_flattened()
+                else:
+                    self.filter_activities()
+                    self.filter_timestamp()
+                    self.apply_filters()
 
                 if len(self.df) == 0:
-                    raise Exception("No data for those filters!")
+                    raise NoDataError("No data for those filters!")
 
                 self.fig = self.plot_flattened_df()
                 return True
 
+        except NoDataError as e:
+            return e
         except Exception as e:
+            # unexpected errors are still returned to the frontend, but no longer go unnoticed
+            logger.exception("creating the chart of %s failed", self.file_name)
+            stage_errors.inc("make_dotted_chart")
             return e
@@ -0,0 +1,274 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from os.path import exists, join
+
+# memory budget of the cached figures in bytes, can be overwritten with the environment variable
+MAX_BYTES_ENV = "DOTTIE_FIGURE_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 256 * 1024**2
+
+# figures evicted from memory are spilled to this directory if it is set
+SPILL_DIR_ENV = "DOTTIE_FIGURE_CACHE_DIR"
+SPILL_MAX_BYTES_ENV = "DOTTIE_FIGURE_CACHE_MAX_DISK_BYTES"
+DEFAULT_SPILL_MAX_BYTES = 1024**3
+
+
+class RenderedFigure:
+    """
+    A serialized /scatterplot response together with the chart state it was rendered for
+    """
+
+    def __init__(
+        self,
+        body: str,
+        trace_to_event: dict,
+        selected_activities: list,
+        selected_object_types: list,
+    ):
+        """
+        Initialisation method
+
+        Args:
+            body (str): serialized response
+            trace_to_event (dict): mapping of trace indices to the events of the rendered figure
+            selected_activities (list): activity filter after rendering
+            selected_object_types (list): object type filter after rendering
+        """
+        self.body = body
+        self.trace_to_event = trace_to_event
+        self.selected_activities = selected_activities
+        self.selected_object_types = selected_object_types
+        # rough size of the python objects next to the body
+        self.nbytes = len(body) + 64 * (
+            len(trace_to_event)
+            + sum(len(events) for events in trace_to_event.values() if isinstance(events, list))
+            + len(selected_activities)
+            + len(selected_object_types)
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Converts the figure to a JSON serializable dict
+
+        Returns:
+            dict:
+        """
+        return {
+            "body": self.body,
+            # JSON objects only have string keys
+            "trace_to_event": list(self.trace_to_event.items()),
+            "selected_activities": self.selected_activities,
+            "selected_object_types": self.selected_object_types,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Restores a figure from the output of to_dict
+
+        Args:
+            data (dict):
+
+        Returns:
+            RenderedFigure:
+        """
+        return cls(
+            data["body"],
+            {int(trace_index): events for trace_index, events in data["trace_to_event"]},
+            data["selected_activities"],
+            data["selected_object_types"],
+        )
+
+
+class FigureCache:
+    """
+    Process-wide LRU cache of rendered figures, bounded by a memory budget.
+    Keys identify the file content and every input of the figure, so entries never become stale.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        spill_dir: str = None,
+        spill_max_bytes: int = DEFAULT_SPILL_MAX_BYTES,
+    ):
+        """
+        Initialisation method
+
+        Args:
+            max_bytes (int): memory budget of all cached figures
+            spill_dir (str): directory evicted figures are written to, None to drop them
+            spill_max_bytes (int): disk budget of the spilled figures
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Returns the cached figure, figures spilled to disk are loaded back into memory
+
+        Args:
+            key (str): canonical hash of the figure inputs
+
+        Returns:
+            RenderedFigure: or None if the figure is not cached
+        """
+        if key is None:
+            return None
+        with self.lock:
+            figure = self.entries.get(key)
+            if figure is not None:
+                self.entries.move_to_end(key)
+                return figure
+
+        figure = self.read_spilled(key)
+        if figure is not None:
+            self.put(key, figure)
+        return figure
+
+    def put(self, key: str, figure: RenderedFigure):
+        """
+        Adds a figure to the cache
+
+        Args:
+            key (str): canonical hash of the figure inputs
+            figure (RenderedFigure):
+        """
+        if key is None or figure.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self.entries[key] = figure
+            self.nbytes += figure.nbytes
+            evicted = self.evict()
+        for evicted_key, evicted_figure in evicted:
+            self.spill(evicted_key, evicted_figure)
+
+    def evict(self) -> list:
+        """
+        Removes the least recently used figures until the cache fits the memory budget.
+        Expects self.lock to be held.
+
+        Returns:
+            list: evicted (key, figure) pairs
+        """
+        evicted = []
+        while self.nbytes > self.max_bytes and self.entries:
+            key, figure = self.entries.popitem(last=False)
+            self.nbytes -= figure.nbytes
+            evicted.append((key, figure))
+        return evicted
+
+    def get_spill_path(self, key: str) -> str:
+        """
+        Returns the path a figure is spilled to
+
+        Args:
+            key (str):
+
+        Returns:
+            str:
+        """
+        return join(self.spill_dir, key + ".json")
+
+    def spill(self, key: str, figure: RenderedFigure):
+        """
+        Writes an evicted figure to the spill directory, if one is configured
+
+        Args:
+            key (str):
+            figure (RenderedFigure):
+        """
+        if self.spill_dir is None:
+            return
+        path = self.get_spill_path(key)
+        tmp_path = "{}.tmp-{}-{}".format(path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(figure.to_dict(), f, default=int)
+            os.replace(tmp_path, path)
+            self.trim_spill_dir()
+        except OSError:
+            # spilling is best effort, the figure is rendered again on its next request
+            if exists(tmp_path):
+                os.remove(tmp_path)
+
+    def read_spilled(self, key: str):
+        """
+        Loads a figure from the spill directory
+
+        Args:
+            key (str):
+
+        Returns:
+            RenderedFigure: or None if the figure has not been spilled
+        """
+        if self.spill_dir is None:
+            return None
+        path = self.get_spill_path(key)
+        try:
+            with open(path) as f:
+                figure = RenderedFigure.from_dict(json.load(f))
+            # the figure moves back to memory
+            os.remove(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return figure
+
+    def trim_spill_dir(self):
+        """
+        Removes the oldest spilled figures until the spill directory fits its disk budget
+        """
+        files = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+cache = FigureCache(
+    int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)),
+    os.environ.get(SPILL_DIR_ENV),
+    int(os.environ.get(SPILL_MAX_BYTES_ENV, DEFAULT_SPILL_MAX_BYTES)),
+)
+
+
+def get_figure(key: str):
+    """
+    Returns the cached figure for the key
+
+    Args:
+        key (str): canonical hash of the figure inputs
+
+    Returns:
+        RenderedFigure: or None if the figure is not cached
+    """
+    return cache.get(key)
+
+
+def put_figure(key: str, figure: RenderedFigure):
+    """
+    Adds a rendered figure to the cache
+
+    Args:
+        key (str): canonical hash of the figure inputs
+        figure (RenderedFigure):
+    """
+    cache.put(key, figure)
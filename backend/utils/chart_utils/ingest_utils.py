@@ -0,0 +1,332 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+
+from utils.chart_utils import (
+    bitmap_utils,
+    ocel_cache,
+    performance_metric_utils,
+    process_utils,
+    profile_utils,
+)
+from utils.chart_utils.chart import EVENT_SAMPLE_SIZES
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sidecar_utils, sqlite_utils
+
+STATUS_FILE = "ingest.json"
+
+# stages of an ingest job in the order they run
+STAGES = ["parse", "profile", "indexes", "metrics", "flatten"]
+
+# number of ingest jobs running at the same time per process, can be overwritten with the environment variable
+WORKERS_ENV = "DOTTIE_INGEST_WORKERS"
+DEFAULT_WORKERS = 2
+
+# a job whose status has not been updated for this long is assumed to have died with its process
+STALE_SECONDS = 600
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the worker pool of the process, it is created on first use so forked server workers get their own
+
+    Returns:
+        ThreadPoolExecutor:
+    """
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)),
+                thread_name_prefix="ingest",
+            )
+        return executor
+
+
+def new_status(file_name: str) -> dict:
+    """
+    Creates the status of a job that has just been queued
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict:
+    """
+    return {
+        "source": sidecar_utils.get_source_version(file_name),
+        "state": "queued",
+        "stage": None,
+        "stages": {stage: "pending" for stage in STAGES},
+        "flattened": [0, 0],
+        "error": "",
+        "updated_at": time.time(),
+    }
+
+
+def read_status(file_name: str):
+    """
+    Reads the status of the last ingest job of the file
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict: the status, None if the current version of the file has not been ingested
+    """
+    try:
+        with open(join(fu.get_sidecar_dir(file_name), STATUS_FILE)) as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if status.get("source") != sidecar_utils.get_source_version(file_name):
+        return None
+    return status
+
+
+def write_status(file_name: str, status: dict):
+    """
+    Stores the status of the ingest job, so that every server process can report it
+
+    Args:
+        file_name (str):
+        status (dict):
+    """
+    if not fu.check_file_exists(file_name):
+        # the file has been deleted while it was ingested
+        return
+    status["updated_at"] = time.time()
+    sidecar_dir = fu.get_sidecar_dir(file_name)
+    os.makedirs(sidecar_dir, exist_ok=True)
+    tmp_path = join(
+        sidecar_dir,
+        "{}.tmp-{}-{}".format(STATUS_FILE, os.getpid(), threading.get_ident()),
+    )
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, join(sidecar_dir, STATUS_FILE))
+
+
+def is_running(status: dict) -> bool:
+    """
+    Checks if the job of the status is queued or running and still alive
+
+    Args:
+        status (dict):
+
+    Returns:
+        bool:
+    """
+    return (
+        status["state"] in ("queued", "processing")
+        and time.time() - status["updated_at"] < STALE_SECONDS
+    )
+
+
+def enqueue_ingest(file_name: str) -> dict:
+    """
+    Queues an ingest job for the file in the worker pool
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict: status of the queued job
+    """
+    status = new_status(file_name)
+    write_status(file_name, status)
+    get_executor().submit(run_ingest, file_name, status)
+    return status
+
+
+def claim_ingest(file_name: str):
+    """
+    Claims the ingest job of a file without a running job by creating its status file exclusively, so that
+    of several requests and server processes that find the file without a job only one ingests it.
+    The status of an outdated or dead job is moved away first, the process that finds another status
+    than the one it has read in its place has lost the claim and puts that status back.
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict: status of the claimed job, None if another process holds the claim
+    """
+    sidecar_dir = fu.get_sidecar_dir(file_name)
+    status_path = join(sidecar_dir, STATUS_FILE)
+    os.makedirs(sidecar_dir, exist_ok=True)
+    try:
+        with open(status_path) as f:
+            previous = f.read()
+    except FileNotFoundError:
+        previous = None
+
+    if previous is not None:
+        try:
+            previous_status = json.loads(previous)
+        except ValueError:
+            previous_status = None
+        if (
+            previous_status is not None
+            and previous_status.get("source") == sidecar_utils.get_source_version(file_name)
+            and is_running(previous_status)
+        ):
+            return None
+        moved_path = join(
+            sidecar_dir,
+            "{}.old-{}-{}".format(STATUS_FILE, os.getpid(), threading.get_ident()),
+        )
+        try:
+            os.rename(status_path, moved_path)
+        except FileNotFoundError:
+            return None
+        with open(moved_path) as f:
+            moved = f.read()
+        if moved != previous:
+            # another process has claimed the job in the meantime
+            try:
+                os.link(moved_path, status_path)
+            except FileExistsError:
+                pass
+            os.remove(moved_path)
+            return None
+        os.remove(moved_path)
+
+    status = new_status(file_name)
+    try:
+        fd = os.open(status_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, "w") as f:
+        json.dump(status, f)
+    return status
+
+
+def get_ingest_state(file_name: str) -> str:
+    """
+    Returns if the artifacts of the file are ready, an ingest job is started for files without one.
+    Requests for failed files build what they need themselves and report the error.
+
+    Args:
+        file_name (str):
+
+    Returns:
+        str: "ready", "processing" or "failed"
+    """
+    if not file_name or not fu.check_file_exists(file_name):
+        return "failed"
+    status = read_status(file_name)
+    if status is None or (
+        status["state"] in ("queued", "processing") and not is_running(status)
+    ):
+        # the file has not been ingested yet or its job died
+        status = claim_ingest(file_name)
+        if status is not None:
+            get_executor().submit(run_ingest, file_name, status)
+        return "processing"
+    if status["state"] in ("queued", "processing"):
+        return "processing"
+    return status["state"]
+
+
+def run_ingest(file_name: str, status: dict):
+    """
+    Parses the log and builds the artifacts the chart endpoints serve from, stage by stage.
+    The status is updated after every stage. The job stops if the file is deleted, so that
+    no sidecar is written for a file that no longer exists.
+
+    Args:
+        file_name (str):
+        status (dict): status written by enqueue_ingest
+    """
+    status["state"] = "processing"
+    try:
+        for stage in STAGES:
+            if not fu.check_file_exists(file_name):
+                return
+            status["stage"] = stage
+            status["stages"][stage] = "running"
+            write_status(file_name, status)
+            STAGE_BUILDERS[stage](file_name, status)
+            status["stages"][stage] = "done"
+        status["state"] = "ready"
+        status["stage"] = None
+    except Exception as e:
+        status["state"] = "failed"
+        status["stages"][status["stage"]] = "failed"
+        status["error"] = str(e)
+    write_status(file_name, status)
+
+
+def parse_log(file_name: str, status: dict):
+    """
+    Parses the log into the cache of this process, the log is stored as columnar sidecar on its first parse.
+    Databases are queried directly and are not parsed.
+    """
+    if sqlite_utils.is_sqlite(file_name):
+        return
+    ocel_cache.get_ocel(file_name)
+
+
+def store_profile(file_name: str, status: dict):
+    """
+    Computes and stores the profile of the log
+    """
+    profile_utils.write_profile(file_name, profile_utils.compute_profile(file_name))
+
+
+def build_indexes(file_name: str, status: dict):
+    """
+    Builds the event-object mapping, attribute index and the time and bitmap indexes of the eventID view,
+    databases look attributes up and query the pages of the paginated view with their own indexes
+    """
+    sample_sizes = list(EVENT_SAMPLE_SIZES.values())
+    if not sqlite_utils.is_sqlite(file_name):
+        performance_metric_utils.get_attribute_index(file_name)
+        sample_sizes.append(None)
+    for sample_size in sample_sizes:
+        process_utils.get_time_index(file_name, "eventID", sample_size)
+        bitmap_utils.get_bitmap_index(file_name, "eventID", sample_size)
+
+
+def build_metrics(file_name: str, status: dict):
+    """
+    Builds the object lifecycles of the log, databases look lifecycles up with their own indexes
+    """
+    if sqlite_utils.is_sqlite(file_name):
+        return
+    performance_metric_utils.get_object_lifecycles_table(file_name)
+
+
+def flatten_views(file_name: str, status: dict):
+    """
+    Flattens the log on every object type in one pass and stores the views in the sidecar,
+    databases query the flattened views with their filters instead
+    """
+    if sqlite_utils.is_sqlite(file_name):
+        return
+    object_types = profile_utils.get_profile(file_name)["object_types"]
+    sidecar_utils.write_flattened_views(file_name, [])
+    status["flattened"] = [0, len(object_types)]
+    for object_type in object_types:
+        df = process_utils.get_base_df(file_name, object_type)
+        sidecar_utils.write_flattened(file_name, object_type, df)
+        process_utils.get_time_index(file_name, object_type)
+        bitmap_utils.get_bitmap_index(file_name, object_type)
+        status["flattened"][0] += 1
+        write_status(file_name, status)
+
+
+STAGE_BUILDERS = {
+    "parse": parse_log,
+    "profile": store_profile,
+    "indexes": build_indexes,
+    "metrics": build_metrics,
+    "flatten": flatten_views,
+}
@@ -0,0 +1,395 @@
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pm4py.objects.ocel.obj import OCEL
+
+from utils.filemanager_utils import sidecar_utils, sqlite_utils
+from utils.filemanager_utils.filemanager_utils import get_path_from_name
+from utils.http_utils.metrics_utils import stage_errors, timed
+
+logger = logging.getLogger(__name__)
+
+# memory budget of the cache in bytes, can be overwritten with the environment variable
+MAX_BYTES_ENV = "DOTTIE_OCEL_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# string columns of the OCEL tables that repeat a few distinct values, stored as categoricals
+CATEGORICAL_COLUMNS = {
+    "events": ["ocel:activity"],
+    "objects": ["ocel:type"],
+    "relations": ["ocel:eid", "ocel:activity", "ocel:oid", "ocel:type", "ocel:qualifier"],
+}
+
+
+def estimate_nbytes(obj) -> int:
+    """
+    Estimates the memory footprint of a cached object
+
+    Args:
+        obj: OCEL, dataframe, array or container of those
+
+    Returns:
+        int: estimated size in bytes
+    """
+    if isinstance(obj, OCEL):
+        return sum(
+            estimate_nbytes(table)
+            for table in (
+                obj.events,
+                obj.objects,
+                obj.relations,
+                obj.o2o,
+                obj.e2e,
+                obj.object_changes,
+            )
+        )
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_nbytes(k) + estimate_nbytes(v) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(x) for x in obj)
+    return sys.getsizeof(obj)
+
+
+def get_file_key(file_path: str) -> tuple:
+    """
+    Identifies the current version of a file on disk
+
+    Args:
+        file_path (str):
+
+    Returns:
+        tuple: (path, mtime in ns, size in bytes)
+    """
+    stat = os.stat(file_path)
+    return file_path, stat.st_mtime_ns, stat.st_size
+
+
+def compact_ocel(ocel: OCEL) -> OCEL:
+    """
+    Stores the repeated string columns of the OCEL tables as categoricals, integer codes into a
+    dictionary of the distinct values
+
+    Args:
+        ocel (OCEL): parsed event log, modified in place
+
+    Returns:
+        OCEL: the event log
+    """
+    for table, columns in CATEGORICAL_COLUMNS.items():
+        df = getattr(ocel, table)
+        for column in columns:
+            if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype("category")
+    return ocel
+
+
+@timed("parse")
+def read_log(file_name: str) -> OCEL:
+    """
+    Loads an event log from its columnar sidecar, falls back to parsing the original file
+
+    Args:
+        file_name (str):
+
+    Returns:
+        OCEL: parsed event log with compact columns
+    """
+    ocel = sidecar_utils.read_sidecar(file_name)
+    if ocel is not None:
+        return compact_ocel(ocel)
+
+    ocel = compact_ocel(sqlite_utils.read_ocel_file(get_path_from_name(file_name)))
+    try:
+        # files uploaded before sidecars existed get one on their first load
+        sidecar_utils.write_sidecar(file_name, ocel)
+    except Exception:
+        # the log is served without a sidecar, the failure is reported instead of aborting the request
+        logger.exception("writing the sidecar of %s failed", file_name)
+        stage_errors.inc("write_sidecar")
+    return ocel
+
+
+class LoadedLog:
+    """
+    A parsed event log together with the artifacts that have been derived from it
+    """
+
+    def __init__(self, key: tuple, ocel: OCEL):
+        """
+        Initialisation method
+
+        Args:
+            key (tuple): file key of the parsed file version
+            ocel (OCEL): the parsed event log, None for databases that are only parsed on demand
+        """
+        self.key = key
+        self.ocel = ocel
+        self.artifacts = dict()
+        self.nbytes = estimate_nbytes(ocel)
+
+        # guards the creation of artifacts, reentrant so builders can depend on other artifacts
+        self.lock = threading.RLock()
+
+
+class OcelCache:
+    """
+    Process-wide LRU cache of parsed event logs, bounded by a memory budget
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialisation method
+
+        Args:
+            max_bytes (int): memory budget of all cached logs and their artifacts
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.load_locks = dict()
+
+    def get(self, file_name: str, parse: bool = True) -> LoadedLog:
+        """
+        Returns the cached log of the file, parses the file if it is not cached or has changed on disk
+
+        Args:
+            file_name (str):
+            parse (bool): False to return an entry without parsing the log, for artifacts that are
+                read from disk, the log is parsed by the first call that needs it
+
+        Returns:
+            LoadedLog:
+        """
+        file_path = get_path_from_name(file_name)
+        try:
+            key = get_file_key(file_path)
+        except FileNotFoundError:
+            self.invalidate(file_name)
+            raise
+
+        entry = self.lookup(file_path, key)
+        if entry is not None:
+            if parse and not sqlite_utils.is_sqlite(file_name):
+                self.load(entry, file_name)
+            return entry
+
+        # concurrent requests for the same file wait for a single parse
+        with self.lock:
+            load_lock = self.load_locks.setdefault(file_path, threading.Lock())
+        with load_lock:
+            entry = self.lookup(file_path, key)
+            if entry is not None:
+                if parse and not sqlite_utils.is_sqlite(file_name):
+                    self.load(entry, file_name)
+                return entry
+            if sqlite_utils.is_sqlite(file_name) or not parse:
+                # databases are queried directly, the full log is only parsed if it is needed
+                entry = LoadedLog(key, None)
+            else:
+                entry = LoadedLog(key, read_log(file_name))
+            with self.lock:
+                self.entries[file_path] = entry
+                self.entries.move_to_end(file_path)
+                self.evict()
+        return entry
+
+    def lookup(self, file_path: str, key: tuple):
+        """
+        Returns the cached entry if it matches the given file version
+
+        Args:
+            file_path (str):
+            key (tuple): current file key
+
+        Returns:
+            LoadedLog: or None if there is no valid entry
+        """
+        with self.lock:
+            entry = self.entries.get(file_path)
+            if entry is None:
+                return None
+            if entry.key != key:
+                # the file has been replaced since it was parsed
+                del self.entries[file_path]
+                return None
+            self.entries.move_to_end(file_path)
+            return entry
+
+    def get_ocel(self, file_name: str) -> OCEL:
+        """
+        Returns the parsed log of the file, databases are parsed on their first call
+
+        Args:
+            file_name (str):
+
+        Returns:
+            OCEL:
+        """
+        return self.load(self.get(file_name, parse=False), file_name)
+
+    def load(self, entry: LoadedLog, file_name: str) -> OCEL:
+        """
+        Parses the log of an entry that has been created without it
+
+        Args:
+            entry (LoadedLog):
+            file_name (str):
+
+        Returns:
+            OCEL:
+        """
+        with entry.lock:
+            if entry.ocel is None:
+                entry.ocel = read_log(file_name)
+                with self.lock:
+                    entry.nbytes += estimate_nbytes(entry.ocel)
+                    self.evict()
+            return entry.ocel
+
+    def get_artifact(self, file_name: str, name: str, builder, parse: bool = True):
+        """
+        Returns an artifact derived from the log, the artifact is built once per parsed file version
+
+        Args:
+            file_name (str):
+            name (str): unique name of the artifact
+            builder (callable): function that builds the artifact from the OCEL,
+                the OCEL is None for databases that have not been parsed
+            parse (bool): False for builders that do not need the OCEL, they are passed None
+                unless the log has already been parsed
+
+        Returns:
+            the artifact
+        """
+        entry = self.get(file_name, parse=parse)
+        with entry.lock:
+            if name not in entry.artifacts:
+                artifact = builder(entry.ocel)
+                entry.artifacts[name] = artifact
+                with self.lock:
+                    entry.nbytes += estimate_nbytes(artifact)
+                    self.evict()
+            return entry.artifacts[name]
+
+    def peek_artifact(self, file_name: str, name: str):
+        """
+        Returns an artifact of the log if it has already been built for the current version of the file
+
+        Args:
+            file_name (str):
+            name (str): unique name of the artifact
+
+        Returns:
+            the artifact, None if it has not been built
+        """
+        file_path = get_path_from_name(file_name)
+        try:
+            key = get_file_key(file_path)
+        except FileNotFoundError:
+            return None
+        entry = self.lookup(file_path, key)
+        if entry is None:
+            return None
+        return entry.artifacts.get(name)
+
+    def evict(self):
+        """
+        Removes the least recently used logs until the cache fits the memory budget,
+        the most recently used log is always kept. Expects self.lock to be held.
+        """
+        total = sum(entry.nbytes for entry in self.entries.values())
+        while total > self.max_bytes and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            total -= entry.nbytes
+
+    def invalidate(self, file_name: str):
+        """
+        Removes the log of the file from the cache
+
+        Args:
+            file_name (str):
+        """
+        file_path = get_path_from_name(file_name)
+        with self.lock:
+            self.entries.pop(file_path, None)
+            self.load_locks.pop(file_path, None)
+
+    def set_max_bytes(self, max_bytes: int):
+        """
+        Setter method for max_bytes
+
+        Args:
+            max_bytes (int):
+        """
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+
+cache = OcelCache(int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)))
+
+
+def get_ocel(file_name: str) -> OCEL:
+    """
+    Returns the parsed event log of the file, the returned OCEL is shared and must not be modified
+
+    Args:
+        file_name (str):
+
+    Returns:
+        OCEL:
+    """
+    return cache.get_ocel(file_name)
+
+
+def get_artifact(file_name: str, name: str, builder, parse: bool = True):
+    """
+    Returns an artifact derived from the parsed event log of the file
+
+    Args:
+        file_name (str):
+        name (str): unique name of the artifact
+        builder (callable): function that builds the artifact from the OCEL
+        parse (bool): False for builders that do not need the parsed log
+
+    Returns:
+        the artifact
+    """
+    return cache.get_artifact(file_name, name, builder, parse)
+
+
+def peek_artifact(file_name: str, name: str):
+    """
+    Returns an artifact derived from the event log of the file without building it
+
+    Args:
+        file_name (str):
+        name (str): unique name of the artifact
+
+    Returns:
+        the artifact, None if it has not been built
+    """
+    return cache.peek_artifact(file_name, name)
+
+
+def invalidate(file_name: str):
+    """
+    Removes the parsed event log of the file from the cache
+
+    Args:
+        file_name (str):
+    """
+    cache.invalidate(file_name)
@@ -1,10 +1,12 @@
-import pm4py
+import numpy as np
+import pandas as pd
 import re
+import sqlite3
 
-from pm4py import ocel as pm4py_ocel
-from pm4py import ocel_get_attribute_names
-
-from utils.filemanager_utils import filemanager_utils as fu
+from utils.chart_utils.ocel_cache import get_artifact, get_ocel
+from utils.chart_utils.profile_utils import get_profile
+from utils.filemanager_utils import sqlite_utils
+from utils.http_utils.metrics_utils import timed
 
 
 """
@@ -14,35 +16,16 @@ returns a dictionary that contains the following metrics of the the whole event
 - all contained activity names
 - how many events are in the log
 - a nested dictionary of how many activities per name occur
+- how many objects and relations are in the log, and how many objects per object type
+- the time span of the log
 """
 
 
+@timed()
 def get_general_metrics(filename):
     try:
-        ## assemble data
-        filepath = fu.get_path_from_name(filename)
-        ocel = pm4py.read_ocel(filepath)
-        df = ocel.get_extended_table()
-
-        # simple metrics
-        object_types = pm4py_ocel.ocel_get_object_types(ocel)
-        attribute_names = ocel_get_attribute_names(ocel)
-        tmp_activities = df["ocel:activity"].unique()
-
-        # count per activity
-        activities = list()
-        for x in tmp_activities:
-            activities.append(x)
-        activity_count = len(df.index)
-        count_per_activity = df["ocel:activity"].value_counts().to_dict()
-
-        result = {
-            "object_types": object_types,
-            "attribute_names": attribute_names,
-            "activities": activities,
-            "activity_count": activity_count,
-            "count_per_activity": count_per_activity,
-        }
+        # the metrics are part of the profile that is computed once per log
+        result = get_profile(filename)
         return result
     except:
         result = {
@@ -52,80 +35,195 @@ def get_general_metrics(filename):
         return result
 
 
+"""
+builds the lifecycle table of all objects in an event log in one pass over the relations joined with the events:
+- the activities, eventIDs and timestamps of every object as flat arrays, grouped by object with offsets
+- start, end and duration of every object lifecycle
+"""
+
+
+@timed()
+def build_object_lifecycles(ocel):
+    relations = ocel.relations[["ocel:oid", "ocel:eid", "ocel:activity"]].merge(
+        ocel.events[["ocel:eid", "ocel:timestamp"]], on="ocel:eid", how="left"
+    )
+    oid_codes, oids = pd.factorize(relations["ocel:oid"])
+    order = np.argsort(oid_codes, kind="stable")
+
+    timestamps = relations["ocel:timestamp"]
+    lifecycle_start = timestamps.groupby(oid_codes).min()
+    lifecycle_end = timestamps.groupby(oid_codes).max()
+
+    return {
+        "object_positions": pd.Index(oids),
+        "offsets": np.searchsorted(oid_codes[order], np.arange(len(oids) + 1)),
+        "activities": relations["ocel:activity"].to_numpy()[order],
+        "eids": relations["ocel:eid"].to_numpy()[order],
+        "timestamps": timestamps.iloc[order].reset_index(drop=True),
+        "start": lifecycle_start.reset_index(drop=True),
+        "end": lifecycle_end.reset_index(drop=True),
+        "duration": (lifecycle_end - lifecycle_start).dt.total_seconds().to_numpy(),
+    }
+
+
+def get_object_lifecycles_table(filename):
+    return get_artifact(filename, "object_lifecycles", build_object_lifecycles)
+
+
 """
 returns a dictionary that contains the following information about a given Object in a given event log:
 - all the activities the object occurs in, including their eventIDs and timestamps
 - duration of the object lifecycle
 - start of the object lifecycle
 - end of the object lifecycle
+databases are queried for the single object instead of building the lifecycle table
 """
 
 
+@timed()
 def get_object_lifecycle(oid, filename):
     try:
-        # collect data
-        filepath = fu.get_path_from_name(filename)
-        ocel = pm4py.read_ocel(filepath)
-        all_objects_summary = pm4py.ocel_objects_summary(ocel)
-        relations = ocel.relations.loc[ocel.relations["ocel:oid"] == oid]
-
-        # get single object information
-        single_object_summary = all_objects_summary.loc[
-            all_objects_summary["ocel:oid"] == oid
-        ]
-        object_lifecycle_activities = single_object_summary["activities_lifecycle"].iloc[0]
-        object_lifecycle_duration = single_object_summary["lifecycle_duration"].iloc[0]
-        object_lifecycle_start = single_object_summary["lifecycle_start"].iloc[0]
-        object_lifecycle_end = single_object_summary["lifecycle_end"].iloc[0]
-        object_lifecycle_eids = relations["ocel:eid"].tolist()
-        object_lifecycle_timestamps = []
-        for eid in object_lifecycle_eids:
-            tmp = ocel.events.loc[ocel.events["ocel:eid"] == eid]
-            timestamp = tmp["ocel:timestamp"].iloc[0]
-            object_lifecycle_timestamps.append(timestamp)
+        if sqlite_utils.is_sqlite(filename):
+            return sqlite_utils.query_object_lifecycle(filename, oid)
+        lifecycles = get_object_lifecycles_table(filename)
+    except (KeyError, OSError, ValueError, sqlite3.Error):
         result = {
-            "error": False,
-            "object_lifecycle_activities": object_lifecycle_activities,
-            "object_lifecycle_duration": object_lifecycle_duration,
-            "object_lifecycle_start": object_lifecycle_start,
-            "object_lifecycle_end": object_lifecycle_end,
-            "object_lifecycle_eids": object_lifecycle_eids,
-            "object_lifecycle_timestamps": object_lifecycle_timestamps,
+            "error": True,
+            "errorMessage": "could not generate dot metrics"
         }
         return result
-    except:
+    return lookup_object_lifecycle(lifecycles, oid)
+
+
+"""
+returns a dictionary that maps each of the given Objects to its lifecycle information, see get_object_lifecycle
+"""
+
+
+@timed()
+def get_object_lifecycles(oids, filename):
+    try:
+        lifecycles = None if sqlite_utils.is_sqlite(filename) else get_object_lifecycles_table(filename)
+    except (KeyError, OSError, ValueError, sqlite3.Error):
         result = {
             "error": True,
             "errorMessage": "could not generate dot metrics"
         }
         return result
 
+    result = dict()
+    for oid in oids:
+        if lifecycles is not None:
+            result[oid] = lookup_object_lifecycle(lifecycles, oid)
+            continue
+        try:
+            result[oid] = sqlite_utils.query_object_lifecycle(filename, oid)
+        except (KeyError, sqlite3.Error):
+            result[oid] = {
+                "error": True,
+                "errorMessage": "could not generate dot metrics"
+            }
+    return result
+
+
 """
-returns a dictionary that contains the given objects attributes in the given event log
+returns the lifecycle information of a single Object from the lifecycle table, an error for unknown Objects
 """
 
 
-def get_object_attributes(oid, filename):
+def lookup_object_lifecycle(lifecycles, oid):
+    position = get_position(lifecycles["object_positions"], oid)
+    if position is None:
+        result = {
+            "error": True,
+            "errorMessage": "could not generate dot metrics"
+        }
+        return result
+    start, end = lifecycles["offsets"][position], lifecycles["offsets"][position + 1]
+    result = {
+        "error": False,
+        "object_lifecycle_activities": lifecycles["activities"][start:end].tolist(),
+        "object_lifecycle_duration": lifecycles["duration"][position],
+        "object_lifecycle_start": lifecycles["start"].iloc[position],
+        "object_lifecycle_end": lifecycles["end"].iloc[position],
+        "object_lifecycle_eids": lifecycles["eids"][start:end].tolist(),
+        "object_lifecycle_timestamps": lifecycles["timestamps"].iloc[start:end].tolist(),
+    }
+    return result
+
+
+"""
+builds the lookup indexes of an event log once:
+- event id and object id indexes that map to the row position in the events / objects table
+- the attribute column names of the events and objects table
+"""
+
+
+@timed()
+def build_attribute_index(ocel):
+    event_columns = ocel.events.columns.tolist()
+    object_columns = ocel.objects.columns.tolist()
+
+    # get non-attributes column names
+    event_nonattributes = list(filter(re.compile("ocel:*").match, event_columns))
+    object_nonattributes = list(filter(re.compile("ocel:.*").match, object_columns))
+
+    result = {
+        "event_positions": pd.Index(ocel.events["ocel:eid"]),
+        "object_positions": pd.Index(ocel.objects["ocel:oid"]),
+        "event_attributes": [i for i in event_columns if i not in event_nonattributes],
+        "object_attributes": [i for i in object_columns if i not in object_nonattributes],
+    }
+    # build the hash tables now instead of on the first lookup
+    result["event_positions"].get_indexer(result["event_positions"][:1])
+    result["object_positions"].get_indexer(result["object_positions"][:1])
+    return result
+
+
+def get_attribute_index(filename):
+    return get_artifact(filename, "attribute_index", build_attribute_index)
+
+
+"""
+returns the row position of the first entry with the given id in an id index, or None if there is no such entry
+"""
+
+
+def get_position(positions, key):
     try:
-        filepath = fu.get_path_from_name(filename)
-        ocel = pm4py.read_ocel(filepath)
-        object_entry = ocel.objects[ocel.objects["ocel:oid"] == oid]
+        position = positions.get_loc(key)
+    except KeyError:
+        return None
+    if isinstance(position, slice):
+        return position.start
+    if not isinstance(position, (int, np.integer)):
+        # duplicated ids return a boolean mask
+        return int(np.flatnonzero(position)[0])
+    return position
+
 
-        # get all table headers
-        tableheaders = ocel.objects.columns.tolist()
+"""
+returns a dictionary that contains the given objects attributes in the given event log
+"""
 
-        # get non-attributes column names
-        r = re.compile("ocel:.*")
-        nonattributes = list(filter(r.match, tableheaders))
 
-        # get attribute column names, by filtering out non-attribute names
-        object_attributes = [i for i in tableheaders if i not in nonattributes]
+@timed()
+def get_object_attributes(oid, filename):
+    try:
+        if sqlite_utils.is_sqlite(filename):
+            return sqlite_utils.query_attributes(filename, "object", oid)
+        ocel = get_ocel(filename)
+        attribute_index = get_attribute_index(filename)
+        position = get_position(attribute_index["object_positions"], oid)
+        if position is None:
+            raise KeyError(oid)
 
         # get attribute Values
         obj_attributes = dict()
-        for attribute in object_attributes:
-            if str(object_entry[attribute].iloc[0]) != "nan":
-                obj_attributes[attribute] = object_entry[attribute].iloc[0]
+        for attribute in attribute_index["object_attributes"]:
+            value = ocel.objects[attribute].iat[position]
+            if str(value) != "nan":
+                obj_attributes[attribute] = value
             else:
                 obj_attributes[attribute] = ""
         return obj_attributes
@@ -142,26 +240,29 @@ returns a dictionary that contains the given events attributes in the given even
 """
 
 
+@timed()
 def get_event_attributes(eid, filename):
-    filepath = fu.get_path_from_name(filename)
-    ocel = pm4py.read_ocel(filepath)
-    event_entry = ocel.events[ocel.events["ocel:eid"] == eid]
-
-    # get all table headers
-    tableheaders = ocel.events.columns.tolist()
-
-    # get non-attributes
-    r = re.compile("ocel:*")
-    nonattributes = list(filter(r.match, tableheaders))
-
-    # filter actual attributes
-    event_attributes = [i for i in tableheaders if i not in nonattributes]
+    error = {
+        "error": True,
+        "errorMessage": "could not generate event attributes"
+    }
+    if sqlite_utils.is_sqlite(filename):
+        try:
+            return sqlite_utils.query_attributes(filename, "event", eid)
+        except KeyError:
+            return error
+    ocel = get_ocel(filename)
+    attribute_index = get_attribute_index(filename)
+    position = get_position(attribute_index["event_positions"], eid)
+    if position is None:
+        return error
 
     # get attribute values
     e_attributes = dict()
-    for attribute in event_attributes:
-        if str(event_entry[attribute].iloc[0]) != "nan":
-            e_attributes[attribute] = event_entry[attribute].iloc[0]
+    for attribute in attribute_index["event_attributes"]:
+        value = ocel.events[attribute].iat[position]
+        if str(value) != "nan":
+            e_attributes[attribute] = value
         else:
             e_attributes[attribute] = ""
     return e_attributes
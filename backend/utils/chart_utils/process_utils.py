@@ -1,52 +1,192 @@
+import numpy as np
 import pandas as pd
 import pm4py
 
-from utils.filemanager_utils.filemanager_utils import get_path_from_name
+from utils.chart_utils.ocel_cache import get_artifact, get_ocel
+from utils.chart_utils.profile_utils import get_profile
+from utils.filemanager_utils import sidecar_utils, sqlite_utils
+from utils.http_utils.metrics_utils import timed
 
+# string columns of the processed dfs, stored as categoricals: integer codes into a dictionary of the distinct values
+CATEGORICAL_COLUMNS = ["eid", "activity", "case", "case:ocel:type"]
 
-def process_df(file_name: str):
+
+@timed("process")
+def process_df(file_name: str, sample_size: int = 10):
     """
-    Loading and processing of data from file
+    Loading and processing of data from file, databases only read the sampled events and their relations.
+    The related objects of an event are referenced by its position in the event-object mapping,
+    see get_objects_of_event.
 
     Args:
         file_name (str):
+        sample_size (int): number of evenly spaced events to keep, None keeps all events for the paginated view
 
     Returns:
         pd.DataFrame: processed df
     """
-    file_path = get_path_from_name(file_name)
-    ocel = pm4py.read_ocel(file_path)
-    df = ocel.get_extended_table()
-    df = downsample_df(df, 10)
-    object_types = pm4py.ocel_get_object_types(ocel)
+    if sqlite_utils.is_sqlite(file_name):
+        df = sqlite_utils.query_sampled_events(file_name, sample_size)
+    else:
+        ocel = get_ocel(file_name)
+        df = ocel.events[["ocel:eid", "ocel:timestamp", "ocel:activity"]]
+        if sample_size is not None:
+            df = downsample_df(df, sample_size)
+
+        # Format columns
+        df = df.rename(
+            columns={
+                "ocel:activity": "activity",
+                "ocel:timestamp": "timestamp",
+                "ocel:eid": "eid",
+            }
+        )
 
     # Create a new column
-    df["objects"] = None
-
-    # Iterate through each row
-    for index, row in df.iterrows():
-        # Access the values in each column of the current row
-        new_value = dict()
-        for o in object_types:
-            # Define value
-            new_value[o] = []
-            data_type = type(row[f"ocel:type:{o}"])
-            if data_type == list:
-                new_value[o] = row[f"ocel:type:{o}"]
-
-        # Assign the new value to the 'NewColumn' for the current row
-        df.at[index, "objects"] = new_value
-
-    # Format columns
-    df = df.rename(
-        columns={
-            "ocel:activity": "activity",
-            "ocel:timestamp": "timestamp",
-            "ocel:eid": "eid",
-        }
+    event_objects = get_event_objects(file_name, sample_size, df["eid"])
+    df["relations"] = event_objects["eids"].get_indexer(df["eid"]).astype(np.int32)
+
+    return compact_df(sort_by_time(df))
+
+
+def build_event_objects(ocel) -> dict:
+    """
+    Builds a compact mapping from all events of the log to their related objects
+
+    Args:
+        ocel (OCEL):
+
+    Returns:
+        dict: mapping built by group_relations
+    """
+    return group_relations(ocel.relations, pm4py.ocel_get_object_types(ocel))
+
+
+def group_relations(relations: pd.DataFrame, object_types: list) -> dict:
+    """
+    Builds a compact mapping from events to their related objects in one pass over the relations.
+    The relations are grouped by event, keeping their original order, and stored as flat integer
+    arrays with offsets per event. Objects are stored as codes into a dictionary of object ids.
+
+    Args:
+        relations (pd.DataFrame): relations with "ocel:eid", "ocel:type" and "ocel:oid" columns
+        object_types (list): all object types of the log
+
+    Returns:
+        dict: event ids, offsets into the flat arrays, object type codes, object types,
+            object codes and object ids
+    """
+    eid_codes, eids = pd.factorize(relations["ocel:eid"])
+    order = np.argsort(eid_codes, kind="stable")
+
+    type_codes = pd.Categorical(relations["ocel:type"], categories=object_types).codes
+    oid_codes, oids = pd.factorize(relations["ocel:oid"])
+
+    return {
+        "eids": pd.Index(eids),
+        "offsets": np.searchsorted(eid_codes[order], np.arange(len(eids) + 1)).astype(np.int64),
+        "type_codes": type_codes[order],
+        "object_types": object_types,
+        "oid_codes": oid_codes[order].astype(np.int32),
+        "oids": np.asarray(oids),
+    }
+
+
+def get_event_objects(file_name: str, sample_size: int = 10, eids: pd.Series = None) -> dict:
+    """
+    Returns the mapping from events to their related objects. For databases only the relations
+    of the events of the sampled "eventID" view are read.
+
+    Args:
+        file_name (str):
+        sample_size (int): number of events kept in the "eventID" view, None for all events
+        eids (pd.Series): event ids of the "eventID" view, only needed for databases
+
+    Returns:
+        dict: mapping built by group_relations
+    """
+    if not sqlite_utils.is_sqlite(file_name):
+        return get_artifact(file_name, "event_objects", build_event_objects)
+    return get_artifact(
+        file_name,
+        get_base_name("eventID", sample_size) + ":event_objects",
+        lambda ocel: group_relations(
+            sqlite_utils.query_relations_of_events(file_name, eids),
+            get_profile(file_name)["object_types"],
+        ),
     )
 
-    return df
+
+def query_event_page(
+    file_name: str,
+    activities: list,
+    object_types: list,
+    start_time,
+    end_time,
+    cursor: str,
+    cursor_time,
+    page_size: int,
+    direction: str,
+) -> tuple:
+    """
+    Reads a page of the paginated "eventID" view of a database. The filters and the page window are
+    evaluated by indexed queries and only the relations of the events on the page are read, so no
+    part of the log besides the page is loaded.
+
+    Args:
+        file_name (str):
+        activities (list): allowed activities
+        object_types (list): object types every event has to be related to, unknown types are ignored
+        start_time: filter start date, None for no start date
+        end_time: filter end date, None for no end date
+        cursor (str): event id the page starts at, or ends before for the direction "prev"
+        cursor_time: timestamp the page starts at if the cursor event is unknown
+        page_size (int): number of events per page
+        direction (str): "next" or "prev"
+
+    Returns:
+        tuple: processed df of the page, mapping built by group_relations for its events and the
+            cursors of the neighbouring pages
+    """
+    known_object_types = get_profile(file_name)["object_types"]
+    df, page = sqlite_utils.query_event_page(
+        file_name,
+        set(activities),
+        [o for o in dict.fromkeys(object_types) if o in known_object_types],
+        start_time,
+        end_time,
+        cursor,
+        cursor_time,
+        page_size,
+        direction,
+    )
+    event_objects = group_relations(
+        sqlite_utils.query_relations_of_events(file_name, df["eid"]),
+        known_object_types,
+    )
+    df["relations"] = event_objects["eids"].get_indexer(df["eid"]).astype(np.int32)
+    return compact_df(df), event_objects, page
+
+
+def get_objects_of_event(event_objects: dict, position: int) -> dict:
+    """
+    Collects the related objects per object type of an event
+
+    Args:
+        event_objects (dict): mapping built by group_relations
+        position (int): position of the event in the mapping, the "relations" column of the processed df
+
+    Returns:
+        dict: every object type mapped to the list of related object ids
+    """
+    object_types = event_objects["object_types"]
+    objects = {o: [] for o in object_types}
+    if position != -1:
+        start, end = event_objects["offsets"][position], event_objects["offsets"][position + 1]
+        oids = event_objects["oids"][event_objects["oid_codes"][start:end]]
+        for type_code, oid in zip(event_objects["type_codes"][start:end], oids):
+            objects[object_types[type_code]].append(oid)
+    return objects
 
 
 def downsample_df(original_df: pd.DataFrame, n: int):
@@ -74,10 +214,12 @@ def downsample_df(original_df: pd.DataFrame, n: int):
     return df
 
 
+@timed("flatten")
 def process_flatten_df(file_name: str, view: str):
     """
-    Loading, flattening and processing of data from file
-
+    Loading, flattening and processing of data from file, views flattened during ingest are
+    read from the sidecar and databases only read the relations to objects of the type.
+    Otherwise the view is sliced from the flattened views of all object types, see build_flattened_views.
 
     Args:
         file_name (str):
@@ -86,17 +228,204 @@ def process_flatten_df(file_name: str, view: str):
     Returns:
         pd.Dataframe: processed df
     """
-    file_path = get_path_from_name(file_name)
-    ocel = pm4py.read_ocel(file_path)
-    df = pm4py.ocel_flattening(ocel, view)
+    df = sidecar_utils.read_flattened(file_name, view)
+    if df is not None:
+        return compact_df(df)
+
+    if sqlite_utils.is_sqlite(file_name):
+        return compact_df(sort_by_time(sqlite_utils.query_flattened(file_name, view)))
+
+    # all object types are flattened at once, the view is a range of the shared rows
+    views = get_artifact(file_name, "flattened_views", build_flattened_views)
+    start, end = views["ranges"].get(view, (0, 0))
+    df = views["df"].iloc[start:end]
+    df.index = pd.RangeIndex(len(df))
+    return df
+
+
+def build_flattened_views(ocel) -> dict:
+    """
+    Flattens the log on every object type in one pass over the relations, which already carry
+    activity and timestamp of their event. The relations are ordered by object type and then by
+    timestamp, keeping the order of equal timestamps, so that every view is a contiguous range of
+    the rows and can be sliced without copying.
 
+    Args:
+        ocel (OCEL):
+
+    Returns:
+        dict: processed df of all views and the range of rows per object type
+    """
+    relations = ocel.relations
+    types = pd.Categorical(relations["ocel:type"])
+    timestamps = relations["ocel:timestamp"].to_numpy(dtype="datetime64[ns]")
+    order = np.argsort(timestamps, kind="stable")
+    order = order[np.argsort(types.codes[order], kind="stable")]
+    offsets = np.searchsorted(types.codes[order], np.arange(len(types.categories) + 1))
+
+    df = relations[
+        ["ocel:eid", "ocel:timestamp", "ocel:activity", "ocel:oid", "ocel:type"]
+    ].take(order)
     df = df.rename(
         columns={
-            "case:concept:name": "case",
-            "concept:name": "activity",
-            "time:timestamp": "timestamp",
+            "ocel:oid": "case",
+            "ocel:activity": "activity",
+            "ocel:timestamp": "timestamp",
             "ocel:eid": "eid",
+            "ocel:type": "case:ocel:type",
         }
     )
 
+    return {
+        "df": compact_df(df.reset_index(drop=True)),
+        "ranges": {
+            object_type: (offsets[code], offsets[code + 1])
+            for code, object_type in enumerate(types.categories)
+        },
+    }
+
+
+def compact_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores the string columns of a processed df as categoricals
+
+    Args:
+        df (pd.DataFrame): processed df, modified in place
+
+    Returns:
+        pd.DataFrame: the df
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
     return df
+
+
+def sort_by_time(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sorts a processed df by timestamp, keeping the order of events with equal timestamps,
+    so that time ranges can be found by binary search
+
+    Args:
+        df (pd.DataFrame): processed df with a "timestamp" column
+
+    Returns:
+        pd.DataFrame: sorted df with a fresh index
+    """
+    if df["timestamp"].is_monotonic_increasing:
+        return df.reset_index(drop=True)
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def build_time_index(df: pd.DataFrame) -> np.ndarray:
+    """
+    Builds the sorted int64 epoch index of a processed df
+
+    Args:
+        df (pd.DataFrame): df sorted by sort_by_time
+
+    Returns:
+        np.ndarray: timestamps in ns since the epoch
+    """
+    return df["timestamp"].to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def get_base_name(view: str, sample_size: int) -> str:
+    """
+    Returns the artifact name of the processed df of the view
+
+    Args:
+        view (str):
+        sample_size (int): None for all events
+
+    Returns:
+        str:
+    """
+    if view == "eventID":
+        return f"base_df:eventID:{sample_size or 'all'}"
+    return f"base_df:flattened:{view}"
+
+
+def get_base_df(file_name: str, view: str, sample_size: int = 10):
+    """
+    Returns the unfiltered, processed df of the view, sorted by timestamp. The df is built once
+    per loaded log and shared, so it must not be modified.
+
+    Args:
+        file_name (str):
+        view (str): "eventID" or the object_type to flatten
+        sample_size (int): number of events kept in the "eventID" view, None for all events
+
+    Returns:
+        pd.DataFrame: processed df
+    """
+    if view == "eventID":
+        return get_artifact(
+            file_name,
+            get_base_name(view, sample_size),
+            lambda ocel: process_df(file_name, sample_size),
+        )
+    return get_artifact(
+        file_name,
+        get_base_name(view, sample_size),
+        lambda ocel: process_flatten_df(file_name, view),
+    )
+
+
+def get_time_index(file_name: str, view: str, sample_size: int = 10) -> np.ndarray:
+    """
+    Returns the sorted int64 epoch timestamps of the processed df of the view, row by row
+
+    Args:
+        file_name (str):
+        view (str): "eventID" or the object_type to flatten
+        sample_size (int): number of events kept in the "eventID" view, None for all events
+
+    Returns:
+        np.ndarray:
+    """
+    return get_artifact(
+        file_name,
+        get_base_name(view, sample_size) + ":time_index",
+        lambda ocel: build_time_index(get_base_df(file_name, view, sample_size)),
+    )
+
+
+def build_event_positions(df: pd.DataFrame) -> np.ndarray:
+    """
+    Maps the event ids of the "eventID" view to their rows, by the codes of the categorical eid column
+
+    Args:
+        df (pd.DataFrame): processed df of the "eventID" view
+
+    Returns:
+        np.ndarray: row of every event id category, -1 for categories without a row
+    """
+    codes = df["eid"].cat.codes.to_numpy()
+    positions = np.full(len(df["eid"].cat.categories), -1, dtype=np.int64)
+    positions[codes] = np.arange(len(df))
+    return positions
+
+
+def get_event_position(file_name: str, eid: str, sample_size: int = None) -> int:
+    """
+    Looks up the row of an event in the processed df of the "eventID" view with a hash lookup
+
+    Args:
+        file_name (str):
+        eid (str):
+        sample_size (int): number of events kept in the "eventID" view, None for all events
+
+    Returns:
+        int: row of the event, -1 if the event is not in the view
+    """
+    df = get_base_df(file_name, "eventID", sample_size)
+    positions = get_artifact(
+        file_name,
+        get_base_name("eventID", sample_size) + ":positions",
+        lambda ocel: build_event_positions(df),
+    )
+    try:
+        return int(positions[df["eid"].cat.categories.get_loc(eid)])
+    except KeyError:
+        return -1
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from os.path import join
+
+import pm4py
+
+from utils.chart_utils.ocel_cache import get_artifact, get_ocel, peek_artifact
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sidecar_utils, sqlite_utils
+
+PROFILE_FILE = "profile.json"
+
+
+def build_profile(ocel) -> dict:
+    """
+    Computes the profile of an event log
+
+    Args:
+        ocel (OCEL):
+
+    Returns:
+        dict: object types, attribute names, activities, event and object counts, time span and objects per type
+    """
+    events = ocel.events
+    timestamps = events["ocel:timestamp"]
+    count_per_activity = events["ocel:activity"].value_counts()
+    count_per_object_type = ocel.objects["ocel:type"].value_counts()
+
+    return {
+        "object_types": pm4py.ocel_get_object_types(ocel),
+        "attribute_names": pm4py.ocel_get_attribute_names(ocel),
+        "activities": events["ocel:activity"].unique().tolist(),
+        "activity_count": len(events),
+        "count_per_activity": {
+            activity: int(count) for activity, count in count_per_activity.items()
+        },
+        "event_count": len(events),
+        "object_count": len(ocel.objects),
+        "relation_count": len(ocel.relations),
+        "start_time": timestamps.min().isoformat() if len(events) else None,
+        "end_time": timestamps.max().isoformat() if len(events) else None,
+        "count_per_object_type": {
+            object_type: int(count)
+            for object_type, count in count_per_object_type.items()
+        },
+    }
+
+
+def compute_profile(file_name: str) -> dict:
+    """
+    Computes the profile of the file, databases are profiled with aggregate queries instead of parsing the log
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict: profile built by build_profile
+    """
+    if sqlite_utils.is_sqlite(file_name):
+        return sqlite_utils.query_profile(file_name)
+    return build_profile(get_ocel(file_name))
+
+
+def write_profile(file_name: str, profile: dict):
+    """
+    Stores the profile in the sidecar directory of the file, together with the file version it describes.
+    Nothing is written for deleted files.
+
+    Args:
+        file_name (str):
+        profile (dict):
+    """
+    if not fu.check_file_exists(file_name):
+        return
+    sidecar_dir = fu.get_sidecar_dir(file_name)
+    os.makedirs(sidecar_dir, exist_ok=True)
+    tmp_path = join(
+        sidecar_dir,
+        "{}.tmp-{}-{}".format(PROFILE_FILE, os.getpid(), threading.get_ident()),
+    )
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"source": sidecar_utils.get_source_version(file_name), "profile": profile},
+            f,
+        )
+    os.replace(tmp_path, join(sidecar_dir, PROFILE_FILE))
+
+
+def read_profile(file_name: str):
+    """
+    Reads the stored profile of the file
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict: the profile, None if there is no profile for the current version of the file
+    """
+    try:
+        with open(join(fu.get_sidecar_dir(file_name), PROFILE_FILE)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get("source") != sidecar_utils.get_source_version(file_name):
+        return None
+    return stored["profile"]
+
+
+def get_profile(file_name: str) -> dict:
+    """
+    Returns the profile of the file, kept in the log cache for the current version of the file so
+    it is read from disk once
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict:
+    """
+    return get_artifact(file_name, "profile", lambda ocel: load_profile(file_name), parse=False)
+
+
+def get_cached_profile(file_name: str):
+    """
+    Returns the profile of the file if it is already held by the log cache
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict: the profile, None if it has not been loaded for the current version of the file
+    """
+    return peek_artifact(file_name, "profile")
+
+
+def load_profile(file_name: str) -> dict:
+    """
+    Reads the stored profile of the file, computes and stores it if there is none
+
+    Args:
+        file_name (str):
+
+    Returns:
+        dict:
+    """
+    profile = read_profile(file_name)
+    if profile is None:
+        profile = compute_profile(file_name)
+        try:
+            write_profile(file_name, profile)
+        except OSError:
+            pass
+    return profile
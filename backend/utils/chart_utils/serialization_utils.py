@@ -0,0 +1,191 @@
+import base64
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from utils.http_utils.metrics_utils import timed
+
+# numpy dtypes that plotly.js can read as typed arrays, with their typed array codes
+TYPED_ARRAY_DTYPES = {
+    np.dtype("float64"): "f8",
+    np.dtype("float32"): "f4",
+    np.dtype("int32"): "i4",
+    np.dtype("int16"): "i2",
+    np.dtype("int8"): "i1",
+    np.dtype("uint32"): "u4",
+    np.dtype("uint16"): "u2",
+    np.dtype("uint8"): "u1",
+}
+
+# shorter arrays are left as plain lists, the encoding does not pay off for them
+MIN_TYPED_ARRAY_LENGTH = 8
+
+
+def to_typed_array(values):
+    """
+    Converts an array of numbers or timestamps to a little-endian array plotly.js can read as typed array
+
+    Args:
+        values: list or ndarray of trace data
+
+    Returns:
+        tuple: (ndarray or None if the values are not numeric, True if the values were timestamps)
+    """
+    array = values if isinstance(values, np.ndarray) else np.asarray(values)
+    if array.ndim != 1 or len(array) < MIN_TYPED_ARRAY_LENGTH:
+        return None, False
+
+    is_date = False
+    if array.dtype == object:
+        first = array[0]
+        if isinstance(first, (datetime.datetime, np.datetime64)):
+            try:
+                array = pd.to_datetime(array).values
+            except (ValueError, TypeError):
+                return None, False
+        elif isinstance(first, (int, float, np.number)) and not isinstance(first, bool):
+            try:
+                array = array.astype("float64")
+            except (ValueError, TypeError):
+                return None, False
+        else:
+            return None, False
+
+    if array.dtype.kind == "M":
+        # date axes read numbers as milliseconds since the epoch
+        is_date = True
+        if pd.isna(array).any():
+            return None, False
+        array = array.astype("datetime64[ns]").astype("int64") / 1e6
+    elif array.dtype.kind in "iu" and array.dtype not in TYPED_ARRAY_DTYPES:
+        # plotly.js has no 64 bit integer arrays
+        if len(array) and np.iinfo("int32").min <= array.min() and array.max() <= np.iinfo("int32").max:
+            array = array.astype("int32")
+        else:
+            array = array.astype("float64")
+    elif array.dtype.kind not in "iuf":
+        return None, False
+
+    if array.dtype not in TYPED_ARRAY_DTYPES:
+        array = array.astype("float64")
+    return array.astype(array.dtype.newbyteorder("<"), copy=False), is_date
+
+
+def encode_typed_array(array: np.ndarray) -> dict:
+    """
+    Encodes an array in the base64 typed array format of plotly.js
+
+    Args:
+        array (np.ndarray): one dimensional array with a dtype of TYPED_ARRAY_DTYPES
+
+    Returns:
+        dict: {"dtype": typed array code, "bdata": base64 encoded buffer}
+    """
+    return {
+        "dtype": TYPED_ARRAY_DTYPES[array.dtype.newbyteorder("=")],
+        "bdata": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def encode_trace(trace: dict, date_axes: set) -> dict:
+    """
+    Replaces the numeric and timestamp arrays of a trace with typed arrays
+
+    Args:
+        trace (dict): trace of a plotly figure dict
+        date_axes (set): collects the layout keys of the axes that received timestamps as numbers
+
+    Returns:
+        dict: encoded trace
+    """
+    encoded = dict(trace)
+    for key in ("x", "y"):
+        if key not in trace:
+            continue
+        array, is_date = to_typed_array(trace[key])
+        if array is None:
+            continue
+        encoded[key] = encode_typed_array(array)
+        if is_date:
+            axis = trace.get(key + "axis", key)
+            date_axes.add(key + "axis" + axis[1:])
+
+    marker = trace.get("marker")
+    if isinstance(marker, dict):
+        encoded["marker"] = dict(marker)
+        for key in ("size", "color"):
+            if key in marker and not isinstance(marker[key], (str, int, float)):
+                array, is_date = to_typed_array(marker[key])
+                if array is not None and not is_date:
+                    encoded["marker"][key] = encode_typed_array(array)
+    return encoded
+
+
+@timed("encode")
+def encode_figure(fig) -> dict:
+    """
+    Converts a plotly figure to a dict whose trace data is stored as typed arrays
+
+    Args:
+        fig (go.Figure):
+
+    Returns:
+        dict: {"data": [...], "layout": {...}}
+    """
+    figure = fig.to_plotly_json()
+    date_axes = set()
+    data = [encode_trace(trace, date_axes) for trace in figure["data"]]
+    layout = dict(figure["layout"])
+    for axis in date_axes:
+        # numbers on an axis are only shown as dates if the axis type is set explicitly
+        layout[axis] = dict(layout.get(axis, {}))
+        layout[axis].setdefault("type", "date")
+    return {"data": data, "layout": layout}
+
+
+def default(obj):
+    """
+    Serializes the values json does not know, the way plotly does
+
+    Args:
+        obj: value that can not be serialized by json
+
+    Returns:
+        JSON serializable representation of the value
+    """
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "M":
+            return [default(value) for value in pd.to_datetime(obj)]
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return default(obj.to_numpy())
+    if hasattr(obj, "to_plotly_json"):
+        return obj.to_plotly_json()
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
+
+@timed("serialize")
+def dumps(payload: dict) -> str:
+    """
+    Serializes a response in a single pass
+
+    Args:
+        payload (dict): response that may contain numpy values and figures encoded by encode_figure
+
+    Returns:
+        str: compact JSON
+    """
+    try:
+        return json.dumps(payload, default=default, separators=(",", ":"), allow_nan=False)
+    except ValueError:
+        # NaN and infinity are not valid JSON, plotly's encoder replaces them with null
+        return plotly.io.json.to_json_plotly(payload)
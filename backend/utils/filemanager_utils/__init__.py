@@ -1 +1,6 @@
-from utils.filemanager_utils import filemanager_utils
+from utils.filemanager_utils import (
+    filemanager_utils,
+    preview_utils,
+    sidecar_utils,
+    sqlite_utils,
+)
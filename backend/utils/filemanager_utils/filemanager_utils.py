@@ -1,24 +1,71 @@
+import hashlib
+import json
 import os
+import shutil
+import threading
 from os import listdir
 from os.path import isfile, join, exists
 
+# standard location of the uploaded files
+DATA_DIR = join("/tmp", "data")
+# files are copied and hashed in blocks of this size, so uploads use constant memory
+BLOCK_SIZE = 1024 * 1024
+# number of bytes at the start of a file that are checked for a valid OCEL header
+HEADER_SIZE = 64 * 1024
+SQLITE_HEADER = b"SQLite format 3\x00"
+CONTENT_HASH_FILE = "content_hash.json"
+
+# hash state of the chunked uploads in progress in this process
+upload_hashes = dict()
+upload_hashes_lock = threading.Lock()
+
 """
 assembles the absolute filepath for the standard location
 """
 
 
 def get_path_from_name(filename):
-    filepath = join("/tmp", "data", filename)
+    filepath = join(DATA_DIR, filename)
     return filepath
 
 
+"""
+assembles the path of the directory that holds the derived sidecar files of the file with the given name
+"""
+
+
+def get_sidecar_dir(filename):
+    sidecar_dir = join(DATA_DIR, ".sidecar", filename)
+    return sidecar_dir
+
+
+"""
+assembles the path of the partial file of a chunked upload that is in progress
+"""
+
+
+def get_partial_path(filename):
+    partial_path = join(DATA_DIR, ".uploads", filename + ".part")
+    return partial_path
+
+
+"""
+identifies the current version of the file with the given name by its modification time and size
+"""
+
+
+def get_file_version(filename):
+    stat = os.stat(get_path_from_name(filename))
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
 """
 reads the standard file location
 """
 
 
 def get_uploaded_files():
-    data = [f for f in listdir("/tmp/data") if isfile(join("/tmp/data", f))]
+    data = [f for f in listdir(DATA_DIR) if isfile(join(DATA_DIR, f))]
     return data
 
 
@@ -37,7 +84,180 @@ saves a file to the filesystem at the standard location
 
 
 def save_file(file):
-    file.save(get_path_from_name(file.filename))
+    content_hash = hashlib.sha256()
+    with open(get_path_from_name(file.filename), "wb") as f:
+        copy_stream(file.stream, f, content_hash)
+    write_content_hash(file.filename, content_hash.hexdigest())
+
+
+"""
+copies a stream to a file in blocks and updates the given hash with every block
+returns the number of copied bytes
+"""
+
+
+def copy_stream(stream, f, content_hash):
+    copied = 0
+    while True:
+        block = stream.read(BLOCK_SIZE)
+        if not block:
+            return copied
+        content_hash.update(block)
+        f.write(block)
+        copied += len(block)
+
+
+"""
+checks if the first bytes of a file look like an event log of the format given by the file extension
+csv files are not checked, plain csv logs without ocel columns are accepted as before
+"""
+
+
+def check_ocel_header(filename, head):
+    text = head[:HEADER_SIZE].decode("utf-8", errors="ignore").lstrip("\ufeff \t\r\n")
+    match get_file_exension(filename):
+        case ".jsonocel":
+            return text.startswith("{") and '"ocel:' in text
+        case ".xmlocel":
+            return text.startswith("<") and "ocel" in text
+        case ".csv":
+            return True
+        case ".sqlite":
+            return head.startswith(SQLITE_HEADER)
+        case _:
+            return False
+
+
+"""
+returns how many bytes of a chunked upload have been received
+"""
+
+
+def get_received_size(filename):
+    partial_path = get_partial_path(filename)
+    if not exists(partial_path):
+        return 0
+    return os.path.getsize(partial_path)
+
+
+"""
+appends the data of the stream to the partial file of a chunked upload and updates its content hash
+head are bytes that have already been read from the stream
+returns the number of bytes received in total
+"""
+
+
+def append_chunk(filename, stream, head=b""):
+    partial_path = get_partial_path(filename)
+    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+    received = get_received_size(filename)
+
+    with upload_hashes_lock:
+        state = upload_hashes.get(filename)
+    if state is None or state[1] != received:
+        # the upload has been started by another process, hash what has been received so far
+        content_hash = hash_file(partial_path) if received else hashlib.sha256()
+    else:
+        content_hash = state[0]
+
+    with open(partial_path, "ab") as f:
+        content_hash.update(head)
+        f.write(head)
+        received += len(head) + copy_stream(stream, f, content_hash)
+
+    with upload_hashes_lock:
+        upload_hashes[filename] = (content_hash, received)
+    return received
+
+
+"""
+moves a completely received chunked upload to the standard location and stores its content hash
+"""
+
+
+def complete_upload(filename):
+    partial_path = get_partial_path(filename)
+    received = get_received_size(filename)
+    with upload_hashes_lock:
+        state = upload_hashes.pop(filename, None)
+    if state is None or state[1] != received:
+        content_hash = hash_file(partial_path)
+    else:
+        content_hash = state[0]
+
+    os.replace(partial_path, get_path_from_name(filename))
+    write_content_hash(filename, content_hash.hexdigest())
+
+
+"""
+discards the partial file of a chunked upload
+"""
+
+
+def discard_upload(filename):
+    with upload_hashes_lock:
+        upload_hashes.pop(filename, None)
+    if exists(get_partial_path(filename)):
+        os.remove(get_partial_path(filename))
+
+
+"""
+returns the sha256 hash object of the content of the file at the given path
+"""
+
+
+def hash_file(filepath):
+    content_hash = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return content_hash
+            content_hash.update(block)
+
+
+"""
+stores the content hash of the file with the given name in its sidecar directory
+"""
+
+
+def write_content_hash(filename, digest):
+    sidecar_dir = get_sidecar_dir(filename)
+    os.makedirs(sidecar_dir, exist_ok=True)
+    with open(join(sidecar_dir, CONTENT_HASH_FILE), "w") as f:
+        json.dump({"version": get_file_version(filename), "sha256": digest}, f)
+
+
+"""
+returns the stored sha256 content hash of the file with the given name
+returns None if no hash has been stored for the current version of the file
+"""
+
+
+def read_content_hash(filename):
+    try:
+        with open(join(get_sidecar_dir(filename), CONTENT_HASH_FILE)) as f:
+            stored = json.load(f)
+        if stored["version"] == get_file_version(filename):
+            return stored["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+"""
+returns the sha256 content hash of the file with the given name
+the hash is computed and stored if there is no stored hash for the current version of the file
+"""
+
+
+def get_content_hash(filename):
+    digest = read_content_hash(filename)
+    if digest is not None:
+        return digest
+    digest = hash_file(get_path_from_name(filename)).hexdigest()
+    write_content_hash(filename, digest)
+    return digest
 
 
 """
@@ -85,10 +305,11 @@ def get_file_exension(filename):
 
 
 """
-deletes the file with the given name in the standard location 
+deletes the file with the given name in the standard location together with its sidecar files
 """
 
 
 def delete_file(filename):
     filepath = get_path_from_name(filename)
     os.remove(filepath)
+    shutil.rmtree(get_sidecar_dir(filename), ignore_errors=True)
@@ -0,0 +1,123 @@
+from itertools import islice
+
+import ijson
+import pandas as pd
+from lxml import etree
+
+from utils.filemanager_utils import sqlite_utils
+
+# number of entries returned by the file preview
+PREVIEW_ROWS = 15
+
+
+"""
+converts the collected preview records to a dataframe, timestamps are parsed like in the full log
+"""
+
+
+def records_to_df(records):
+    log = pd.DataFrame.from_records(records)
+    if "ocel:timestamp" in log.columns:
+        try:
+            log["ocel:timestamp"] = pd.to_datetime(log["ocel:timestamp"], format="ISO8601")
+        except (ValueError, TypeError):
+            pass
+    return log
+
+
+"""
+reads the first n rows of a csv file
+"""
+
+
+def read_csv_preview(filepath, n=PREVIEW_ROWS):
+    return pd.read_csv(filepath, nrows=n)
+
+
+"""
+parses a typed attribute value of an xmlocel file
+"""
+
+
+def parse_xml_value(element):
+    tag = etree.QName(element).localname.lower()
+    value = element.get("value")
+    try:
+        match tag:
+            case "float":
+                return float(value)
+            case "int":
+                return int(value)
+            case "boolean":
+                return value.lower() == "true"
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+"""
+reads the first n events of an xmlocel file with an incremental parser that stops after the n-th event
+the related objects of an event are listed in ocel:omap, as the object types are only stored after the events
+"""
+
+
+def read_xmlocel_preview(filepath, n=PREVIEW_ROWS):
+    records = []
+    context = etree.iterparse(filepath, events=("end",), remove_comments=True)
+    for _, element in context:
+        if etree.QName(element).localname.lower() != "event":
+            continue
+        record = {"ocel:eid": None, "ocel:timestamp": None, "ocel:activity": None}
+        omap = []
+        for child in element:
+            key = child.get("key")
+            if key == "id":
+                record["ocel:eid"] = child.get("value")
+            elif key == "timestamp":
+                record["ocel:timestamp"] = child.get("value")
+            elif key == "activity":
+                record["ocel:activity"] = child.get("value")
+            elif key == "omap":
+                omap = [objref.get("value") for objref in child]
+            elif key == "vmap":
+                for attribute in child:
+                    record[attribute.get("key")] = parse_xml_value(attribute)
+        record["ocel:omap"] = omap
+        records.append(record)
+
+        # free the parsed events, only the first n are needed
+        element.clear()
+        if len(records) >= n:
+            break
+    del context
+    return records_to_df(records)
+
+
+"""
+reads the first n events of a jsonocel file with a streaming parser that stops after the n-th event
+the related objects of an event are listed in ocel:omap, as the object types are only stored after the events
+"""
+
+
+def read_jsonocel_preview(filepath, n=PREVIEW_ROWS):
+    records = []
+    with open(filepath, "rb") as f:
+        for eid, event in islice(ijson.kvitems(f, "ocel:events", use_float=True), n):
+            record = {
+                "ocel:eid": eid,
+                "ocel:timestamp": event.get("ocel:timestamp"),
+                "ocel:activity": event.get("ocel:activity"),
+            }
+            record.update(event.get("ocel:vmap", {}))
+            record["ocel:omap"] = list(event.get("ocel:omap", []))
+            records.append(record)
+    return records_to_df(records)
+
+
+"""
+reads the first n events of an OCEL 2.0 database ordered by time, the related objects of an event are listed in ocel:omap
+"""
+
+
+def read_sqlite_preview(filepath, n=PREVIEW_ROWS):
+    return records_to_df(sqlite_utils.query_preview(filepath, n))
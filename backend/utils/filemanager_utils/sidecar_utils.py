@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from os.path import exists, join
+
+import pandas as pd
+from pm4py.objects.ocel.obj import OCEL
+
+from utils.filemanager_utils import filemanager_utils as fu
+from utils.filemanager_utils import sqlite_utils
+
+# tables of the OCEL that are stored in the sidecar, one parquet file each
+SIDECAR_TABLES = ["events", "objects", "relations", "o2o", "e2e", "object_changes"]
+SOURCE_FILE = "source.json"
+# lists the flattened views stored in the sidecar, one parquet file each
+FLATTENED_FILE = "flattened.json"
+
+
+"""
+identifies the current version of the original file, a sidecar is only valid for the version it was written from
+"""
+
+
+def get_source_version(filename):
+    return fu.get_file_version(filename)
+
+
+"""
+checks if a sidecar exists that was written from the current version of the file
+"""
+
+
+def check_sidecar_valid(filename):
+    source_path = join(fu.get_sidecar_dir(filename), SOURCE_FILE)
+    if not exists(source_path):
+        return False
+    try:
+        with open(source_path) as f:
+            return json.load(f) == get_source_version(filename)
+    except (OSError, ValueError):
+        return False
+
+
+"""
+writes the events, objects and relations tables of the file as parquet files to its sidecar directory
+parses the original file if no parsed log is given
+raises an exception if the log can not be parsed or stored in columnar form
+"""
+
+
+def write_sidecar(filename, ocel=None):
+    if ocel is None:
+        ocel = sqlite_utils.read_ocel_file(fu.get_path_from_name(filename))
+    source_version = get_source_version(filename)
+
+    # write to a temporary directory first, so readers never see a partially written table
+    sidecar_dir = fu.get_sidecar_dir(filename)
+    tmp_dir = "{}.tmp-{}-{}".format(sidecar_dir, os.getpid(), threading.get_ident())
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        for table in SIDECAR_TABLES:
+            getattr(ocel, table).to_parquet(join(tmp_dir, table + ".parquet"), index=False)
+
+        # the file has been deleted meanwhile, no sidecar directory is left behind for it
+        if not fu.check_file_exists(filename):
+            return ocel
+
+        # other derived files in the sidecar directory are kept, the source file is written last
+        os.makedirs(sidecar_dir, exist_ok=True)
+        if exists(join(sidecar_dir, SOURCE_FILE)):
+            os.remove(join(sidecar_dir, SOURCE_FILE))
+        for table in SIDECAR_TABLES:
+            os.replace(join(tmp_dir, table + ".parquet"), join(sidecar_dir, table + ".parquet"))
+        with open(join(sidecar_dir, SOURCE_FILE), "w") as f:
+            json.dump(source_version, f)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return ocel
+
+
+"""
+loads the log of the file from its sidecar
+returns None if there is no valid sidecar for the current version of the file
+"""
+
+
+def read_sidecar(filename):
+    if not check_sidecar_valid(filename):
+        return None
+    sidecar_dir = fu.get_sidecar_dir(filename)
+    try:
+        tables = {
+            table: pd.read_parquet(join(sidecar_dir, table + ".parquet"))
+            for table in SIDECAR_TABLES
+        }
+    except (OSError, ValueError):
+        return None
+    return OCEL(
+        events=tables["events"],
+        objects=tables["objects"],
+        relations=tables["relations"],
+        o2o=tables["o2o"],
+        e2e=tables["e2e"],
+        object_changes=tables["object_changes"],
+    )
+
+
+"""
+assembles the path of the parquet file of a flattened view, object types may contain any character
+"""
+
+
+def get_flattened_path(filename, view):
+    digest = hashlib.sha1(view.encode()).hexdigest()[:16]
+    return join(fu.get_sidecar_dir(filename), "flattened-" + digest + ".parquet")
+
+
+"""
+reads the list of stored flattened views, an empty list if it was written from another version of the file
+"""
+
+
+def read_flattened_views(filename):
+    try:
+        with open(join(fu.get_sidecar_dir(filename), FLATTENED_FILE)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if stored.get("source") != get_source_version(filename):
+        return []
+    return stored["views"]
+
+
+"""
+writes the list of stored flattened views together with the file version they were flattened from
+nothing is written for deleted files
+"""
+
+
+def write_flattened_views(filename, views):
+    if not fu.check_file_exists(filename):
+        return
+    sidecar_dir = fu.get_sidecar_dir(filename)
+    os.makedirs(sidecar_dir, exist_ok=True)
+    tmp_path = join(
+        sidecar_dir,
+        "{}.tmp-{}-{}".format(FLATTENED_FILE, os.getpid(), threading.get_ident()),
+    )
+    with open(tmp_path, "w") as f:
+        json.dump({"source": get_source_version(filename), "views": views}, f)
+    os.replace(tmp_path, join(sidecar_dir, FLATTENED_FILE))
+
+
+"""
+stores the processed df of a flattened view in the sidecar, nothing is written for deleted files
+"""
+
+
+def write_flattened(filename, view, df):
+    if not fu.check_file_exists(filename):
+        return
+    path = get_flattened_path(filename, view)
+    tmp_path = "{}.tmp-{}-{}".format(path, os.getpid(), threading.get_ident())
+    os.makedirs(fu.get_sidecar_dir(filename), exist_ok=True)
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    views = read_flattened_views(filename)
+    if view not in views:
+        write_flattened_views(filename, views + [view])
+
+
+"""
+loads the processed df of a flattened view from the sidecar
+returns None if the view has not been stored for the current version of the file
+"""
+
+
+def read_flattened(filename, view):
+    if view not in read_flattened_views(filename):
+        return None
+    try:
+        return pd.read_parquet(get_flattened_path(filename, view))
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,681 @@
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+import pm4py
+
+from utils.filemanager_utils import filemanager_utils as fu
+
+SQLITE_EXTENSION = ".sqlite"
+
+# tables every OCEL 2.0 database has, the attributes of events and objects are stored in one table per type
+OCEL2_TABLES = ["event", "object", "event_object", "event_map_type", "object_map_type"]
+
+# columns of the type tables that are not attributes
+NON_ATTRIBUTE_COLUMNS = ["ocel_id", "ocel_time", "ocel_changed_field"]
+
+# times are compared and ordered as naive UTC text with milliseconds, see get_time_sql
+TIME_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+# sqlite limits the number of parameters per statement
+MAX_PARAMETERS = 900
+
+# indexes the lookups and joins of the queries below rely on
+INDEXES = [
+    ("event", ["ocel_id"]),
+    ("event", ["ocel_type"]),
+    ("object", ["ocel_id"]),
+    ("object", ["ocel_type"]),
+    ("event_object", ["ocel_event_id"]),
+    ("event_object", ["ocel_object_id"]),
+]
+
+
+"""
+checks if the file is stored as sqlite database
+"""
+
+
+def is_sqlite(filename):
+    return fu.get_file_exension(filename) == SQLITE_EXTENSION
+
+
+"""
+quotes a table or column name for use in a statement
+"""
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+"""
+opens the database at the path read-only
+the connection is closed when the with block ends, sqlite3 connections themselves only end the transaction
+"""
+
+
+def connect(filepath):
+    return closing(sqlite3.connect("file:{}?mode=ro".format(filepath), uri=True))
+
+
+"""
+builds the expression that normalizes a stored time to naive UTC text with milliseconds
+OCEL 2.0 databases store times as ISO 8601 text with a space or a "T" between date and time and with or
+without time zone, which do not compare as text, the normalized times do and are indexed, see create_indexes
+"""
+
+
+def get_time_sql(column):
+    return "strftime('{}', {})".format(TIME_FORMAT, column)
+
+
+"""
+checks if the database at the path follows the OCEL 2.0 schema
+"""
+
+
+def is_ocel2(filepath):
+    with connect(filepath) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return all(table in tables for table in OCEL2_TABLES)
+
+
+"""
+parses the log at the path, OCEL 2.0 databases are read with the OCEL 2.0 importer
+"""
+
+
+def read_ocel_file(filepath):
+    if filepath.lower().endswith(SQLITE_EXTENSION) and is_ocel2(filepath):
+        return pm4py.read_ocel2_sqlite(filepath)
+    return pm4py.read_ocel(filepath)
+
+
+"""
+prepares an uploaded database for the queries, returns False if it does not follow the OCEL 2.0 schema
+creating the indexes changes the file, so its content hash is stored again
+"""
+
+
+def prepare_upload(filename):
+    filepath = fu.get_path_from_name(filename)
+    try:
+        if not is_ocel2(filepath):
+            return False
+        create_indexes(filename)
+    except sqlite3.DatabaseError:
+        return False
+    fu.write_content_hash(filename, fu.hash_file(filepath).hexdigest())
+    return True
+
+
+"""
+creates the indexes the queries rely on, including the id and the normalized time of every type table
+changes the file, so it has to be called before the file is ingested
+"""
+
+
+def create_indexes(filename):
+    conn = sqlite3.connect(fu.get_path_from_name(filename))
+    try:
+        # keep the journal in memory, no journal file shows up next to the uploaded files
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        indexes = list(INDEXES)
+        event_tables = [table for _, table in get_type_tables(conn, "event")]
+        for table in event_tables:
+            indexes.append((table, ["ocel_id"]))
+        for _, table in get_type_tables(conn, "object"):
+            indexes.append((table, ["ocel_id"]))
+        for table, columns in indexes:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                    quote("dottie_{}_{}".format(table, "_".join(columns))),
+                    quote(table),
+                    ", ".join(quote(column) for column in columns),
+                )
+            )
+        # the date filters and the pages of the eventID view are read in the order of time and id
+        for table in event_tables:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS {} ON {} ({}, ocel_id)".format(
+                    quote("dottie_{}_time_ocel_id".format(table)),
+                    quote(table),
+                    get_time_sql("ocel_time"),
+                )
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+"""
+returns the type tables of the events or objects as (type, table name) pairs, skips types without table
+"""
+
+
+def get_type_tables(conn, kind):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    type_tables = []
+    for ocel_type, type_map in conn.execute(
+        "SELECT ocel_type, ocel_type_map FROM {}".format(quote(kind + "_map_type"))
+    ):
+        table = "{}_{}".format(kind, type_map)
+        if table in tables:
+            type_tables.append((ocel_type, table))
+    return type_tables
+
+
+"""
+returns the attribute columns of a table
+"""
+
+
+def get_attribute_columns(conn, table):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info({})".format(quote(table)))]
+    return [column for column in columns if column not in NON_ATTRIBUTE_COLUMNS]
+
+
+"""
+builds a statement that lists id, activity and normalized timestamp of all events, as union over the event type tables
+"""
+
+
+def get_event_times_sql(conn):
+    selects = []
+    params = []
+    for activity, table in get_type_tables(conn, "event"):
+        selects.append(
+            "SELECT ocel_id, ? AS activity, {} AS ocel_time FROM {}".format(
+                get_time_sql("ocel_time"), quote(table)
+            )
+        )
+        params.append(activity)
+    if not selects:
+        return "SELECT NULL AS ocel_id, NULL AS activity, NULL AS ocel_time WHERE 0", []
+    return " UNION ALL ".join(selects), params
+
+
+"""
+parses the timestamps stored in the database, time zones are converted to naive UTC like in the other formats
+"""
+
+
+def parse_times(values):
+    times = pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601")
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_convert(None)
+    return times
+
+
+"""
+reads evenly spaced events ordered by time, every interval-th event is kept like in the downsampling of the other formats
+only the sampled events are materialized, all events are read if n is None
+"""
+
+
+def query_sampled_events(filename, n):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        total = conn.execute("SELECT COUNT(*) FROM event").fetchone()[0]
+        interval = 1 if n is None else max(1, total // n)
+        times_sql, params = get_event_times_sql(conn)
+        rows = conn.execute(
+            """
+            SELECT ocel_id, ocel_time, activity FROM (
+                SELECT ocel_id, ocel_time, activity,
+                    ROW_NUMBER() OVER (ORDER BY ocel_time) - 1 AS position
+                FROM ({})
+            )
+            WHERE position % ? = 0
+            ORDER BY position
+            """.format(times_sql),
+            params + [interval],
+        ).fetchall()
+    df = pd.DataFrame(rows, columns=["eid", "timestamp", "activity"])
+    df["timestamp"] = parse_times(df["timestamp"])
+    return df
+
+
+"""
+reads the related objects of the given events as event id, object type and object id, in the order of the relations
+"""
+
+
+def query_relations_of_events(filename, eids):
+    rows = []
+    eids = list(eids)
+    with connect(fu.get_path_from_name(filename)) as conn:
+        for start in range(0, len(eids), MAX_PARAMETERS):
+            chunk = eids[start : start + MAX_PARAMETERS]
+            rows += conn.execute(
+                """
+                SELECT eo.rowid, eo.ocel_event_id, o.ocel_type, eo.ocel_object_id
+                FROM event_object eo JOIN object o ON o.ocel_id = eo.ocel_object_id
+                WHERE eo.ocel_event_id IN ({})
+                """.format(", ".join("?" * len(chunk))),
+                chunk,
+            ).fetchall()
+    rows.sort(key=lambda row: row[0])
+    return pd.DataFrame(
+        [row[1:] for row in rows], columns=["ocel:eid", "ocel:type", "ocel:oid"]
+    )
+
+
+"""
+formats a filter time like the normalized times of the database, so that it can be compared with them as text
+"""
+
+
+def format_time(time):
+    time = pd.Timestamp(time)
+    if time.tzinfo is not None:
+        time = time.tz_convert(None)
+    # milliseconds, like strftime's %f in sqlite
+    return time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+"""
+builds the conditions of a statement over an event type table aliased t
+the times have to be formatted by format_time, events are kept within the time range and if they are related to objects of all given types
+"""
+
+
+def get_event_filter_sql(start_time, end_time, object_types=()):
+    conditions = []
+    params = []
+    if start_time is not None:
+        conditions.append(get_time_sql("t.ocel_time") + " >= ?")
+        params.append(start_time)
+    if end_time is not None:
+        conditions.append(get_time_sql("t.ocel_time") + " <= ?")
+        params.append(end_time)
+    for object_type in object_types:
+        conditions.append(
+            """EXISTS (
+                SELECT 1 FROM event_object eo JOIN object o ON o.ocel_id = eo.ocel_object_id
+                WHERE eo.ocel_event_id = t.ocel_id AND o.ocel_type = ?
+            )"""
+        )
+        params.append(object_type)
+    return conditions, params
+
+
+"""
+returns the time and id of the event the page starts at, the cursor event is looked up by its id
+unknown cursors start at the cursor time, None if there is neither
+"""
+
+
+def get_cursor_key(conn, cursor, cursor_time):
+    if cursor is not None:
+        row = conn.execute("SELECT ocel_type FROM event WHERE ocel_id = ?", [cursor]).fetchone()
+        table = dict(get_type_tables(conn, "event")).get(row[0]) if row is not None else None
+        if table is not None:
+            time = conn.execute(
+                "SELECT {} FROM {} WHERE ocel_id = ?".format(get_time_sql("ocel_time"), quote(table)),
+                [cursor],
+            ).fetchone()
+            if time is not None:
+                return time[0], cursor
+    if cursor_time is not None:
+        # the empty id is smaller than all ids, the page starts at the first event at the time
+        return format_time(cursor_time), ""
+    return None
+
+
+"""
+reads the filtered events from a key on as id, timestamp and activity, ordered by time and id
+forward scans include the event of the key, backward scans end before it and return the events closest to it
+the events are merged from the time indexes of the activities, so only the returned events and the filtered
+out events between them are read
+"""
+
+
+def scan_events(conn, activities, object_types, start_time, end_time, key, limit, forward):
+    if key is None and not forward:
+        return []
+    conditions, params = get_event_filter_sql(start_time, end_time, object_types)
+    if key is not None:
+        conditions.append(
+            "({}, t.ocel_id) {} (?, ?)".format(get_time_sql("t.ocel_time"), ">=" if forward else "<")
+        )
+        params += list(key)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+
+    selects = []
+    select_params = []
+    for activity, table in get_type_tables(conn, "event"):
+        if activity in activities:
+            selects.append(
+                "SELECT t.ocel_id, {} AS ocel_time, ? AS activity FROM {} t{}".format(
+                    get_time_sql("t.ocel_time"), quote(table), where
+                )
+            )
+            select_params += [activity] + params
+    if not selects:
+        return []
+    order = "ASC" if forward else "DESC"
+    rows = conn.execute(
+        "{} ORDER BY ocel_time {}, ocel_id {} LIMIT ?".format(" UNION ALL ".join(selects), order, order),
+        select_params + [limit],
+    ).fetchall()
+    return rows if forward else rows[::-1]
+
+
+"""
+reads a page of the filtered events of the paginated eventID view at the cursor, in time order,
+together with the cursors of the neighbouring pages like Chart.select_page
+"""
+
+
+def query_event_page(
+    filename, activities, object_types, start_time, end_time, cursor, cursor_time, page_size, direction
+):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        if start_time is not None:
+            start_time = format_time(start_time)
+        if end_time is not None:
+            end_time = format_time(end_time)
+        key = get_cursor_key(conn, cursor, cursor_time)
+
+        def scan(limit, forward):
+            return scan_events(conn, activities, object_types, start_time, end_time, key, limit, forward)
+
+        if direction == "prev":
+            rows = scan(page_size + 1, forward=False)
+            before = rows[:-page_size]
+            rows = rows[-page_size:]
+            after = scan(1, forward=True)
+        else:
+            rows = scan(page_size + 1, forward=True)
+            after = rows[page_size:]
+            rows = rows[:page_size]
+            before = scan(1, forward=False)
+
+    page = {
+        "next": after[0][0] if after else None,
+        "prev": rows[0][0] if before and rows else None,
+    }
+    df = pd.DataFrame(rows, columns=["eid", "timestamp", "activity"])
+    df["timestamp"] = parse_times(df["timestamp"])
+    return df, page
+
+
+"""
+builds a statement that flattens the log on an object type, ordered by time unless ordered is False
+only the events of the given activities within the time range are read, all events if activities is None
+"""
+
+
+def get_flattened_sql(conn, object_type, activities=None, start_time=None, end_time=None, ordered=True):
+    conditions, params = get_event_filter_sql(start_time, end_time)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    selects = []
+    select_params = []
+    for activity, table in get_type_tables(conn, "event"):
+        if activities is None or activity in activities:
+            selects.append(
+                "SELECT t.ocel_id, ? AS activity, {} AS ocel_time FROM {} t{}".format(
+                    get_time_sql("t.ocel_time"), quote(table), where
+                )
+            )
+            select_params += [activity] + params
+    if not selects:
+        selects.append("SELECT NULL AS ocel_id, NULL AS activity, NULL AS ocel_time WHERE 0")
+    sql = """
+        SELECT eo.ocel_event_id, t.ocel_time, t.activity, eo.ocel_object_id
+        FROM event_object eo
+        JOIN object o ON o.ocel_id = eo.ocel_object_id
+        JOIN ({}) t ON t.ocel_id = eo.ocel_event_id
+        WHERE o.ocel_type = ?
+        """.format(" UNION ALL ".join(selects))
+    if ordered:
+        sql += "ORDER BY t.ocel_time, eo.rowid"
+    return sql, select_params + [object_type]
+
+
+"""
+converts rows of the flattened statement to a processed df
+"""
+
+
+def to_flattened_df(rows, object_type):
+    df = pd.DataFrame(rows, columns=["eid", "timestamp", "activity", "case"])
+    df["timestamp"] = parse_times(df["timestamp"])
+    df["case:ocel:type"] = object_type
+    return df
+
+
+"""
+flattens the log on an object type, only the relations to objects of the type are materialized
+the activity and time filters are applied in the query, see get_flattened_sql
+"""
+
+
+def query_flattened(filename, object_type, activities=None, start_time=None, end_time=None):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        sql, params = get_flattened_sql(
+            conn,
+            object_type,
+            activities,
+            None if start_time is None else format_time(start_time),
+            None if end_time is None else format_time(end_time),
+        )
+        rows = conn.execute(sql, params).fetchall()
+    return to_flattened_df(rows, object_type)
+
+
+"""
+counts the points of a flattened view within the filters, see get_flattened_sql
+"""
+
+
+def count_flattened(filename, object_type, activities, start_time, end_time):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        sql, params = get_flattened_sql(
+            conn,
+            object_type,
+            activities,
+            None if start_time is None else format_time(start_time),
+            None if end_time is None else format_time(end_time),
+            ordered=False,
+        )
+        return conn.execute("SELECT COUNT(*) FROM ({})".format(sql), params).fetchone()[0]
+
+
+"""
+reads the flattened view within the filters in batches of processed dfs, see get_flattened_sql
+the rows are fetched from the cursor batch by batch, so only one batch is held in memory
+"""
+
+
+def iter_flattened(filename, object_type, activities, start_time, end_time, batch_size):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        sql, params = get_flattened_sql(
+            conn,
+            object_type,
+            activities,
+            None if start_time is None else format_time(start_time),
+            None if end_time is None else format_time(end_time),
+        )
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield to_flattened_df(rows, object_type)
+
+
+"""
+computes the profile of the log with aggregate queries, see profile_utils.build_profile
+"""
+
+
+def query_profile(filename):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        times_sql, params = get_event_times_sql(conn)
+        count_per_activity = conn.execute(
+            """
+            SELECT activity, COUNT(*) FROM ({}) GROUP BY activity ORDER BY COUNT(*) DESC
+            """.format(times_sql),
+            params,
+        ).fetchall()
+        activities = [
+            row[0]
+            for row in conn.execute(
+                "SELECT activity FROM ({}) GROUP BY activity ORDER BY MIN(ocel_time)".format(times_sql),
+                params,
+            )
+        ]
+        start_time, end_time = conn.execute(
+            "SELECT MIN(ocel_time), MAX(ocel_time) FROM ({})".format(times_sql), params
+        ).fetchone()
+        count_per_object_type = conn.execute(
+            "SELECT ocel_type, COUNT(*) FROM object GROUP BY ocel_type ORDER BY COUNT(*) DESC"
+        ).fetchall()
+        object_types = [
+            row[0]
+            for row in conn.execute(
+                "SELECT ocel_type FROM object GROUP BY ocel_type ORDER BY MIN(rowid)"
+            )
+        ]
+        attribute_names = set()
+        for kind in ("event", "object"):
+            for _, table in get_type_tables(conn, kind):
+                attribute_names.update(get_attribute_columns(conn, table))
+        event_count = conn.execute("SELECT COUNT(*) FROM event").fetchone()[0]
+        object_count = conn.execute("SELECT COUNT(*) FROM object").fetchone()[0]
+        relation_count = conn.execute("SELECT COUNT(*) FROM event_object").fetchone()[0]
+
+    times = parse_times([start_time, end_time])
+    return {
+        "object_types": object_types,
+        "attribute_names": sorted(attribute_names),
+        "activities": activities,
+        "activity_count": event_count,
+        "count_per_activity": {activity: count for activity, count in count_per_activity},
+        "event_count": event_count,
+        "object_count": object_count,
+        "relation_count": relation_count,
+        "start_time": times[0].isoformat() if event_count else None,
+        "end_time": times[1].isoformat() if event_count else None,
+        "count_per_object_type": {
+            object_type: count for object_type, count in count_per_object_type
+        },
+    }
+
+
+"""
+reads the attributes of a single event or object with indexed lookups
+all attributes of the kind are returned, attributes the type does not have are empty
+raises a KeyError if there is no such event or object
+"""
+
+
+def query_attributes(filename, kind, ocel_id):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        row = conn.execute(
+            "SELECT ocel_type FROM {} WHERE ocel_id = ? LIMIT 1".format(quote(kind)),
+            [ocel_id],
+        ).fetchone()
+        if row is None:
+            raise KeyError(ocel_id)
+
+        type_tables = get_type_tables(conn, kind)
+        attributes = dict()
+        for _, table in type_tables:
+            for column in get_attribute_columns(conn, table):
+                attributes[column] = ""
+
+        table = dict(type_tables).get(row[0])
+        if table is not None:
+            columns = get_attribute_columns(conn, table)
+            # the first row holds the initial values of an object, later rows are changes
+            order = " ORDER BY ocel_time" if "ocel_time" in get_table_columns(conn, table) else ""
+            values = conn.execute(
+                "SELECT {} FROM {} WHERE ocel_id = ?{} LIMIT 1".format(
+                    ", ".join(quote(column) for column in columns) or "NULL",
+                    quote(table),
+                    order,
+                ),
+                [ocel_id],
+            ).fetchone()
+            if values is not None:
+                for column, value in zip(columns, values):
+                    attributes[column] = "" if value is None else value
+    return attributes
+
+
+"""
+returns all columns of a table
+"""
+
+
+def get_table_columns(conn, table):
+    return [row[1] for row in conn.execute("PRAGMA table_info({})".format(quote(table)))]
+
+
+"""
+reads the lifecycle of a single object with indexed lookups, see performance_metric_utils.lookup_object_lifecycle
+raises a KeyError if the object is not related to any event
+"""
+
+
+def query_object_lifecycle(filename, oid):
+    with connect(fu.get_path_from_name(filename)) as conn:
+        times_sql, params = get_event_times_sql(conn)
+        rows = conn.execute(
+            """
+            SELECT t.activity, eo.ocel_event_id, t.ocel_time
+            FROM event_object eo JOIN ({}) t ON t.ocel_id = eo.ocel_event_id
+            WHERE eo.ocel_object_id = ?
+            ORDER BY eo.rowid
+            """.format(times_sql),
+            params + [oid],
+        ).fetchall()
+    if not rows:
+        raise KeyError(oid)
+
+    timestamps = parse_times([row[2] for row in rows])
+    start, end = timestamps.min(), timestamps.max()
+    return {
+        "error": False,
+        "object_lifecycle_activities": [row[0] for row in rows],
+        "object_lifecycle_duration": (end - start).total_seconds(),
+        "object_lifecycle_start": start,
+        "object_lifecycle_end": end,
+        "object_lifecycle_eids": [row[1] for row in rows],
+        "object_lifecycle_timestamps": timestamps.tolist(),
+    }
+
+
+"""
+reads the first n events of the database at the path for the file preview, with their related objects in ocel:omap
+"""
+
+
+def query_preview(filepath, n):
+    with connect(filepath) as conn:
+        times_sql, params = get_event_times_sql(conn)
+        rows = conn.execute(
+            "SELECT ocel_id, activity, ocel_time FROM ({}) ORDER BY ocel_time LIMIT ?".format(times_sql),
+            params + [n],
+        ).fetchall()
+        records = []
+        for eid, activity, timestamp in rows:
+            omap = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT ocel_object_id FROM event_object WHERE ocel_event_id = ? ORDER BY rowid",
+                    [eid],
+                )
+            ]
+            records.append(
+                {
+                    "ocel:eid": eid,
+                    "ocel:activity": activity,
+                    "ocel:timestamp": timestamp,
+                    "ocel:omap": omap,
+                }
+            )
+    return records
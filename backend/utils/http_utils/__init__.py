@@ -0,0 +1 @@
+from utils.http_utils import caching_utils, compression_utils, metrics_utils, profiling_utils
@@ -0,0 +1,104 @@
+import hashlib
+import json
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from utils.filemanager_utils import filemanager_utils as fu
+
+# part of every ETag, has to be changed whenever the format of the cached responses changes
+ETAG_VERSION = 1
+
+# clients may keep responses but have to revalidate them with If-None-Match before every use
+CACHE_CONTROL = "no-cache"
+
+
+"""
+returns a strong ETag for a response computed from the content of the file and the given parameters
+returns None if the file can not be hashed, such responses are not cacheable
+with stored_only the file is never hashed, None is returned if its hash has not been stored yet
+"""
+
+
+def get_etag(filename, *params, stored_only=False):
+    try:
+        if stored_only:
+            content_hash = fu.read_content_hash(filename)
+        else:
+            content_hash = fu.get_content_hash(filename)
+    except Exception:
+        return None
+    if content_hash is None:
+        return None
+    key = json.dumps([ETAG_VERSION, content_hash, params], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+"""
+removes the suffix that is added to the ETag of compressed responses
+"""
+
+
+def strip_encoding(tag):
+    for encoding in ("gzip", "br"):
+        if tag.endswith("-" + encoding):
+            return tag[: -len(encoding) - 1]
+    return tag
+
+
+"""
+checks if the client already holds the response with the given ETag
+"""
+
+
+def is_not_modified(etag):
+    if etag is None or request.method not in ("GET", "HEAD"):
+        return False
+    return any(
+        strip_encoding(tag) == etag
+        for tag in request.if_none_match.as_set(include_weak=True)
+    )
+
+
+"""
+returns an empty 304 response for a response the client already holds
+"""
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+"""
+adds the ETag to a successful response
+"""
+
+
+def set_etag(response, etag):
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+"""
+decorator for GET routes whose response only depends on the file and the query parameters
+answers If-None-Match with a 304 before the route is called
+"""
+
+
+def conditional(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        filename = request.args.get("filename")
+        if not filename:
+            return view(*args, **kwargs)
+        etag = get_etag(filename, request.path, sorted(request.args.items(multi=True)))
+        if is_not_modified(etag):
+            return not_modified(etag)
+        return set_etag(make_response(view(*args, **kwargs)), etag)
+
+    return wrapper
@@ -0,0 +1,81 @@
+import gzip
+
+from flask import request
+
+from utils.http_utils.metrics_utils import timer
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional, responses are compressed with gzip only without it
+    brotli = None
+
+# smaller responses are sent uncompressed, compressing them does not pay off
+MIN_COMPRESS_SIZE = 1024
+
+# mimetypes of the responses that are compressed
+COMPRESSED_MIMETYPES = ["application/json", "text/html", "text/plain", "text/csv"]
+
+# low levels, the responses are compressed on every request
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+"""
+returns the encoding to compress the response with, based on the Accept-Encoding header of the request
+returns None if the client accepts neither brotli nor gzip
+"""
+
+
+def choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"] > 0 and accepted["br"] >= accepted["gzip"]:
+        return "br"
+    if accepted["gzip"] > 0:
+        return "gzip"
+    return None
+
+
+"""
+returns the data compressed with the given encoding
+"""
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+"""
+after request handler, compresses large text responses with the encoding the client prefers
+"""
+
+
+def compress_response(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSED_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    with timer("compress"):
+        response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+
+    # a compressed response is a different representation and needs its own strong ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag("{}-{}".format(etag, encoding), weak)
+    return response
@@ -0,0 +1,218 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_app_context, request
+
+# upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+"""
+latency histogram with one series per label value, in the Prometheus histogram format
+the histograms are kept per process, every server worker exposes its own
+"""
+
+
+class Histogram:
+    def __init__(self, name, description, label, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        # label value -> [count per bucket, sum, count]
+        self.series = dict()
+        self.lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.description),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        with self.lock:
+            series = {value: (list(counts), total, count) for value, (counts, total, count) in self.series.items()}
+        for value in sorted(series):
+            counts, total, count = series[value]
+            label = '{}="{}"'.format(self.label, escape_label(value))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(self.name, label, bound, cumulative))
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(self.name, label, count))
+            lines.append("{}_sum{{{}}} {}".format(self.name, label, repr(total)))
+            lines.append("{}_count{{{}}} {}".format(self.name, label, count))
+        return lines
+
+
+"""
+counter with one series per label value, in the Prometheus counter format
+"""
+
+
+class Counter:
+    def __init__(self, name, description, label):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.series = dict()
+        self.lock = threading.Lock()
+
+    def inc(self, label_value):
+        with self.lock:
+            self.series[label_value] = self.series.get(label_value, 0) + 1
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.description),
+            "# TYPE {} counter".format(self.name),
+        ]
+        with self.lock:
+            series = dict(self.series)
+        for value in sorted(series):
+            lines.append('{}{{{}="{}"}} {}'.format(self.name, self.label, escape_label(value), series[value]))
+        return lines
+
+
+stage_durations = Histogram(
+    "dottie_stage_duration_seconds", "Duration of the processing stages.", "stage"
+)
+stage_errors = Counter(
+    "dottie_stage_errors_total", "Number of processing stages that raised an exception.", "stage"
+)
+request_durations = Histogram(
+    "dottie_request_duration_seconds", "Duration of the requests per endpoint.", "endpoint"
+)
+
+
+"""
+escapes a label value for the Prometheus text format
+"""
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+"""
+records the duration of a stage in its histogram and, within a request, for the Server-Timing header of the response
+stages that run several times in a request are summed up
+"""
+
+
+def record(stage, seconds):
+    stage_durations.observe(stage, seconds)
+    if has_app_context():
+        timings = g.setdefault("stage_timings", dict())
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+# stages that are currently timed in this thread, outermost first
+active_stages = threading.local()
+
+
+"""
+context manager that times the enclosed block as stage
+stages that run within another stage are named after their parents, e.g. load.parse, so only the
+top level stages add up to the request time
+a stage that runs within a stage of the same name is part of the outer one and not recorded again
+"""
+
+
+@contextmanager
+def timer(stage):
+    stack = getattr(active_stages, "stack", None)
+    if stack is None:
+        stack = active_stages.stack = []
+    if stack and stack[-1] == stage:
+        yield
+        return
+
+    stack.append(stage)
+    name = ".".join(stack)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(name)
+        raise
+    finally:
+        stack.pop()
+        record(name, time.perf_counter() - start)
+
+
+"""
+decorator that times every call of the function as stage, the stage defaults to the function name
+"""
+
+
+def timed(stage=None):
+    def decorator(function):
+        name = stage or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+"""
+before request handler, starts the timing of the request
+"""
+
+
+def start_request():
+    g.request_start = time.perf_counter()
+    g.stage_timings = dict()
+
+
+"""
+after request handler, adds the stage timings of the request as Server-Timing header and records the request duration
+"""
+
+
+def add_server_timing(response):
+    start = g.get("request_start")
+    if start is None:
+        return response
+    total = time.perf_counter() - start
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_durations.observe(endpoint, total)
+
+    entries = [
+        "{};dur={:.2f}".format(stage, seconds * 1000)
+        for stage, seconds in g.get("stage_timings", dict()).items()
+    ]
+    entries.append("total;dur={:.2f}".format(total * 1000))
+    response.headers.add("Server-Timing", ", ".join(entries))
+    return response
+
+
+"""
+returns the collected metrics of this process in the Prometheus text format
+"""
+
+
+def render_metrics():
+    lines = []
+    for metric in (request_durations, stage_durations, stage_errors):
+        lines += metric.render()
+    return Response("\n".join(lines) + "\n", content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from os.path import basename, join
+
+from flask import g, request
+
+# the sampling profiler can only be requested per request if the environment variable is set to 1
+PROFILING_ENV = "DOTTIE_PROFILING"
+
+# the profiles are written to this directory as collapsed stacks, one file per profiled request
+PROFILE_DIR_ENV = "DOTTIE_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "/tmp/dottie-profiles"
+
+# seconds between two samples of the request thread
+SAMPLE_INTERVAL = 0.005
+
+
+"""
+background thread that periodically samples the stack of the thread handling a request
+the samples are aggregated as collapsed stacks, the input format of flame graph tools
+"""
+
+
+class SamplingProfiler(threading.Thread):
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{}:{}".format(basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write("{} {}\n".format(stack, count))
+
+
+"""
+returns True if the profiler is enabled on the server and requested with profile=true
+"""
+
+
+def is_requested():
+    return os.environ.get(PROFILING_ENV) == "1" and request.args.get("profile") == "true"
+
+
+"""
+before request handler, starts the sampling profiler for the request if it is requested
+"""
+
+
+def start_profiling():
+    if is_requested():
+        g.profiler = SamplingProfiler(threading.get_ident())
+        g.profiler.start()
+
+
+"""
+after request handler, stops the profiler of the request and writes its profile
+the file name of the profile is returned in the Server-Timing header
+"""
+
+
+def stop_profiling(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.stop()
+
+    profile_dir = os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+    os.makedirs(profile_dir, exist_ok=True)
+    name = "{}-{}.collapsed".format(time.strftime("%Y%m%d-%H%M%S"), uuid.uuid4().hex[:8])
+    profiler.write(join(profile_dir, name))
+    response.headers.add("Server-Timing", 'profile;desc="{}"'.format(name))
+    return response
@@ -1,11 +1,87 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { useNavigate, useSearchParams } from "react-router-dom";
 import Plot from "react-plotly.js";
+import Plotly from "plotly.js-dist";
 import PageNavigation from "./PageNavigation";
 import FilterComponent from "./FilterComponent";
 import Loading from "./Loading";
 import { Dropdown } from "react-bootstrap";
 
+// typed array constructors of the dtype codes the backend encodes trace data with
+const TYPED_ARRAYS = {
+  f8: Float64Array,
+  f4: Float32Array,
+  i4: Int32Array,
+  i2: Int16Array,
+  i1: Int8Array,
+  u4: Uint32Array,
+  u2: Uint16Array,
+  u1: Uint8Array,
+};
+
+// decodes a base64 typed array of the figure, other values are returned as they are
+const decodeTypedArray = (value) => {
+  if (!value || typeof value.bdata !== "string" || !TYPED_ARRAYS[value.dtype]) {
+    return value;
+  }
+  const binary = atob(value.bdata);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return new TYPED_ARRAYS[value.dtype](bytes.buffer);
+};
+
+// replaces the typed arrays in the traces of a figure sent by the backend
+const decodeFigure = (figure) => {
+  figure.data.forEach((trace) => {
+    ["x", "y"].forEach((key) => {
+      if (key in trace) {
+        trace[key] = decodeTypedArray(trace[key]);
+      }
+    });
+    if (trace.marker) {
+      ["size", "color"].forEach((key) => {
+        if (key in trace.marker) {
+          trace.marker[key] = decodeTypedArray(trace.marker[key]);
+        }
+      });
+    }
+  });
+  return figure;
+};
+
+// reads a streamed NDJSON response and calls onLine with every line, onLine returns false to stop reading
+const readLines = async (response, onLine) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (line && onLine(JSON.parse(line)) === false) {
+        reader.cancel();
+        return;
+      }
+    }
+  }
+  if (buffer) {
+    onLine(JSON.parse(buffer));
+  }
+};
+
+// number of events per page of the eventID view
+const EVENT_PAGE_SIZE = 100;
+
+// the first page of the eventID view
+const FIRST_PAGE = { cursor: "", direction: "next" };
+
 function Chart() {
   const navigate = useNavigate();
 
@@ -31,6 +107,10 @@ function Chart() {
   const [startTime, setStartTime] = useState("");
   const [endTime, setEndTime] = useState("");
 
+  // states for the pages of the eventID view
+  const [page, setPage] = useState(FIRST_PAGE);
+  const [pageCursors, setPageCursors] = useState({ next: null, prev: null });
+
   //states for views
   const [view, setView] = useState("eventID");
   const [dropdownItems, setDropdownItems] = useState(["eventID"]);
@@ -42,6 +122,113 @@ function Chart() {
   const [objectLifecycle, setObjectLifecycle] = useState([{}]);
   const [objectClick, setObjectClick] = useState(false);
 
+  // state for level-of-detail rendering of flattened views
+  const [lod, setLod] = useState(false);
+
+  // counts the polls while the log is ingested in the background
+  const [ingestPoll, setIngestPoll] = useState(0);
+
+  // plot of the flattened views, streamed points are appended to its traces
+  const graphDiv = useRef(null);
+  // traces of the streamed figure and the batches that arrived before the plot showed them
+  const streamTraces = useRef(null);
+  const pendingBatches = useRef([]);
+
+  // appends a streamed batch of points, batches are kept until the plot shows the streamed figure
+  const appendBatch = (batch) => {
+    if (!graphDiv.current || graphDiv.current.data !== streamTraces.current) {
+      pendingBatches.current.push(batch);
+      return;
+    }
+    Plotly.extendTraces(
+      graphDiv.current,
+      { x: batch.x, y: batch.y, customdata: batch.customdata },
+      batch.traces
+    );
+  };
+
+  // keeps the plot of the flattened views and appends the batches it has not shown yet
+  const handlePlotUpdate = (figure, plotDiv) => {
+    graphDiv.current = plotDiv;
+    if (plotDiv.data === streamTraces.current) {
+      pendingBatches.current.splice(0).forEach(appendBatch);
+    }
+  };
+
+  // shows the chart of a /scatterplot response or a stream header
+  const handleChartResponse = (response) => {
+    if (response.processing) {
+      // the log is not ingested yet, ask again in a second
+      setTimeout(() => setIngestPoll((poll) => poll + 1), 1000);
+    } else if (response.error) {
+      setErrorMessage(response.error);
+      console.log(errorMessage);
+    } else {
+      setData(decodeFigure(response.figure));
+      setLod(response.lod);
+      setPageCursors(response.page ?? { next: null, prev: null });
+      setLoading(false);
+      setActivityFilters(response.activities);
+      setSelectedActivities(response.selected_activities);
+      setObjectTypeFilters(response.object_types);
+      setSelectedObjectTypes(response.selected_object_types);
+      setDropdownItems((prevItems) => [
+        ...prevItems,
+        ...response.object_types.filter((item) => !prevItems.includes(item)),
+      ]);
+      setErrorMessage("");
+      setResetFilters(false);
+      setData((data) => {
+        let updateData = { ...data };
+        updateData.layout.autosize = true;
+        updateData.layout.width = "";
+        updateData.layout.hight = "";
+        return updateData;
+      });
+    }
+  };
+
+  const fetchChart = (query, signal) => {
+    fetch(`/chartapi/scatterplot?${query}`, { signal })
+      .then((res) => res.json())
+      .then(handleChartResponse)
+      .catch((error) => {
+        if (error.name !== "AbortError") {
+          console.error("Error fetching chart:", error);
+        }
+      });
+  };
+
+  // streams the points of a flattened view, views with too many points are shown as level-of-detail density
+  const streamChart = (query, signal) => {
+    fetch(`/chartapi/scatterplot-stream?${query}`, { signal })
+      .then((res) => {
+        if (!(res.headers.get("Content-Type") ?? "").startsWith("application/x-ndjson")) {
+          // the log is still processing or the filters leave no data
+          return res.json().then(handleChartResponse);
+        }
+        return readLines(res, (line) => {
+          if (line.type === "header") {
+            if (line.lod) {
+              fetchChart(query, signal);
+              return false;
+            }
+            streamTraces.current = line.figure.data;
+            pendingBatches.current = [];
+            handleChartResponse(line);
+          } else if (line.type === "points") {
+            appendBatch(line);
+          }
+          return true;
+        });
+      })
+      .catch((error) => {
+        if (error.name !== "AbortError") {
+          console.error("Error streaming chart:", error);
+        }
+      });
+  };
+
   // fetch data
   useEffect(() => {
     setObjectClick(false); // hide object specific metrics
@@ -50,45 +237,33 @@ function Chart() {
       setEndTime("");
     }
     setLoading(true);
-    fetch(
-      `/chartapi/scatterplot?filename=${search.get(
-        "file"
-      )}&view=${view}&startTime=${startTime}&endTime=${endTime}&resetFilters=${resetFilters}`
-    )
-      .then((res) => res.json())
-      .then((response) => {
-        if (response.error) {
-          setErrorMessage(response.error);
-          console.log(errorMessage);
-        } else {
-          setData(response.figure);
-          setLoading(false);
-          setActivityFilters(response.activities);
-          setSelectedActivities(response.selected_activities);
-          setObjectTypeFilters(response.object_types);
-          setSelectedObjectTypes(response.selected_object_types);
-          setDropdownItems((prevItems) => [
-            ...prevItems,
-            ...response.object_types.filter(
-              (item) => !prevItems.includes(item)
-            ),
-          ]);
-          setErrorMessage("");
-          setResetFilters(false);
-          setData((data) => {
-            let updateData = { ...data };
-            updateData.layout.autosize = true;
-            updateData.layout.width = "";
-            updateData.layout.hight = "";
-            return updateData;
-          });
-        }
-      });
+    // the eventID view is fetched page by page, starting at the cursor event
+    let pagination = "";
+    if (view === "eventID") {
+      pagination = `&pageSize=${EVENT_PAGE_SIZE}&direction=${page.direction}`;
+      if (page.cursor) {
+        pagination += `&cursor=${encodeURIComponent(page.cursor)}`;
+      }
+    }
+    // a newer chart request cancels the running one, so old batches are not appended to the new chart
+    const controller = new AbortController();
+    const query = `filename=${search.get(
+      "file"
+    )}&view=${view}&startTime=${startTime}&endTime=${endTime}&resetFilters=${resetFilters}`;
+    if (view === "eventID") {
+      fetchChart(query + pagination, controller.signal);
+    } else {
+      // flattened views are rendered while their points arrive
+      streamChart(query, controller.signal);
+    }
 
     // fetch metrics for the whole event log
     fetch(`/chartapi/get-general-metrics?filename=${search.get("file")}`)
       .then((res) => res.json())
       .then((res) => {
+        if (res.processing) {
+          return;
+        }
         if (res.error === true) {
           setErrorMessage(res.errorMessage);
         }
@@ -96,14 +271,19 @@ function Chart() {
           setMetrics(res)
         }
       });
-  }, [view, resetFilters, search, collapseFlag, filterFlag]);
+
+    return () => controller.abort();
+  }, [view, resetFilters, search, collapseFlag, filterFlag, ingestPoll, page]);
 
   // Click handler for collapsed dots in eventID view
   const handleSubplotClick = (event) => {
     const traceIndex = event.points[0].curveNumber;
+    const pointIndex = event.points[0].pointIndex;
 
     // Make API request to toggle the corresponding subplot
-    fetch(`/chartapi/toggle-subplot?traceIndex=${traceIndex}`)
+    fetch(
+      `/chartapi/toggle-subplot?traceIndex=${traceIndex}&pointIndex=${pointIndex}`
+    )
       .then((res) => res.json())
       .then((data) => {
         setCollapseFlag(!collapseFlag);
@@ -146,6 +326,7 @@ function Chart() {
       })
         .then((res) => res.json())
         .then((data) => {
+          setPage(FIRST_PAGE);
           setFilterFlag(!filterFlag);
         })
         .catch((error) => {
@@ -165,6 +346,7 @@ function Chart() {
     })
       .then((res) => res.json())
       .then((data) => {
+        setPage(FIRST_PAGE);
         setFilterFlag(!filterFlag);
       })
       .catch((error) => {
@@ -186,20 +368,73 @@ function Chart() {
   };
 
   const handleTimeFilterApply = () => {
+    setPage(FIRST_PAGE);
     setFilterFlag(!filterFlag);
   };
 
   const handleResetFilters = () => {
+    setPage(FIRST_PAGE);
     setResetFilters(true);
     setFilterFlag(!filterFlag);
   };
 
   const handleDropdownChange = (eventKey) => {
+    setPage(FIRST_PAGE);
     setView(eventKey);
   };
 
+  // button handlers to page through the events in eventID view
+  const handlePreviousPage = () => {
+    setPage({ cursor: pageCursors.prev, direction: "prev" });
+  };
+
+  const handleNextPage = () => {
+    setPage({ cursor: pageCursors.next, direction: "next" });
+  };
+
+  // relayout handler for flattened views, fetches the points or density of the visible range
+  const handleRelayout = (event) => {
+    if (!lod) {
+      return;
+    }
+    let viewport = "";
+    if ("xaxis.range[0]" in event) {
+      viewport += `&xStart=${event["xaxis.range[0]"]}&xEnd=${event["xaxis.range[1]"]}`;
+    }
+    if ("yaxis.range[0]" in event) {
+      viewport += `&yStart=${event["yaxis.range[0]"]}&yEnd=${event["yaxis.range[1]"]}`;
+    }
+    if (viewport === "" && !("xaxis.autorange" in event)) {
+      return;
+    }
+    fetch(
+      `/chartapi/flattened-lod?filename=${search.get(
+        "file"
+      )}&view=${view}&startTime=${startTime}&endTime=${endTime}${viewport}`
+    )
+      .then((res) => res.json())
+      .then((response) => {
+        if (response.error) {
+          setErrorMessage(response.error);
+        } else {
+          let updateData = decodeFigure(response.figure);
+          updateData.layout.autosize = true;
+          updateData.layout.width = "";
+          updateData.layout.hight = "";
+          setData(updateData);
+        }
+      })
+      .catch((error) => {
+        console.error("Error fetching visible range:", error);
+      });
+  };
+
   // click handler on dots in any of the flattened views
   const handleDotClick = (event) => {
+    // binned density points have no event behind them
+    if (!event.points[0].customdata) {
+      return;
+    }
     setObjectClick(false);
     // get eventID that is saved in custom data attribute of each dot
     const eid = event.points[0].customdata[0];
@@ -216,8 +451,8 @@ function Chart() {
         }
       });
 
-    // get object id from click event
-    const oid = event.points[0].y;
+    // get object id from click event, level-of-detail charts place cases at numeric positions
+    const oid = event.points[0].customdata[1] ?? event.points[0].y;
 
     // Object attribute data
     fetch(
@@ -331,6 +566,20 @@ function Chart() {
               >
                 collapse all
               </button>
+              <button
+                onClick={handlePreviousPage}
+                disabled={!pageCursors.prev}
+                className="collapse-all-button"
+              >
+                previous events
+              </button>
+              <button
+                onClick={handleNextPage}
+                disabled={!pageCursors.next}
+                className="collapse-all-button"
+              >
+                next events
+              </button>
             </div>
           ) : (
             <div style={{ display: "inline-block" }}></div>
@@ -454,6 +703,9 @@ function Chart() {
                 responsive: true,
               }}
               onClick={handleDotClick}
+              onRelayout={handleRelayout}
+              onInitialized={handlePlotUpdate}
+              onUpdate={handlePlotUpdate}
             />
           )}
         </div>
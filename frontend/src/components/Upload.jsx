@@ -4,6 +4,9 @@ import { useNavigate } from "react-router-dom";
 import PageNavigation from "./PageNavigation";
 import { useDropzone } from "react-dropzone";
 
+// size of the chunks a file is uploaded in
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+
 function Upload() {
   // state that stores selected file
   const [file, setFile] = useState([{}]);
@@ -40,45 +43,52 @@ function Upload() {
     setFile({ selectedFile: event.target.files[0] });
   };
 
+  // upload errors are shown for 2.5 seconds
+  const showUploadError = (message) => {
+    setErrorMessage(message);
+    setUploadComplete(false);
+    setShowError(true);
+    setUploadPercentage(0);
+    setTimeout(() => {
+      setShowError(false);
+    }, 2500);
+  };
+
   // On file upload (click the upload button)
-  const onFileUpload = () => {
-    // Request made to the backend api
-    // Send formData object
+  // the file is sent in chunks, an interrupted upload resumes at the received size
+  const onFileUpload = async () => {
     if (typeof file.selectedFile !== "undefined" || file.selectedFile === "") {
-      const data = new FormData();
-      data.append("file", file.selectedFile, file.selectedFile.name);
-
-      axios
-        .post("/filemanager/upload-file", data, {
-          onUploadProgress: (progressEvent) => {
-            setUploadPercentage(
-              Math.round((progressEvent.loaded * 100) / progressEvent.total)
-            );
-          },
-        })
-        .then((res) => {
-          // handle error from backend
-          console.log(res)
-          if (res.data.error === true) {
-            setErrorMessage(res.data.errorMessage);
-            setUploadComplete(false);
-            setShowError(true);
-            setUploadPercentage(0);
-            // hide the error message after 2.5 seconds
-            setTimeout(() => {
-              setShowError(false);
-            }, 2500);
-          } else {
-            setErrorMessage("");
-            setUploadComplete(true);
-            setFile([{}]); // reset state
-            // keep the green alert and 100% percentage indicator for 2.5 seconds
-            setTimeout(() => {
-              setUploadPercentage(0);
-              setUploadComplete(false);
-            }, 2500);
-          }
-        });
+      const selectedFile = file.selectedFile;
+      const name = encodeURIComponent(selectedFile.name);
+
+      const status = await axios.get(`/filemanager/upload-status?filename=${name}`);
+      let offset = status.data.received || 0;
+
+      do {
+        const chunk = selectedFile.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+        const final = offset + chunk.size >= selectedFile.size;
+        const res = await axios.post(
+          `/filemanager/upload-chunk?filename=${name}&offset=${offset}&final=${final}`,
+          chunk,
+          { headers: { "Content-Type": "application/octet-stream" } }
+        );
+        // handle error from backend
+        if (res.data.error === true) {
+          showUploadError(res.data.errorMessage);
+          return;
+        }
+        offset = res.data.received;
+        setUploadPercentage(Math.round((offset * 100) / selectedFile.size));
+      } while (offset < selectedFile.size);
+
+      setErrorMessage("");
+      setUploadComplete(true);
+      setFile([{}]); // reset state
+      // keep the green alert and 100% percentage indicator for 2.5 seconds
+      setTimeout(() => {
+        setUploadPercentage(0);
+        setUploadComplete(false);
+      }, 2500);
     }
   };
 